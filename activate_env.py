@@ -101,8 +101,9 @@ WorkingDirectory={WORKING_DIR}
 ExecStart={VENV_PYTHON} {PYTHON_SCRIPT}
 Restart=always
 Environment=PYTHONUNBUFFERED=1
-StandardOutput=append:{LOG_FILE}
-StandardError=append:{LOG_FILE}
+Environment=SENSORBOX_LOG_FILE={LOG_FILE}
+StandardOutput=journal
+StandardError=journal
 
 [Install]
 WantedBy=multi-user.target
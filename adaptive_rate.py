@@ -0,0 +1,114 @@
+# Adaptive Sampling Rate
+# An empty scene does not need sampling at full rate. A RateController
+# watches a sensor's raw distances and keeps it in one of two modes:
+#
+#   idle    readings are out of range and steady: sample at idle_hz
+#   active  a reading is within max_range + margin (something is in
+#           range or approaching it) or the reading moved faster than
+#           speed cm/s over the last SPEED_WINDOW: full rate, until
+#           nothing has been active for hold seconds
+#
+# Activity switches to the full rate on the sample that shows it;
+# the margin is what keeps an approaching target's alert as fast as
+# without adaptation, because the sensor is at full rate before the
+# target reaches max_range. Missing echoes count as idle readings.
+#
+# Ultrasonic sensors ping at the controller's rate. A radar reports
+# at its own rate, so every frame is still looked at here (a couple of
+# comparisons) but only admit()ted frames are filtered and detected.
+
+# Speed is measured over at least this long, so a few cm of noise
+# between frames 50 ms apart does not look like movement
+
+SPEED_WINDOW = 0.5
+
+
+class RateController:
+    """Idle/active sampling rate of one sensor from its readings."""
+
+    def __init__(self, policy, max_range, active_hz=None, now=0.0):
+
+        self.idle_hz = policy.idle_hz
+        self.active_hz = active_hz
+        self.near = max_range + policy.margin
+        self.speed = policy.speed
+        self.hold = policy.hold
+
+        # Start at full rate; it settles to idle after ``hold``
+
+        self.active = True
+        self.active_until = now + policy.hold
+
+        self._reference = None
+        self._last_admitted = None
+
+        self.switches = 0
+
+    @property
+    def rate_hz(self):
+        """The rate to sample at now; None means every sample."""
+
+        return self.active_hz if self.active else self.idle_hz
+
+    def update(self, distance, timestamp):
+        """Feed a raw reading (cm, or None for no echo). Returns True
+        when the mode changed."""
+
+        busy = False
+
+        if distance is not None:
+
+            busy = distance <= self.near
+
+            reference = self._reference
+
+            if reference is None:
+                self._reference = (distance, timestamp)
+
+            elif timestamp - reference[1] >= SPEED_WINDOW:
+
+                if abs(distance - reference[0]) >= self.speed * (timestamp - reference[1]):
+                    busy = True
+
+                self._reference = (distance, timestamp)
+
+        if busy:
+
+            self.active_until = timestamp + self.hold
+
+            if not self.active:
+
+                self.active = True
+                self.switches += 1
+
+                return True
+
+        elif self.active and timestamp >= self.active_until:
+
+            self.active = False
+            self.switches += 1
+
+            return True
+
+        return False
+
+    def admit(self, timestamp):
+        """Whether a reading taken at ``timestamp`` is processed: every
+        one while active, one per 1 / idle_hz seconds while idle."""
+
+        if not self.active and self._last_admitted is not None:
+
+            if timestamp - self._last_admitted < 1.0 / self.idle_hz:
+                return False
+
+        self._last_admitted = timestamp
+
+        return True
+
+    def stats(self):
+
+        return {
+            "mode": "active" if self.active else "idle",
+            "rate_hz": self.rate_hz,
+            "switches": self.switches
+        }
@@ -1,6 +1,8 @@
 import RPi.GPIO as GPIO
 import time
 
+from echo_timing import make_echo_timer
+
 # Set the GPIO mode to BOARD (physical pin numbers)
 GPIO.setmode(GPIO.BOARD)
 
@@ -12,35 +14,13 @@ echo_pin = 24  # Physical pin 18 (GPIO 24)
 GPIO.setup(trig_pin, GPIO.OUT)
 GPIO.setup(echo_pin, GPIO.IN)
 
+# Time the echo from GPIO edge callbacks (falls back to polling)
+echo_timer = make_echo_timer(GPIO, trig_pin, echo_pin)
+
 # Function to measure the distance
 def measure_distance():
-    # Trigger the sensor
-    GPIO.output(trig_pin, GPIO.HIGH)
-    time.sleep(0.00001)  # 10 microseconds
-    GPIO.output(trig_pin, GPIO.LOW)
-
-    # Measure the echo
-    pulse_start = time.time()
-    timeout_start = pulse_start  # To handle timeout
-
-    while GPIO.input(echo_pin) == 0:
-        pulse_start = time.time()
-        if pulse_start - timeout_start > 0.02:  # Timeout after 20ms
-            return -1  # No object detected
-
-    while GPIO.input(echo_pin) == 1:
-        pulse_end = time.time()
-        if pulse_end - pulse_start > 0.02:  # Timeout after 20ms
-            return -1  # No object detected
-
-    pulse_duration = pulse_end - pulse_start
-    distance = pulse_duration * 17150  # Speed of sound is 340 m/s
-
-    # Filter out unrealistic distances
-    if distance < 2 or distance > 800:  # HC-SR04 typical range
-        return -1  # Out of range
-
-    return distance
+    # Returns -1 if no object is detected or out of the 2-800 cm range
+    return echo_timer.measure()
 
 try:
     while True:
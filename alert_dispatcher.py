@@ -0,0 +1,372 @@
+import collections
+import logging
+import queue
+import threading
+import time
+
+# Alert Dispatcher
+# Workers hand detections to the dispatcher and return straight
+# away. A single background thread owns the network, so a slow or
+# dead AI Box can only back up the queue, never the sensor loops.
+
+class AlertDispatcher:
+    """Bounded alert queue drained by one delivery thread.
+
+    ``send`` is called with each payload and should return True when
+    the alert was delivered. Per-sensor cooldowns suppress repeat
+    alerts instead of sleeping in the worker.
+
+    With ``batch_size`` > 1 alerts are grouped and handed to
+    ``send_batch`` as a list. A batch is flushed when it holds
+    ``batch_size`` alerts or when its oldest alert has waited
+    ``batch_max_delay`` seconds, whichever comes first.
+
+    With a ``spool``, alerts that fail delivery are written to disk and
+    replayed in order once delivery succeeds again. Replay only runs
+    while the live queue is empty and is limited to ``replay_rate``
+    alerts per second, so it never delays a fresh detection.
+    """
+
+    def __init__(
+        self,
+        send,
+        maxsize=64,
+        cooldown=3.0,
+        send_batch=None,
+        batch_size=1,
+        batch_max_delay=0.5,
+        spool=None,
+        replay_rate=5.0,
+        replay_backoff=5.0
+    ):
+
+        if batch_size > 1 and send_batch is None:
+            raise ValueError("batch_size > 1 needs send_batch")
+
+        self.send = send
+        self.send_batch = send_batch
+        self.cooldown = cooldown
+        self.batch_size = batch_size
+        self.batch_max_delay = batch_max_delay
+        self.spool = spool
+        self.replay_rate = replay_rate
+        self.replay_backoff = replay_backoff
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._last_alert = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.submitted = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.requests = 0
+        self.max_latency = 0.0
+        self._latency_total = 0.0
+
+        self.spooled = 0
+        self.replayed = 0
+        self._replay_tokens = 0.0
+        self._replay_refill = time.monotonic()
+        self._replay_resume = 0.0
+        self._replay_window = collections.deque()
+
+    def set_batching(self, batch_size, batch_max_delay):
+        """Change the batch settings; the next batch uses them."""
+
+        if batch_size > 1 and self.send_batch is None:
+            raise ValueError("batch_size > 1 needs send_batch")
+
+        self.batch_size = batch_size
+        self.batch_max_delay = batch_max_delay
+
+    # Producer Side
+
+    def submit(self, sensor_id, payload, cooldown=None):
+        """Queue an alert. Returns False if it was suppressed or dropped."""
+
+        if cooldown is None:
+            cooldown = self.cooldown
+
+        now = time.monotonic()
+
+        with self._lock:
+
+            last = self._last_alert.get(sensor_id)
+
+            if last is not None and now - last < cooldown:
+
+                self.suppressed += 1
+
+                return False
+
+            try:
+
+                self._queue.put_nowait((sensor_id, payload, now))
+
+            except queue.Full:
+
+                self.dropped += 1
+
+                logging.warning(
+                    f"Alert queue full, dropped alert from {sensor_id}"
+                )
+
+                return False
+
+            self._last_alert[sensor_id] = now
+            self.submitted += 1
+
+        return True
+
+    # Delivery Thread
+
+    def _collect(self, first):
+
+        batch = [first]
+
+        # The deadline runs from when the oldest alert was queued, so
+        # no alert waits longer than batch_max_delay before sending.
+
+        deadline = first[2] + self.batch_max_delay
+
+        while len(batch) < self.batch_size:
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _deliver(self, batch):
+
+        self.requests += 1
+
+        try:
+
+            # A batch collected before batch_size dropped to 1 still
+            # goes out whole
+
+            if self.batch_size > 1 or len(batch) > 1:
+                ok = self.send_batch([payload for _, payload, _ in batch])
+
+            else:
+                ok = self.send(batch[0][1])
+
+        except Exception as e:
+
+            ok = False
+
+            logging.error(f"{batch[0][0]} Dispatch Error : {e}")
+
+        # Latency is queue-to-response, so it includes the batching
+        # delay and the HTTP round trip.
+
+        now = time.monotonic()
+
+        for _, _, queued_at in batch:
+
+            latency = now - queued_at
+
+            self._latency_total += latency
+
+            if latency > self.max_latency:
+                self.max_latency = latency
+
+        if ok:
+
+            self.sent += len(batch)
+
+            # Delivery works again, so replay can start right away.
+
+            self._replay_resume = 0.0
+
+        else:
+
+            self.failed += len(batch)
+
+            if self.spool is not None:
+
+                for _, payload, _ in batch:
+                    self.spool.append(payload)
+
+                self.spooled += len(batch)
+
+                self._replay_resume = now + self.replay_backoff
+
+    # Spool Replay
+
+    def _replay(self):
+
+        spool = self.spool
+
+        spool.sync()
+
+        now = time.monotonic()
+
+        if not spool.depth() or now < self._replay_resume:
+
+            self._replay_refill = now
+
+            return
+
+        # Token bucket: refills at replay_rate, holds at most one batch.
+
+        burst = max(1, self.batch_size)
+
+        self._replay_tokens = min(
+            burst,
+            self._replay_tokens + (now - self._replay_refill) * self.replay_rate
+        )
+
+        self._replay_refill = now
+
+        count = int(self._replay_tokens)
+
+        if count < 1:
+            return
+
+        rows = spool.peek(count)
+
+        delivered = []
+
+        try:
+
+            if self.batch_size > 1:
+
+                if self.send_batch([payload for _, payload in rows]):
+                    delivered = [row_id for row_id, _ in rows]
+
+            else:
+
+                # Stop at the first failure to keep replay in order.
+
+                for row_id, payload in rows:
+
+                    if not self.send(payload):
+                        break
+
+                    delivered.append(row_id)
+
+        except Exception as e:
+
+            logging.error(f"Spool Replay Error : {e}")
+
+        spool.remove(delivered)
+
+        self._replay_tokens -= len(rows)
+        self.replayed += len(delivered)
+
+        if delivered:
+            self._replay_window.append((now, len(delivered)))
+
+        if len(delivered) < len(rows):
+            self._replay_resume = now + self.replay_backoff
+
+    def replay_throughput(self, window=10.0):
+        """Alerts replayed per second over the last ``window`` seconds."""
+
+        cutoff = time.monotonic() - window
+
+        while self._replay_window and self._replay_window[0][0] < cutoff:
+            self._replay_window.popleft()
+
+        return sum(count for _, count in self._replay_window) / window
+
+    def _run(self):
+
+        while not self._stop.is_set():
+
+            timeout = 0.5
+
+            if self.spool is not None and self.spool.depth():
+                timeout = min(timeout, 1.0 / self.replay_rate)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+
+                if self.batch_size > 1:
+                    self._deliver(self._collect(item))
+
+                else:
+                    self._deliver([item])
+
+            if self.spool is not None and self._queue.empty():
+                self._replay()
+
+    def start(self):
+
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="alert-dispatcher",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self, timeout=None):
+
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        if self.spool is not None:
+            self.spool.sync()
+
+    # Stats
+
+    def queue_depth(self):
+
+        return self._queue.qsize()
+
+    def stats(self):
+
+        delivered = self.sent + self.failed
+
+        stats = {
+            "queue_depth": self.queue_depth(),
+            "submitted": self.submitted,
+            "suppressed": self.suppressed,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "failed": self.failed,
+            "requests": self.requests,
+            "avg_latency_ms": round(
+                self._latency_total / delivered * 1000, 1
+            ) if delivered else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1)
+        }
+
+        if self.spool is not None:
+
+            stats.update({
+                "spool_depth": self.spool.depth(),
+                "spooled": self.spooled,
+                "replayed": self.replayed,
+                "evicted": self.spool.evicted,
+                "replay_per_s": round(self.replay_throughput(), 2)
+            })
+
+        return stats
@@ -0,0 +1,149 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Alert Spool
+# Alerts that could not be delivered are appended to a SQLite WAL
+# database and replayed oldest-first once the AI Box answers again.
+#
+# SD cards are slow to fsync, so appends are grouped: a transaction is
+# committed every `sync_every` alerts or `sync_interval` seconds,
+# whichever comes first, and WAL runs with synchronous=NORMAL so only
+# checkpoints pay for a full sync. A crash can lose at most the last
+# uncommitted group.
+
+class AlertSpool:
+    """Append-only, size-capped store for undelivered alerts.
+
+    When the spool holds more than ``max_alerts`` the oldest alerts are
+    evicted, on the basis that recent detections matter more.
+    """
+
+    def __init__(self, path, max_alerts=10000, sync_every=32, sync_interval=2.0):
+
+        self.path = path
+        self.max_alerts = max_alerts
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "queued_at REAL NOT NULL, "
+            "payload TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+        self._depth = self._db.execute(
+            "SELECT COUNT(*) FROM alerts"
+        ).fetchone()[0]
+
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        self.appended = 0
+        self.evicted = 0
+
+        if self._depth:
+            logging.info(f"Alert spool has {self._depth} undelivered alerts")
+
+    def depth(self):
+
+        return self._depth
+
+    def append(self, payload):
+
+        with self._lock:
+
+            self._db.execute(
+                "INSERT INTO alerts (queued_at, payload) VALUES (?, ?)",
+                (time.time(), json.dumps(payload))
+            )
+
+            self._depth += 1
+            self._pending += 1
+            self.appended += 1
+
+            if self._depth > self.max_alerts:
+                self._evict(self._depth - self.max_alerts)
+
+            self._maybe_sync()
+
+    def _evict(self, count):
+
+        self._db.execute(
+            "DELETE FROM alerts WHERE id IN "
+            "(SELECT id FROM alerts ORDER BY id LIMIT ?)",
+            (count,)
+        )
+
+        self._depth -= count
+        self.evicted += count
+
+        logging.warning(f"Alert spool full, evicted {count} oldest alerts")
+
+    def _maybe_sync(self):
+
+        if (
+            self._pending >= self.sync_every
+            or time.monotonic() - self._last_sync >= self.sync_interval
+        ):
+            self._sync()
+
+    def _sync(self):
+
+        self._db.commit()
+
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Commit grouped appends if they are due. Cheap to call often."""
+
+        with self._lock:
+
+            if self._pending:
+                self._maybe_sync()
+
+    def peek(self, limit):
+        """Return up to ``limit`` of the oldest alerts as (id, payload)."""
+
+        with self._lock:
+
+            rows = self._db.execute(
+                "SELECT id, payload FROM alerts ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def remove(self, row_ids):
+
+        if not row_ids:
+            return
+
+        with self._lock:
+
+            cursor = self._db.executemany(
+                "DELETE FROM alerts WHERE id = ?",
+                [(row_id,) for row_id in row_ids]
+            )
+
+            self._depth -= cursor.rowcount
+            self._pending += 1
+
+            self._maybe_sync()
+
+    def close(self):
+
+        with self._lock:
+
+            self._db.commit()
+            self._db.close()
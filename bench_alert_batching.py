@@ -0,0 +1,87 @@
+import argparse
+import contextlib
+import io
+import time
+
+from alert_dispatcher import AlertDispatcher
+from bench_http_client import start_server
+from http_client import DeliveryClient
+
+# Benchmark: per-alert POSTs versus batched delivery.
+# Simulates a sustained intrusion where every sensor produces a
+# detection each --interval seconds, and reports requests sent and
+# the queue-to-response latency of each mode.
+
+
+def run(label, client, url, sensors, interval, duration, batch_size, max_delay):
+
+    def send(payload):
+        client.post_json(url, payload)
+        return True
+
+    def send_batch(payloads):
+        return send({"sensorBoxId": "bench", "events": payloads})
+
+    dispatcher = AlertDispatcher(
+        send,
+        maxsize=1024,
+        cooldown=0,
+        send_batch=send_batch,
+        batch_size=batch_size,
+        batch_max_delay=max_delay
+    )
+
+    dispatcher.start()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.monotonic()
+        tick = started
+        while tick - started < duration:
+            for sensor_id in sensors:
+                dispatcher.submit(sensor_id, {
+                    "sensorId": sensor_id,
+                    "data": f"Type:nx.base.Detection;TimestampUs:{int(time.time() * 1e6)};"
+                })
+            tick += interval
+            time.sleep(max(0.0, tick - time.monotonic()))
+
+        while dispatcher.queue_depth():
+            time.sleep(0.01)
+        time.sleep(max_delay + 0.1)
+
+    dispatcher.stop()
+    stats = dispatcher.stats()
+    print(
+        f"{label:10} events={stats['sent']} requests={stats['requests']} "
+        f"req/s={stats['requests'] / duration:.1f} "
+        f"avg={stats['avg_latency_ms']}ms max={stats['max_latency_ms']}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare per-alert and batched alert delivery."
+    )
+    parser.add_argument("--sensors", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-delay", type=float, default=0.25)
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/alerts/from-nx"
+    sensors = [f"S{i:03d}" for i in range(args.sensors)]
+    client = DeliveryClient()
+
+    try:
+        run("single", client, url, sensors, args.interval, args.duration, 1, args.max_delay)
+        run("batched", client, url, sensors, args.interval, args.duration,
+            args.batch_size, args.max_delay)
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import statistics
+import threading
+import time
+
+from echo_timing import CM_PER_SECOND, make_echo_timer
+from gpio_sim import SimulatedGPIO
+
+# Benchmark: polling versus edge-triggered echo timing.
+# Runs both timers against the simulated GPIO backend and compares
+# the measured distance with the simulated pulse width (jitter), and
+# the CPU burned by the measuring thread. --contention adds a busy
+# Python thread, standing in for the radar thread fighting for the
+# GIL.
+
+TRIG = 23
+ECHO = 24
+
+
+def busy(stop):
+    n = 0
+    while not stop.is_set():
+        n += 1
+
+
+def run(mode, args):
+    gpio = SimulatedGPIO()
+    gpio.setup(TRIG, gpio.OUT)
+    gpio.setup(ECHO, gpio.IN)
+    gpio.attach_echo(TRIG, ECHO, distance=args.distance)
+
+    timer = make_echo_timer(gpio, TRIG, ECHO, mode=mode)
+
+    errors = []
+    misses = 0
+    cpu = 0.0
+    wall0 = time.perf_counter()
+
+    for _ in range(args.pings):
+        cpu0 = time.thread_time()
+        distance = timer.measure()
+        cpu += time.thread_time() - cpu0
+
+        # Let the simulator finish stamping the falling edge.
+        time.sleep(args.interval)
+
+        if distance == -1:
+            misses += 1
+            continue
+
+        rise, fall = gpio.last_pulse[ECHO]
+        errors.append(distance - (fall - rise) * CM_PER_SECOND / 1e9)
+
+    wall = time.perf_counter() - wall0
+    timer.close()
+
+    abs_errors = sorted(abs(e) for e in errors)
+    print(
+        f"{timer.mode:8} pings={args.pings} misses={misses} "
+        f"bias={statistics.mean(errors):+.3f}cm "
+        f"jitter={statistics.pstdev(errors):.3f}cm "
+        f"p99={abs_errors[int(len(abs_errors) * 0.99) - 1]:.3f}cm "
+        f"cpu/ping={cpu / args.pings * 1000:.3f}ms "
+        f"thread-cpu={cpu / wall * 100:.1f}%"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare polling and edge-triggered ultrasonic echo timing."
+    )
+    parser.add_argument("--pings", type=int, default=300)
+    parser.add_argument("--distance", type=float, default=250.0)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--contention", action="store_true")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    if args.contention:
+        threading.Thread(target=busy, args=(stop,), daemon=True).start()
+
+    try:
+        run("polling", args)
+        run("edge", args)
+    finally:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import requests
+
+from http_client import DeliveryClient
+from http_server import CustomHTTPRequestHandler
+from http_server import start_server as start_receiver
+
+# Benchmark: alert delivery with and without connection reuse.
+# Runs the local http_server.py handler on an ephemeral port and
+# counts how many TCP connections each client opens.
+
+PAYLOAD = {
+    "sensorId": "sensor1",
+    "data": "Type:nx.base.Detection;Confidence:0.72;TimestampUs:0;"
+}
+
+
+class CountingHandler(CustomHTTPRequestHandler):
+    """http_server.py handler with a connection counter."""
+
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+
+def start_server():
+    return start_receiver(handler=CountingHandler)
+
+
+def run(label, post, url, count):
+    CountingHandler.connections = 0
+    latencies = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for _ in range(count):
+            t0 = time.perf_counter()
+            post(url, PAYLOAD)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"{label:12} requests={count} connections={CountingHandler.connections} "
+        f"p50={statistics.median(latencies):.3f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1]:.3f}ms "
+        f"rate={count / elapsed:.0f}/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare fresh-connection and pooled alert delivery."
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/alerts/from-nx"
+
+    def fresh(url, payload):
+        requests.post(url, json=payload, timeout=5).raise_for_status()
+
+    client = DeliveryClient()
+
+    try:
+        run("fresh-conn", fresh, url, args.requests)
+        run("pooled", client.post_json, url, args.requests)
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
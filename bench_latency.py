@@ -0,0 +1,578 @@
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Benchmark: end-to-end detection latency.
+# Runs the whole sensor manager on the sim backend against a local
+# http_server.py sink and measures how long it takes from the first
+# in-range sample (a radar "Range" line written to the UART, or the
+# falling edge of an ultrasonic echo) to the AI Box receiving the
+# "enter" alert. Each zone's target is moved in, the enter alert is
+# awaited, the target is moved out and the exit awaited, in cycles.
+#
+# Every pipeline stage is wrapped with a timer that records wall and
+# thread-CPU time excluding nested stages:
+#
+#   read         os.read on the radar ports, echo timing for ultrasonics
+#   parse        RangeParser.feed
+#   filter       SignalFilter.process
+#   range_check  DetectionPipeline.detect: range check, fusion, presence
+#   dispatch     send_alert(): building and queueing the alert
+#   http         the dispatcher's POSTs (including retries)
+#
+# The duty-* scenarios power each zone's radar and ultrasonic in
+# alternating windows ("duty_on"/"duty_off", the ultrasonic offset by
+# half a period). The target then arrives at a random point of the
+# period, after the wake hold of the previous cycle has run out, and
+# the latency from the move includes waiting for a window, warm-up and
+# the partner wake. The measured duty cycle is reported per scenario.
+#
+# The approach scenarios walk the target in from OUT_OF_RANGE at
+# "approach_speed" cm/s instead of moving it at once, and the latency
+# "from move" counts from when it crosses MAX_RANGE. adaptive-approach
+# runs the same with adaptive sampling; before the cycles, both
+# measure the CPU and samples of an empty scene for "idle_s" seconds.
+#
+# The manager keeps module-level state, so every scenario runs in its
+# own process with its own sensors.json and spool in a temp dir.
+# Results are printed as a table and written as JSON (--output).
+
+IN_RANGE = 300.0
+
+OUT_OF_RANGE = 700.0
+
+MAX_RANGE = 400.0
+
+SCENARIOS = {
+    "baseline": {},
+    "sensors-8": {"radars": 4, "ultrasonics": 4},
+    "sensors-16": {"radars": 8, "ultrasonics": 8},
+    "rate-100hz": {"radar_rate": 100.0, "ping_rate": 30.0},
+    "slow-server": {"server_delay": 0.2},
+    "failing-server": {"fail_rate": 0.5},
+    "duty-50": {"duty_on": 1.0, "duty_off": 1.0},
+    "duty-25": {"duty_on": 1.0, "duty_off": 3.0},
+    "duty-10": {"duty_on": 1.0, "duty_off": 9.0},
+    "approach": {"approach_speed": 150.0, "idle_s": 10.0},
+    "adaptive-approach": {
+        "approach_speed": 150.0,
+        "idle_s": 10.0,
+        "adaptive": {"idle_hz": 2.0, "hold": 1.0}
+    }
+}
+
+DEFAULTS = {
+    "radars": 1,
+    "ultrasonics": 1,
+    "radar_rate": 20.0,
+    "ping_rate": 15.0,
+    "server_delay": 0.0,
+    "fail_rate": 0.0,
+    "cycles": 20,
+    "clear_timeout": 0.5,
+    "enter_timeout": 10.0,
+    "duty_on": None,
+    "duty_off": 0.0,
+    "radar_warmup": 0.2,
+    "ultrasonic_warmup": 0.05,
+    "wake_hold": 1.0,
+    "approach_speed": None,
+    "idle_s": 0.0,
+    "adaptive": None
+}
+
+STAGES = ("read", "parse", "filter", "range_check", "dispatch", "http")
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize_ms(values_ns):
+    values = [value / 1e6 for value in values_ns]
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 3) if values else None,
+        "p99_ms": round(percentile(values, 0.99), 3) if values else None,
+        "max_ms": round(max(values), 3) if values else None
+    }
+
+
+# Stage Timers
+
+_active = threading.local()
+
+
+class StageTimer:
+    """Wraps callables and records (wall_ns, cpu_ns) per call.
+
+    Time spent in a nested timed call is charged to the inner stage
+    only, so range_check does not include the dispatch it triggers.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def wrap(self, func):
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            stack = getattr(_active, "stack", None)
+            if stack is None:
+                stack = _active.stack = []
+            stack.append([0, 0])
+            wall = time.perf_counter_ns()
+            cpu = time.thread_time_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                wall = time.perf_counter_ns() - wall
+                cpu = time.thread_time_ns() - cpu
+                child_wall, child_cpu = stack.pop()
+                if stack:
+                    stack[-1][0] += wall
+                    stack[-1][1] += cpu
+                self.calls.append((wall - child_wall, cpu - child_cpu))
+
+        return timed
+
+    def summary(self, elapsed):
+        calls = self.calls
+        wall_us = sorted(wall / 1e3 for wall, _ in calls)
+        cpu_ns = sum(cpu for _, cpu in calls)
+        return {
+            "calls": len(calls),
+            "p50_us": round(percentile(wall_us, 0.50), 1) if calls else None,
+            "p99_us": round(percentile(wall_us, 0.99), 1) if calls else None,
+            "max_us": round(wall_us[-1], 1) if calls else None,
+            "cpu_ms": round(cpu_ns / 1e6, 1),
+            "cpu_pct": round(cpu_ns / 1e9 / elapsed * 100, 2)
+        }
+
+
+class _TimedOS:
+    """Stands in for serial_mux's ``os`` module with a timed read."""
+
+    def __init__(self, timer):
+        self.read = timer.wrap(os.read)
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+
+# Targets
+
+class Target:
+    """A simulated target distance that remembers when it was sampled.
+
+    Passed as the distance callable of a VirtualRadar or simulated
+    echo. ``sampled`` is the perf_counter_ns of the first in-range
+    sample after ``move``: when the radar line was produced, or the
+    falling edge of the echo (set via ``echo_done``).
+    """
+
+    def __init__(self, echo=False):
+        self.distance = OUT_OF_RANGE
+        self.echo = echo
+        self.speed = None
+        self.started = None
+        self.moved = None
+        self.sampled = None
+        self._pending = False
+
+    def move(self, distance, speed=None):
+        """Move to ``distance`` at once, or walk there from
+        OUT_OF_RANGE at ``speed`` cm/s; ``moved`` is then when the
+        target crosses MAX_RANGE."""
+        self.sampled = None
+        self._pending = False
+        self.speed = speed
+        self.started = time.perf_counter_ns()
+        self.distance = distance
+        self.moved = self.started
+        if speed:
+            self.moved += int((OUT_OF_RANGE - MAX_RANGE) / speed * 1e9)
+
+    def current(self):
+        if not self.speed:
+            return self.distance
+        walked = self.speed * (time.perf_counter_ns() - self.started) / 1e9
+        return max(self.distance, OUT_OF_RANGE - walked)
+
+    def __call__(self):
+        moved = self.moved
+        distance = self.current()
+        if moved is not None and self.sampled is None and distance <= MAX_RANGE:
+            if self.echo:
+                self._pending = True
+            else:
+                self.sampled = time.perf_counter_ns()
+        return distance
+
+    def echo_done(self, fall_ns):
+        if self._pending and self.sampled is None:
+            self.sampled = fall_ns
+
+
+# Sink
+
+def start_sink(delay, fail_rate):
+    from http_server import CustomHTTPRequestHandler, start_server
+
+    received = []
+
+    class SinkHandler(CustomHTTPRequestHandler):
+        """http_server.py handler recording when each event arrived."""
+
+        def do_POST(self):
+            self.received_ns = time.perf_counter_ns()
+            super().do_POST()
+
+        def handle_events(self, box_id, events):
+            for event in events:
+                fields = dict(
+                    item.split(":", 1)
+                    for item in event.get("data", "").split(";")
+                    if ":" in item
+                )
+                received.append((self.received_ns, fields))
+
+    server = start_server(
+        handler=SinkHandler,
+        latency=delay,
+        error_rate=fail_rate
+    )
+    return server, received
+
+
+# Scenario Worker
+
+def sensor_layout(radars, ultrasonics):
+    sensors = {}
+    settings = {}
+    for i in range(max(radars, ultrasonics)):
+        zone = f"zone{i}"
+        if i < radars:
+            sensors[f"RD{i:03d}"] = {
+                "type": "radar",
+                "uart": f"/dev/ttyBENCH{i}",
+                "baudrate": 115200,
+                "power_pin": 100 + i,
+                "zone": zone
+            }
+        if i < ultrasonics:
+            sensors[f"US{i:03d}"] = {
+                "type": "ultrasonic",
+                "trig": 200 + 2 * i,
+                "echo": 201 + 2 * i,
+                "power_pin": 300 + i,
+                "crosstalk_group": zone,
+                "zone": zone
+            }
+    for sensor_id in sensors:
+        settings[sensor_id] = {"enabled": True, "min_range": 120, "max_range": MAX_RANGE}
+    return sensors, settings
+
+
+def wait_for(received, zone, event, since_wall_ns, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for received_ns, fields in list(received):
+            if (
+                fields.get("Zone") == zone
+                and fields.get("Event") == event
+                and int(fields.get("TimestampUs", 0)) * 1000 >= since_wall_ns
+            ):
+                return received_ns
+        time.sleep(0.002)
+    return None
+
+
+def run_scenario(name, params, data_dir):
+    sensors, settings = sensor_layout(params["radars"], params["ultrasonics"])
+    for sensor_id, sensor in sensors.items():
+        if sensor["type"] == "ultrasonic":
+            settings[sensor_id]["rate_hz"] = params["ping_rate"]
+        settings[sensor_id]["warmup"] = params[f"{sensor['type']}_warmup"]
+        if params["duty_on"]:
+            period = params["duty_on"] + params["duty_off"]
+            settings[sensor_id].update(
+                duty_on=params["duty_on"],
+                duty_off=params["duty_off"],
+                duty_offset=period / 2 if sensor["type"] == "ultrasonic" else 0.0
+            )
+
+    # Settings are validated against SENSORS, which is swapped for the
+    # bench layout after the import; start_manager() loads the file
+
+    config_file = os.path.join(data_dir, "sensors.json")
+
+    os.environ["SENSORBOX_DATA_DIR"] = data_dir
+    os.environ["SENSORBOX_SIM_DISTANCE"] = str(OUT_OF_RANGE)
+    os.environ["SENSORBOX_SIM_RADAR_RATE"] = str(params["radar_rate"])
+
+    import logging
+
+    # Before the manager's basicConfig, which then leaves it alone
+    logging.basicConfig(level=logging.CRITICAL)
+
+    import detection
+    import radar_parser
+    import radar_ultrasonic as manager
+    import serial_mux
+    import signal_filter
+
+    server, received = start_sink(params["server_delay"], params["fail_rate"])
+    manager.SERVER_URL = f"http://127.0.0.1:{server.server_address[1]}/api/alerts/from-nx"
+    manager.SENSORS.clear()
+    manager.SENSORS.update(sensors)
+
+    with open(config_file, "w") as f:
+        json.dump({
+            "sensorBoxId": "bench",
+            "sensors": settings,
+            "presence": {"clear_timeout": params["clear_timeout"]},
+            "wake_hold": params["wake_hold"],
+            "adaptive": params["adaptive"]
+        }, f)
+
+    timers = {stage: StageTimer(stage) for stage in STAGES}
+    serial_mux.os = _TimedOS(timers["read"])
+    manager.measure_distance = timers["read"].wrap(manager.measure_distance)
+    radar_parser.RangeParser.feed = timers["parse"].wrap(radar_parser.RangeParser.feed)
+    signal_filter.SignalFilter.process = timers["filter"].wrap(
+        signal_filter.SignalFilter.process
+    )
+    detection.DetectionPipeline.detect = timers["range_check"].wrap(
+        detection.DetectionPipeline.detect
+    )
+    manager.send_alert = timers["dispatch"].wrap(manager.send_alert)
+
+    manager.start_manager("sim")
+    manager.dispatcher.send = timers["http"].wrap(manager.dispatcher.send)
+    manager.dispatcher.send_batch = timers["http"].wrap(manager.dispatcher.send_batch)
+    hardware = manager.hardware
+
+    targets = {}
+    echo_targets = {}
+    for sensor_id, sensor in sensors.items():
+        target = Target(echo=sensor["type"] == "ultrasonic")
+        targets[sensor_id] = target
+        hardware.set_distance(sensor_id, target)
+        if target.echo:
+            echo_targets[sensor["echo"]] = target
+    hardware.gpio.on_echo = lambda echo, rise, fall: echo_targets[echo].echo_done(fall)
+
+    zones = {}
+    for sensor_id, sensor in sensors.items():
+        zones.setdefault(sensor["zone"], []).append(targets[sensor_id])
+
+    # Workers attach sensors on their first config poll
+    time.sleep(1.5)
+
+    # Adaptive sensors start at full rate until their hold runs out
+    settle = params["adaptive"]["hold"] + 0.5 if params["adaptive"] else 0.0
+
+    idle = None
+    if params["idle_s"]:
+        time.sleep(settle)
+        idle_lines = sum(radar.lines for radar in hardware.radars.values())
+        idle_pings = sum(stats["pings"] for stats in manager.ping_scheduler.stats().values())
+        idle_detects = len(timers["range_check"].calls)
+        idle_cpu = time.process_time()
+        time.sleep(params["idle_s"])
+        idle = {
+            "cpu_pct": round((time.process_time() - idle_cpu) / params["idle_s"] * 100, 2),
+            "radar_lines_per_s": round(
+                (sum(radar.lines for radar in hardware.radars.values()) - idle_lines)
+                / params["idle_s"], 1
+            ),
+            "pings_per_s": round(
+                (sum(stats["pings"] for stats in manager.ping_scheduler.stats().values())
+                 - idle_pings) / params["idle_s"], 1
+            ),
+            "detects_per_s": round(
+                (len(timers["range_check"].calls) - idle_detects) / params["idle_s"], 1
+            )
+        }
+
+    from_sample = []
+    from_move = []
+    lost = 0
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+
+    for _ in range(params["cycles"]):
+        if params["duty_on"]:
+            # Let the wake hold run out, then arrive at a random phase
+            time.sleep(
+                params["wake_hold"]
+                + random.uniform(0, params["duty_on"] + params["duty_off"])
+            )
+        # Every approach starts from an idle scene
+        time.sleep(settle)
+        since_wall_ns = time.time_ns()
+        for zone_targets in zones.values():
+            for target in zone_targets:
+                target.move(IN_RANGE, params["approach_speed"])
+
+        for zone, zone_targets in zones.items():
+            received_ns = wait_for(
+                received, zone, "enter", since_wall_ns, params["enter_timeout"]
+            )
+            if received_ns is None:
+                lost += 1
+                continue
+            sampled = [t.sampled for t in zone_targets if t.sampled is not None]
+            from_move.append(received_ns - min(t.moved for t in zone_targets))
+            if sampled:
+                from_sample.append(received_ns - min(sampled))
+
+        since_wall_ns = time.time_ns()
+        for zone_targets in zones.values():
+            for target in zone_targets:
+                target.move(OUT_OF_RANGE)
+        for zone in zones:
+            wait_for(
+                received, zone, "exit", since_wall_ns,
+                params["clear_timeout"] + params["enter_timeout"]
+            )
+
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    lines = sum(radar.lines for radar in hardware.radars.values())
+    pings = sum(stats["pings"] for stats in manager.ping_scheduler.stats().values())
+    dispatcher_stats = manager.dispatcher.stats()
+    duty_stats = manager.duty_cycler.stats()
+    wake_latencies = [
+        stats["wake_latency_s"] for stats in duty_stats.values()
+        if stats["wake_latency_s"] is not None
+    ]
+
+    manager.stop_manager()
+    server.shutdown()
+
+    return {
+        "scenario": name,
+        "params": params,
+        "zones": len(zones),
+        "elapsed_s": round(elapsed, 2),
+        "latency_from_sample": summarize_ms(from_sample),
+        "latency_from_move": summarize_ms(from_move),
+        "lost_enters": lost,
+        "samples_per_s": round((lines + pings) / elapsed, 1),
+        "alerts_per_s": round(dispatcher_stats["sent"] / elapsed, 2),
+        "cpu_pct": round(cpu / elapsed * 100, 1),
+        "idle": idle,
+        "duty": round(
+            sum(stats["duty"] for stats in duty_stats.values()) / len(duty_stats), 3
+        ),
+        "wakes": sum(stats["wakes"] for stats in duty_stats.values()),
+        "wake_latency_ms": round(
+            sum(wake_latencies) / len(wake_latencies) * 1000, 1
+        ) if wake_latencies else None,
+        "stages": {stage: timer.summary(elapsed) for stage, timer in timers.items()},
+        "dispatcher": dispatcher_stats
+    }
+
+
+def worker(args):
+    params = dict(DEFAULTS, **json.loads(args.params))
+    with tempfile.TemporaryDirectory() as data_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_scenario(args.worker, params, data_dir)
+    with open(args.result, "w") as f:
+        json.dump(result, f)
+
+
+# Driver
+
+def run(name, params):
+    with tempfile.NamedTemporaryFile(suffix=".json") as result:
+        subprocess.run(
+            [
+                sys.executable, os.path.abspath(__file__),
+                "--worker", name,
+                "--params", json.dumps(params),
+                "--result", result.name
+            ],
+            check=True
+        )
+        with open(result.name) as f:
+            return json.load(f)
+
+
+def report(result):
+    sample = result["latency_from_sample"]
+    move = result["latency_from_move"]
+    print(
+        f"{result['scenario']:15} zones={result['zones']} "
+        f"enters={sample['count']} lost={result['lost_enters']} "
+        f"p50={sample['p50_ms']}ms p99={sample['p99_ms']}ms max={sample['max_ms']}ms "
+        f"(from move p50={move['p50_ms']}ms) "
+        f"samples/s={result['samples_per_s']} cpu={result['cpu_pct']}% "
+        f"duty={result['duty'] * 100:.0f}% wakes={result['wakes']} "
+        f"(partner ready after {result['wake_latency_ms']}ms)"
+    )
+    idle = result["idle"]
+    if idle:
+        print(
+            f"    idle         cpu={idle['cpu_pct']}% radar lines/s={idle['radar_lines_per_s']} "
+            f"pings/s={idle['pings_per_s']} detects/s={idle['detects_per_s']}"
+        )
+    for stage, stats in result["stages"].items():
+        print(
+            f"    {stage:12} calls={stats['calls']:6} p50={stats['p50_us']}us "
+            f"p99={stats['p99_us']}us max={stats['max_us']}us "
+            f"cpu={stats['cpu_ms']}ms ({stats['cpu_pct']}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure sample-to-AI-Box latency through the sensor manager."
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", default=list(SCENARIOS),
+        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})"
+    )
+    parser.add_argument("--cycles", type=int, default=DEFAULTS["cycles"])
+    parser.add_argument("--output", default="bench_latency.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = []
+    for name in args.scenarios:
+        params = dict(SCENARIOS[name], cycles=args.cycles)
+        result = run(name, params)
+        report(result)
+        results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
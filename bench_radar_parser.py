@@ -0,0 +1,96 @@
+import argparse
+import random
+import time
+
+from radar_parser import RangeParser
+
+# Benchmark: radar UART parsing at full 115200-baud line rate.
+# Replays a synthetic "Range <n>" stream cut into random chunk sizes
+# (as ser.read(ser.in_waiting) returns them) through the old
+# decode + splitlines loop and through RangeParser.
+
+BAUD_BYTES_PER_S = 115200 / 10  # 8N1: 10 bits on the wire per byte
+
+
+def make_stream(lines, seed=1):
+    rng = random.Random(seed)
+    return b"".join(
+        f"Range {rng.randint(30, 800)}\r\n".encode() for _ in range(lines)
+    )
+
+
+def make_chunks(stream, max_chunk, seed=2):
+    rng = random.Random(seed)
+    chunks = []
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, max_chunk)
+        chunks.append(stream[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def legacy_parse(chunks):
+    # The pre-parser radar_worker loop, including its split-line losses.
+    count = 0
+    for data in chunks:
+        text = data.decode("utf-8", errors="ignore")
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("Range"):
+                parts = line.split()
+                if len(parts) >= 2:
+                    try:
+                        float(parts[1])
+                        count += 1
+                    except ValueError:
+                        pass
+    return count
+
+
+def parser_parse(chunks):
+    parser = RangeParser()
+    count = 0
+    for data in chunks:
+        count += len(parser.feed(data))
+    return count
+
+
+def bench(label, func, chunks, lines, stream_bytes):
+    started = time.perf_counter()
+    parsed = func(chunks)
+    elapsed = time.perf_counter() - started
+
+    wire_seconds = stream_bytes / BAUD_BYTES_PER_S
+    print(
+        f"{label:8} parsed={parsed}/{lines} "
+        f"lines/s={parsed / elapsed:,.0f} "
+        f"us/line={elapsed / lines * 1e6:.2f} "
+        f"cpu-at-line-rate={elapsed / wire_seconds * 100:.2f}%"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare radar stream parsers at 115200 baud line rate."
+    )
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--max-chunk", type=int, default=32)
+    args = parser.parse_args()
+
+    stream = make_stream(args.lines)
+    chunks = make_chunks(stream, args.max_chunk)
+
+    print(
+        f"{len(stream)} bytes in {len(chunks)} chunks, "
+        f"{len(stream) / BAUD_BYTES_PER_S:.1f}s of wire time at 115200 baud"
+    )
+
+    bench("legacy", legacy_parse, chunks, args.lines, len(stream))
+    bench("parser", parser_parse, chunks, args.lines, len(stream))
+
+
+if __name__ == "__main__":
+    main()
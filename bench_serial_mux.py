@@ -0,0 +1,93 @@
+import argparse
+import os
+import pty
+import threading
+import time
+import tty
+
+from serial_mux import SerialMultiplexer
+
+# Benchmark: one SerialMultiplexer reading many radars.
+# Each radar is a pty pair; the slave end is opened by the
+# multiplexer exactly like a real /dev/ttyUSBn, and a writer thread
+# feeds "Range <n>" lines into the master end.
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+    return master, slave, path
+
+
+def writer(master, rate, duration, stop):
+    interval = 1.0 / rate
+    deadline = time.monotonic() + duration
+    tick = time.monotonic()
+    n = 0
+    while not stop.is_set() and tick < deadline:
+        os.write(master, f"Range {100 + n % 500}\r\n".encode())
+        n += 1
+        tick += interval
+        delay = tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure idle and loaded CPU of the serial multiplexer."
+    )
+    parser.add_argument("--ports", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=100.0, help="lines/s per port")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ptys = [open_pty() for _ in range(args.ports)]
+    received = {}
+
+    def on_samples(sensor_id, samples):
+        received[sensor_id] = received.get(sensor_id, 0) + len(samples)
+
+    mux = SerialMultiplexer()
+    for i, (_, _, path) in enumerate(ptys):
+        mux.add(f"RD{i + 1:03d}", path, 115200, on_samples)
+    mux.start()
+
+    # Idle: ports open, nothing written.
+    time.sleep(0.5)
+    cpu0 = time.process_time()
+    time.sleep(args.duration)
+    idle_cpu = (time.process_time() - cpu0) / args.duration * 100
+
+    # Loaded: every port streams at --rate.
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=writer, args=(master, args.rate, args.duration, stop))
+        for master, _, _ in ptys
+    ]
+    cpu0 = time.process_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(0.2)
+    loaded_cpu = (time.process_time() - cpu0) / args.duration * 100
+
+    mux.stop(timeout=2)
+    for master, slave, _ in ptys:
+        os.close(master)
+        os.close(slave)
+
+    expected = int(args.rate * args.duration)
+    total = sum(received.values())
+    print(f"ports={args.ports} rate={args.rate:g}/s per port duration={args.duration:g}s")
+    print(f"idle cpu={idle_cpu:.2f}%")
+    print(
+        f"loaded cpu={loaded_cpu:.2f}% (includes writer threads) "
+        f"samples={total}/{expected * args.ports}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import time
+
+import numpy as np
+
+from signal_filter import SignalFilter
+
+# Benchmark: signal filter cost per sample against batch size.
+# A radar read delivers several samples at once; the filter's Python
+# overhead is per batch, so the per-sample cost should fall as the
+# batch (and therefore the sample rate) grows.
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure SignalFilter cost per sample by batch size."
+    )
+    parser.add_argument("--samples", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    data = rng.normal(300, 5, args.samples)
+    data[rng.integers(0, args.samples, args.samples // 100)] = 790  # glitches
+
+    for batch in (1, 4, 16, 64, 256):
+        f = SignalFilter(median=5, ema_alpha=0.4, outlier_k=4)
+        started = time.perf_counter()
+        for start in range(0, args.samples, batch):
+            f.process(data[start:start + batch])
+        elapsed = time.perf_counter() - started
+        print(
+            f"batch={batch:4} us/sample={elapsed / args.samples * 1e6:7.2f} "
+            f"rejected={f.rejected}"
+        )
+
+
+if __name__ == "__main__":
+    main()
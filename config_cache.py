@@ -0,0 +1,321 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from types import MappingProxyType
+
+# Snapshot Freezing
+# Workers share one snapshot between threads, so it is made
+# read-only: dicts become mappingproxy, lists become tuples.
+
+def freeze(value):
+
+    if isinstance(value, dict):
+
+        return MappingProxyType(
+            {key: freeze(item) for key, item in value.items()}
+        )
+
+    if isinstance(value, (list, tuple)):
+
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
+def thaw(value):
+    """A mutable deep copy of a frozen snapshot."""
+
+    if isinstance(value, MappingProxyType):
+
+        return {key: thaw(item) for key, item in value.items()}
+
+    if isinstance(value, tuple):
+
+        return [thaw(item) for item in value]
+
+    return value
+
+
+# Atomic Writes
+# The file is written next to the target, synced and renamed over it,
+# so a reader sees either the old or the new config, never half of
+# one.
+
+def write_json_atomic(path, data):
+
+    directory = os.path.dirname(os.path.abspath(path))
+
+    fd, temp_path = tempfile.mkstemp(
+        prefix="." + os.path.basename(path) + ".",
+        dir=directory
+    )
+
+    try:
+
+        with os.fdopen(fd, "w") as f:
+
+            json.dump(data, f, indent=4)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+
+        os.replace(temp_path, path)
+
+    except BaseException:
+
+        try:
+            os.unlink(temp_path)
+
+        except OSError:
+            pass
+
+        raise
+
+
+# Config Cache
+
+class ConfigCache:
+    """Change-driven cache of a JSON config file.
+
+    The file is only re-read when its (inode, mtime, size) signature
+    changes. Readers get an immutable snapshot and a generation counter
+    that is bumped on every successful reload, so the per-sample cost is
+    a single attribute read.
+
+    update() changes the config in-process: the file is rewritten
+    atomically and the new snapshot is live at once. Workers blocked in
+    wait() wake on any new generation instead of polling.
+
+    With a ``schema`` (migrate(data) and compile(data), see
+    sensor_registry.py) every load is migrated to the current shape
+    and compiled into ``compiled``. A file that fails to compile is
+    rejected like an unreadable one; at startup that is an error, since
+    there is no good config to keep.
+    """
+
+    def __init__(self, path, default=None, poll_interval=1.0, schema=None):
+
+        self.path = path
+        self.default = default
+        self.poll_interval = poll_interval
+        self.schema = schema
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._signature = None
+        self._failed_signature = None
+        self._snapshot = freeze(default or {})
+        self._generation = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.compiled = None
+        self.reload_errors = 0
+
+        self.refresh(strict=schema is not None)
+
+    @property
+    def generation(self):
+
+        return self._generation
+
+    def snapshot(self):
+
+        return self._snapshot
+
+    def _stat_signature(self):
+
+        try:
+            st = os.stat(self.path)
+
+        except FileNotFoundError:
+            return None
+
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _write_default(self):
+
+        write_json_atomic(self.path, self.default)
+
+    def _compile(self, data):
+
+        if self.schema is None:
+            return data, None
+
+        data = self.schema.migrate(data)
+
+        return data, self.schema.compile(data)
+
+    def _publish(self, signature, data, compiled):
+
+        # Called with the lock held
+
+        self._signature = signature
+        self._snapshot = freeze(data)
+        self.compiled = compiled
+        self._generation += 1
+
+        self._changed.notify_all()
+
+    def refresh(self, strict=False):
+        """Reload the file if it changed. Returns True on a new snapshot.
+        With ``strict`` a file that cannot be loaded raises."""
+
+        with self._lock:
+
+            signature = self._stat_signature()
+
+            if signature is None and self.default is not None:
+
+                self._write_default()
+
+                signature = self._stat_signature()
+
+            if signature is None or signature in (self._signature, self._failed_signature):
+
+                return False
+
+            try:
+
+                with open(self.path, "r") as f:
+                    loaded = json.load(f)
+
+                data, compiled = self._compile(loaded)
+
+            except (OSError, ValueError) as e:
+
+                if strict:
+                    raise
+
+                # A half-written or invalid file is not an error worth
+                # dying for: keep serving the last good snapshot until
+                # the file changes again.
+
+                self._failed_signature = signature
+
+                self.reload_errors += 1
+
+                logging.warning(
+                    f"Config reload failed, keeping generation "
+                    f"{self._generation}: {e}"
+                )
+
+                return False
+
+            if data != loaded:
+
+                write_json_atomic(self.path, data)
+
+                signature = self._stat_signature()
+
+                logging.info("Config migrated to the current format")
+
+            self._publish(signature, data, compiled)
+
+            logging.info(
+                f"Config loaded (generation {self._generation})"
+            )
+
+            return True
+
+    def update(self, change):
+        """Apply ``change(config)`` to a copy of the current config,
+        persist it and publish it. Returns the new generation."""
+
+        # Pick up a hand edit first so it is not overwritten
+
+        self.refresh()
+
+        with self._lock:
+
+            data = thaw(self._snapshot)
+
+            change(data)
+
+            # Raises before anything is written if the change is invalid
+
+            data, compiled = self._compile(data)
+
+            write_json_atomic(self.path, data)
+
+            self._publish(self._stat_signature(), data, compiled)
+
+            logging.info(
+                f"Config updated (generation {self._generation})"
+            )
+
+            return self._generation
+
+    def wait(self, generation, timeout=None):
+        """Block until the generation differs from ``generation`` or
+        ``timeout`` passes. Returns the current generation."""
+
+        with self._changed:
+
+            self._changed.wait_for(
+                lambda: self._generation != generation,
+                timeout
+            )
+
+            return self._generation
+
+    # Background Polling
+
+    def _poll_loop(self):
+
+        while not self._stop.wait(self.poll_interval):
+
+            try:
+                self.refresh()
+
+            except Exception as e:
+                logging.error(f"Config poll error : {e}")
+
+    def start(self):
+
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self._poll_loop,
+            name="config-cache",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self):
+
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Static Config
+
+class StaticConfig:
+    """A fixed snapshot with the ConfigCache interface, e.g. for replay."""
+
+    generation = 1
+
+    def __init__(self, data, schema=None):
+
+        if schema is not None:
+            data = schema.migrate(data)
+
+        self._snapshot = freeze(data)
+
+        self.compiled = schema.compile(data) if schema is not None else None
+
+    def snapshot(self):
+
+        return self._snapshot
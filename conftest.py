@@ -0,0 +1,2 @@
+# Puts the repository root on sys.path, so a plain `pytest` finds the
+# modules under test.
@@ -0,0 +1,214 @@
+import collections
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+# Control Socket
+# A local Unix-domain socket for changing and inspecting a running
+# sensor manager. Requests and replies are one JSON object per line:
+#
+#   {"command": "status"}
+#   {"command": "on", "sensor": "RD001"}
+#   {"command": "range", "sensor": "RD001", "min": 120, "max": 400}
+#
+# and the reply is {"ok": true, ...} or {"ok": false, "error": "..."}.
+# Commands are plain functions called with the request's other fields
+# as keyword arguments; ValueError, KeyError and TypeError (a missing
+# or unexpected field) become error replies.
+#
+# Anyone who can open the socket file (mode 0660) can send commands.
+
+CONTROL_TIMEOUT = 2.0
+
+RATE_WINDOW = 5.0
+
+
+class LiveRates:
+    """Rates of growing counters over the last ``window`` seconds.
+
+    ``read_counts`` returns {key: count}. The control server samples it
+    twice a second, so a rate is always at hand without touching the
+    code that bumps the counters.
+    """
+
+    def __init__(self, read_counts, window=RATE_WINDOW):
+
+        self.read_counts = read_counts
+        self.window = window
+
+        self._history = collections.deque()
+        self._lock = threading.Lock()
+
+    def sample(self):
+
+        now = time.monotonic()
+
+        counts = self.read_counts()
+
+        with self._lock:
+
+            self._history.append((now, counts))
+
+            # Keep the newest sample at least `window` old as the base
+
+            while len(self._history) > 2 and now - self._history[1][0] >= self.window:
+                self._history.popleft()
+
+    def rates(self):
+
+        self.sample()
+
+        with self._lock:
+            (then, old), (now, new) = self._history[0], self._history[-1]
+
+        elapsed = now - then
+
+        return {
+            key: round((count - old.get(key, 0)) / elapsed, 2) if elapsed > 0 else None
+            for key, count in new.items()
+        }
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+
+        for line in self.rfile:
+
+            if not line.strip():
+                continue
+
+            reply = self.server.execute(line)
+
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class ControlServer(socketserver.ThreadingUnixStreamServer):
+    """Runs ``commands`` ({name: function}) for socket clients."""
+
+    daemon_threads = True
+
+    def __init__(self, path, commands, rates=None):
+
+        self.path = path
+        self.commands = commands
+        self.rates = rates
+
+        _remove_stale_socket(path)
+
+        super().__init__(path, ControlHandler)
+
+        os.chmod(path, 0o660)
+
+    def execute(self, line):
+
+        try:
+
+            request = json.loads(line)
+
+            name = request.pop("command")
+
+        except (ValueError, KeyError, AttributeError, TypeError):
+            return {"ok": False, "error": "Bad request"}
+
+        command = self.commands.get(name)
+
+        if command is None:
+            return {"ok": False, "error": f"Unknown command {name}"}
+
+        try:
+            result = command(**request)
+
+        except (ValueError, KeyError, TypeError) as e:
+            return {"ok": False, "error": str(e.args[0] if e.args else e)}
+
+        except Exception as e:
+
+            logging.error(f"Control command {name} failed: {e}")
+
+            return {"ok": False, "error": f"{name} failed: {e}"}
+
+        return {"ok": True, **(result or {})}
+
+    def service_actions(self):
+
+        # Called by serve_forever() every poll interval (0.5 s)
+
+        if self.rates is not None:
+            self.rates.sample()
+
+    def server_close(self):
+
+        super().server_close()
+
+        try:
+            os.unlink(self.path)
+
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(path):
+
+    if not os.path.exists(path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+
+        probe.connect(path)
+
+    except OSError:
+
+        # Left behind by a manager that did not shut down cleanly
+
+        os.unlink(path)
+
+        return
+
+    finally:
+        probe.close()
+
+    raise OSError(f"{path} is in use by a running manager")
+
+
+def start_control_server(path, commands, rates=None):
+    """Serve ``commands`` on the Unix socket ``path`` from a daemon thread."""
+
+    server = ControlServer(path, commands, rates)
+
+    threading.Thread(
+        target=server.serve_forever,
+        name="control-socket",
+        daemon=True
+    ).start()
+
+    logging.info(f"Control socket on {path}")
+
+    return server
+
+
+def send_command(path, command, timeout=CONTROL_TIMEOUT, **fields):
+    """Send one command and return the reply. Raises OSError when no
+    manager is listening on ``path``."""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+
+        client.settimeout(timeout)
+
+        client.connect(path)
+
+        client.sendall((json.dumps({"command": command, **fields}) + "\n").encode("utf-8"))
+
+        with client.makefile("rb") as reply:
+            line = reply.readline()
+
+    if not line:
+        raise ConnectionError(f"No reply from {path}")
+
+    return json.loads(line)
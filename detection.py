@@ -0,0 +1,278 @@
+import logging
+import threading
+
+from fusion import SOLO_CONFIDENCE, FusionEngine
+from presence import ENTER, PresenceTracker
+from signal_filter import SignalFilter
+
+# Detection Pipeline
+# Distances from every sensor go through the same steps:
+#
+#   filter       the sensor's SignalFilter, from its "filter" settings
+#   range check  the sensor's "min_range" / "max_range"
+#   fusion       samples of sensors sharing a "zone" are correlated
+#                into one detection whose confidence reflects how well
+#                they agree
+#   presence     the zone, not each sensor, tracks presence: one
+#                "enter" and one "exit" per intrusion (plus optional
+#                heartbeats)
+#
+# In a zone of several sensors "enter" is held until every partner has
+# reported a sample taken after the first hit, or the fusion skew has
+# passed, and its detection is rescored then, so the partner's view of
+# the same moment counts towards its confidence. It goes out with the
+# zone's first sample or expire() after that, or before any later event
+# of the zone.
+#
+# Top-level "fusion" and "presence" settings tune the last two. A
+# sensor without a zone is its own zone.
+#
+# Radar samples, ultrasonic pings and the supervisor's expiry checks
+# arrive on different threads, so every entry point holds the
+# pipeline's lock. on_event and on_hit run under it and must not
+# block.
+#
+# Settings come from the SensorRegistry compiled by a ConfigCache (or
+# StaticConfig) with a SensorSchema: each sample reads the sensor's
+# SensorConfig attributes, and fusion and presence are reconfigured
+# only when a new registry is published. Presence events go to
+# ``on_event(zone, event, confidence, sensors)``, and every batch with
+# an in-range sample to ``on_hit(sensor_id, timestamp)`` (the sensor
+# manager wakes duty-cycled sensors with it). The sensor manager
+# drives the pipeline with live samples and the replay tool with
+# recorded ones.
+
+
+class DetectionPipeline:
+    """Filter, range check, fusion and presence for a set of sensors."""
+
+    def __init__(self, sensors, config, on_event, on_hit=None):
+
+        self.sensors = sensors
+        self.config = config
+        self.on_event = on_event
+        self.on_hit = on_hit
+
+        self.zones = {}
+        self._engines = {}
+        self._trackers = {}
+        self._last_detections = {}
+        self._pending = {}
+
+        self._filters = {}
+        self._registry = None
+
+        self._lock = threading.RLock()
+
+        self.build_zones()
+
+    def build_zones(self):
+        """Rebuild the zone tables from ``sensors``."""
+
+        with self._lock:
+
+            self.zones.clear()
+            self._engines.clear()
+            self._trackers.clear()
+            self._last_detections.clear()
+            self._pending.clear()
+
+            for sensor_id in self.sensors:
+
+                self.zones.setdefault(self.zone_of(sensor_id), []).append(sensor_id)
+
+            for zone, sensor_ids in self.zones.items():
+
+                self._engines[zone] = FusionEngine(sensor_ids)
+
+                self._trackers[zone] = PresenceTracker()
+
+            self._registry = None
+
+    def zone_of(self, sensor_id):
+
+        return self.sensors[sensor_id].get("zone", sensor_id)
+
+    # Settings
+
+    def _refresh(self):
+        """The current registry, reconfiguring fusion and presence when
+        a new one has been published."""
+
+        registry = self.config.compiled
+
+        if registry is self._registry:
+            return registry
+
+        self._registry = registry
+
+        for engine in self._engines.values():
+
+            engine.configure(
+                skew=registry.fusion_skew,
+                tolerance=registry.fusion_tolerance
+            )
+
+        for tracker in self._trackers.values():
+            tracker.configure_from(registry.presence)
+
+        return registry
+
+    def sensor_range(self, sensor_id):
+
+        with self._lock:
+
+            sensor = self._refresh().sensors[sensor_id]
+
+            return sensor.min_range, sensor.max_range
+
+    def sensor_filter(self, sensor):
+        """The sensor's filter, rebuilt only when its settings change,
+        so its history survives other edits."""
+
+        entry = self._filters.get(sensor.sensor_id)
+
+        if entry is None or entry[0] != sensor.filter:
+
+            entry = (sensor.filter, SignalFilter.from_config(sensor.filter))
+
+            self._filters[sensor.sensor_id] = entry
+
+        return entry[1]
+
+    # Samples
+
+    def sample(self, sensor_id, distances, timestamp):
+        """Feed raw distances (cm) taken by one sensor at ``timestamp``."""
+
+        with self._lock:
+
+            sensor = self._refresh().sensors[sensor_id]
+
+            filtered = self.sensor_filter(sensor).process(distances)
+
+            self.detect(sensor_id, filtered, sensor.min_range, sensor.max_range, timestamp)
+
+    def no_echo(self, sensor_id, timestamp):
+        """A ping without an echo: only the zone's clear timeout runs."""
+
+        with self._lock:
+
+            self.expire(timestamp, (self.zone_of(sensor_id),))
+
+    def expire(self, timestamp, zones=None):
+        """Check clear timeouts, e.g. while a sensor is not reporting."""
+
+        with self._lock:
+
+            self._refresh()
+
+            for zone in self.zones if zones is None else zones:
+
+                event = self._trackers[zone].expire(timestamp)
+
+                self._emit(zone, event, timestamp)
+
+    def detect(self, sensor_id, distances, min_range, max_range, timestamp):
+
+        with self._lock:
+
+            self._refresh()
+
+            zone = self.zone_of(sensor_id)
+
+            if len(distances):
+
+                logging.debug(
+                    f"{sensor_id}"
+                    f" Distance="
+                    f"{distances[-1]:.2f}"
+                )
+
+                in_range = distances[
+                    (distances >= min_range) & (distances <= max_range)
+                ]
+
+                hit = len(in_range) > 0
+
+                detection = self._engines[zone].add(
+                    sensor_id,
+                    timestamp,
+                    float(in_range[-1] if hit else distances[-1]),
+                    hit
+                )
+
+                if detection is not None:
+                    self._last_detections[zone] = detection
+
+                if hit and self.on_hit is not None:
+                    self.on_hit(sensor_id, timestamp)
+
+            event = self._trackers[zone].update(
+                distances,
+                min_range,
+                max_range,
+                timestamp
+            )
+
+            self._emit(zone, event, timestamp)
+
+    # Events
+
+    def _emit(self, zone, event, timestamp):
+        """Report ``event`` (or nothing) at ``timestamp``, releasing a
+        held "enter" first once it is due."""
+
+        self._release(zone, timestamp, force=event is not None)
+
+        if event is None:
+            return
+
+        if event.kind == ENTER and len(self.zones[zone]) > 1:
+            self._pending[zone] = (event, self._last_detections.get(zone))
+
+        else:
+            self._report(zone, event)
+
+    def _release(self, zone, timestamp, force=False):
+
+        pending = self._pending.get(zone)
+
+        if pending is None:
+            return
+
+        event, detection = pending
+
+        engine = self._engines[zone]
+
+        if (
+            not force
+            and timestamp < event.timestamp + engine.skew
+            and not engine.caught_up(event.timestamp)
+        ):
+            return
+
+        if self._pending.pop(zone, None) is None:
+            return
+
+        if detection is not None:
+            detection = engine.rescore(detection)
+
+        self._report(zone, event, detection)
+
+    def _report(self, zone, event, detection=None):
+
+        if detection is None:
+            detection = self._last_detections.get(zone)
+
+        confidence = detection.confidence if detection else SOLO_CONFIDENCE
+
+        sensors = detection.sensors if detection else tuple(self.zones[zone])
+
+        logging.info(
+            f"{zone} {event.kind.upper()} "
+            f"{event.distance:.2f} after {event.duration:.1f}s "
+            f"confidence={confidence} sensors={'+'.join(sensors)}"
+        )
+
+        self.on_event(zone, event, confidence, sensors)
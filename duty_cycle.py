@@ -0,0 +1,333 @@
+import threading
+import time
+
+# Duty Cycling
+# Battery and solar boxes cannot keep every sensor powered and
+# sampling all the time. The DutyCycler owns the power pins:
+#
+#   window   a sensor with "duty_on" and "duty_off" is powered for
+#            duty_on seconds of every duty_on + duty_off, starting
+#            "duty_offset" seconds into the period (offsets let the
+#            sensors of a zone take turns); without them it stays on
+#   warm-up  samples are not trusted until "warmup" seconds after
+#            power-up, whatever powered the sensor
+#   wake     a trusted in-range sample powers every sensor of its zone
+#            at once, and keeps them powered until "wake_hold" seconds
+#            after the last one, so the partner sensor confirms the
+#            detection and the exit is seen by a powered sensor
+#
+# ``set_power(sensor_id, powered)`` switches a sensor. One thread
+# sleeps until the next window edge; wakes are applied directly on the
+# sample thread. stats() reports the measured duty cycle and how long
+# woken sensors took to deliver their first trusted sample.
+
+
+class _Sensor:
+
+    def __init__(self, sensor_id, zone, registered):
+
+        self.sensor_id = sensor_id
+        self.zone = zone
+
+        self.duty_on = None
+        self.duty_off = 0.0
+        self.duty_offset = 0.0
+        self.warmup = 0.0
+
+        self.powered = False
+        self.powered_at = None
+        self.trusted_at = None
+        self.awake_until = 0.0
+        self.woken_at = None
+
+        self.registered = registered
+        self.powered_s = 0.0
+        self.power_ups = 0
+        self.wakes = 0
+        self.untrusted = 0
+        self.wake_latency_s = 0.0
+        self.wake_samples = 0
+
+    def window(self, now, epoch):
+        """(in the on-window, time of the next window edge or None)."""
+
+        if self.duty_on is None:
+            return True, None
+
+        period = self.duty_on + self.duty_off
+
+        phase = (now - epoch - self.duty_offset) % period
+
+        if phase < self.duty_on:
+            return True, now + self.duty_on - phase
+
+        return False, now + period - phase
+
+    def on_time(self, now):
+
+        if self.powered:
+            return self.powered_s + now - self.powered_at
+
+        return self.powered_s
+
+
+class DutyCycler:
+    """Powers sensors in on/off windows, wakes zone partners on a hit."""
+
+    # Sleep at least this long between window edges, so rounding at an
+    # edge cannot spin the thread
+
+    MIN_SLEEP = 0.001
+
+    def __init__(self, set_power, wake_hold=5.0):
+
+        self.set_power = set_power
+        self.wake_hold = wake_hold
+
+        self.epoch = time.monotonic()
+
+        self._sensors = {}
+        self._zones = {}
+        self._wake = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    # Sensors
+
+    def add(self, sensor_id, zone, warmup=0.0, duty_on=None, duty_off=0.0, duty_offset=0.0):
+        """Register a sensor, or change its settings; its power follows
+        at once."""
+
+        now = time.monotonic()
+
+        with self._wake:
+
+            sensor = self._sensors.get(sensor_id)
+
+            new = sensor is None or sensor.zone != zone
+
+            if new:
+
+                self._remove(sensor_id, now)
+
+                sensor = self._sensors[sensor_id] = _Sensor(sensor_id, zone, now)
+
+                self._zones.setdefault(zone, []).append(sensor)
+
+            sensor.warmup = warmup
+            sensor.duty_on = duty_on if duty_on and duty_off > 0 else None
+            sensor.duty_off = duty_off
+            sensor.duty_offset = duty_offset
+
+            self._apply(sensor, now)
+
+            # Whatever state the pin was left in, a new sensor starting
+            # outside its window is switched off explicitly
+
+            if new and not sensor.powered:
+                self.set_power(sensor_id, False)
+
+            self._wake.notify()
+
+    def remove(self, sensor_id):
+        """Unregister a sensor and switch it off."""
+
+        with self._wake:
+            self._remove(sensor_id, time.monotonic())
+
+    def _remove(self, sensor_id, now):
+
+        sensor = self._sensors.pop(sensor_id, None)
+
+        if sensor is None:
+            return
+
+        self._zones[sensor.zone].remove(sensor)
+
+        if not self._zones[sensor.zone]:
+            del self._zones[sensor.zone]
+
+        if sensor.powered:
+            self._switch(sensor, False, now)
+
+    # Power
+
+    def _switch(self, sensor, powered, now):
+
+        self.set_power(sensor.sensor_id, powered)
+
+        sensor.powered = powered
+
+        if powered:
+
+            sensor.powered_at = now
+            sensor.trusted_at = now + sensor.warmup
+            sensor.power_ups += 1
+
+        else:
+
+            sensor.powered_s += now - sensor.powered_at
+            sensor.powered_at = None
+            sensor.trusted_at = None
+            sensor.woken_at = None
+
+    def _apply(self, sensor, now):
+        """Switch ``sensor`` as its window and wake hold want; returns
+        when that next needs checking (None: never)."""
+
+        in_window, edge = sensor.window(now, self.epoch)
+
+        awake = now < sensor.awake_until
+
+        if awake:
+            edge = sensor.awake_until if edge is None else min(edge, sensor.awake_until)
+
+        wanted = in_window or awake
+
+        if wanted != sensor.powered:
+            self._switch(sensor, wanted, now)
+
+        return edge
+
+    # Samples
+
+    def trusted(self, sensor_id, timestamp):
+        """Whether a sample taken at ``timestamp`` (monotonic) counts:
+        the sensor is registered, powered and warmed up."""
+
+        sensor = self._sensors.get(sensor_id)
+
+        if sensor is None:
+            return False
+
+        trusted_at = sensor.trusted_at
+
+        if trusted_at is None or timestamp < trusted_at:
+
+            sensor.untrusted += 1
+
+            return False
+
+        if sensor.woken_at is not None:
+
+            with self._wake:
+
+                if sensor.woken_at is not None:
+
+                    sensor.wake_latency_s += timestamp - sensor.woken_at
+                    sensor.wake_samples += 1
+
+                    sensor.woken_at = None
+
+        return True
+
+    def hit(self, sensor_id, timestamp):
+        """A trusted in-range sample: wake the sensor's zone."""
+
+        sensor = self._sensors.get(sensor_id)
+
+        if sensor is None:
+            return
+
+        awake_until = timestamp + self.wake_hold
+
+        with self._wake:
+
+            now = time.monotonic()
+
+            woken = False
+
+            for partner in self._zones.get(sensor.zone, ()):
+
+                partner.awake_until = max(partner.awake_until, awake_until)
+
+                if not partner.powered:
+
+                    self._switch(partner, True, now)
+
+                    partner.woken_at = timestamp
+                    partner.wakes += 1
+
+                    woken = True
+
+            # A longer hold on a powered sensor is picked up at its next
+            # edge; a woken one needs its switch-off planned
+
+            if woken:
+                self._wake.notify()
+
+    # Thread
+
+    def _run(self):
+
+        with self._wake:
+
+            while not self._stop:
+
+                now = time.monotonic()
+
+                edges = [
+                    edge for edge in (
+                        self._apply(sensor, now)
+                        for sensor in list(self._sensors.values())
+                    )
+                    if edge is not None
+                ]
+
+                if edges:
+                    self._wake.wait(max(min(edges) - now, self.MIN_SLEEP))
+
+                else:
+                    self._wake.wait()
+
+    def start(self):
+
+        if self._thread is not None:
+            return
+
+        self._stop = False
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="duty-cycle",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self, timeout=None):
+
+        with self._wake:
+
+            self._stop = True
+
+            self._wake.notify()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Stats
+
+    def stats(self):
+
+        now = time.monotonic()
+
+        with self._wake:
+
+            return {
+                sensor_id: {
+                    "powered": sensor.powered,
+                    "powered_s": round(sensor.on_time(now), 1),
+                    "duty": round(
+                        sensor.on_time(now) / (now - sensor.registered), 3
+                    ) if now > sensor.registered else 1.0,
+                    "power_ups": sensor.power_ups,
+                    "wakes": sensor.wakes,
+                    "untrusted_samples": sensor.untrusted,
+                    "wake_latency_s": round(
+                        sensor.wake_latency_s / sensor.wake_samples, 3
+                    ) if sensor.wake_samples else None
+                }
+                for sensor_id, sensor in self._sensors.items()
+            }
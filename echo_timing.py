@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+
+# Ultrasonic Echo Timing
+# HC-SR04 / AJ-SR04 report distance as the width of the echo pulse.
+# The edge-driven timer lets the GPIO library call us on the rising
+# and falling edges and stamps them with perf_counter_ns, so the
+# measuring thread sleeps instead of spinning on GPIO.input. Where
+# edge detection is unavailable the polling timer is used instead,
+# still on the monotonic perf_counter_ns clock rather than
+# time.time().
+#
+# `gpio` is anything with the RPi.GPIO interface: the RPi.GPIO
+# module itself or gpio_sim.SimulatedGPIO.
+
+CM_PER_SECOND = 17150  # half the speed of sound: out and back
+
+ECHO_TIMEOUT = 0.02
+
+MIN_DISTANCE = 2
+
+MAX_DISTANCE = 800
+
+
+def trigger(gpio, trig):
+
+    gpio.output(trig, gpio.HIGH)
+    time.sleep(0.00001)
+    gpio.output(trig, gpio.LOW)
+
+
+def pulse_to_distance(duration_ns):
+
+    distance = duration_ns * CM_PER_SECOND / 1e9
+
+    if distance < MIN_DISTANCE or distance > MAX_DISTANCE:
+
+        return -1
+
+    return distance
+
+
+# Polling Timer
+
+class PollingEchoTimer:
+    """Busy-waits on the echo pin. Works everywhere, costs a core."""
+
+    mode = "polling"
+
+    def __init__(self, gpio, trig, echo, timeout=ECHO_TIMEOUT):
+
+        self.gpio = gpio
+        self.trig = trig
+        self.echo = echo
+        self.timeout_ns = int(timeout * 1e9)
+
+        self.timeouts = 0
+
+    def measure(self):
+
+        gpio = self.gpio
+        echo = self.echo
+        clock = time.perf_counter_ns
+
+        trigger(gpio, self.trig)
+
+        pulse_start = clock()
+        deadline = pulse_start + self.timeout_ns
+
+        while gpio.input(echo) == 0:
+
+            pulse_start = clock()
+
+            if pulse_start > deadline:
+
+                self.timeouts += 1
+
+                return -1
+
+        deadline = pulse_start + self.timeout_ns
+
+        while gpio.input(echo) == 1:
+
+            if clock() > deadline:
+
+                self.timeouts += 1
+
+                return -1
+
+        return pulse_to_distance(clock() - pulse_start)
+
+    def close(self):
+
+        pass
+
+
+# Edge Timer
+
+class EdgeEchoTimer:
+    """Times the echo pulse from GPIO edge callbacks.
+
+    Raises RuntimeError from the constructor if the GPIO backend cannot
+    do edge detection on the echo pin.
+    """
+
+    mode = "edge"
+
+    def __init__(self, gpio, trig, echo, timeout=ECHO_TIMEOUT):
+
+        self.gpio = gpio
+        self.trig = trig
+        self.echo = echo
+        self.timeout = timeout
+
+        self._done = threading.Event()
+        self._rise = None
+        self._fall = None
+        self._armed = False
+
+        self.timeouts = 0
+
+        gpio.add_event_detect(echo, gpio.BOTH, callback=self._on_edge)
+
+    def _on_edge(self, channel):
+
+        stamp = time.perf_counter_ns()
+
+        if not self._armed:
+            return
+
+        # The callback is not told which edge fired, so order decides:
+        # the first edge after the trigger is rising, the next falling.
+
+        if self._rise is None:
+
+            self._rise = stamp
+
+        else:
+
+            self._fall = stamp
+            self._armed = False
+            self._done.set()
+
+    def measure(self):
+
+        self._rise = None
+        self._fall = None
+        self._done.clear()
+        self._armed = True
+
+        trigger(self.gpio, self.trig)
+
+        # Worst case is a full timeout waiting for the rise plus a full
+        # timeout for the pulse itself.
+
+        if not self._done.wait(self.timeout * 2):
+
+            self._armed = False
+            self.timeouts += 1
+
+            return -1
+
+        duration = self._fall - self._rise
+
+        if duration > self.timeout * 1e9:
+
+            self.timeouts += 1
+
+            return -1
+
+        return pulse_to_distance(duration)
+
+    def close(self):
+
+        self.gpio.remove_event_detect(self.echo)
+
+
+def make_echo_timer(gpio, trig, echo, mode="auto", timeout=ECHO_TIMEOUT):
+    """Build an echo timer: "edge", "polling", or "auto" (edge if possible)."""
+
+    if mode in ("auto", "edge"):
+
+        try:
+
+            return EdgeEchoTimer(gpio, trig, echo, timeout)
+
+        except (RuntimeError, AttributeError) as e:
+
+            if mode == "edge":
+                raise
+
+            logging.warning(
+                f"Edge detection unavailable on pin {echo}, "
+                f"falling back to polling: {e}"
+            )
+
+    return PollingEchoTimer(gpio, trig, echo, timeout)
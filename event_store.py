@@ -0,0 +1,338 @@
+import collections
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Event Store
+# The AI Box stand-in keeps every event it receives in an append-only
+# SQLite WAL database:
+#
+#   events         one row per event: box, time, kind, zone, payload;
+#                  indexed by (box, time)
+#   event_sensors  (box, sensor, time, event id) for every sensor that
+#                  contributed to an event, so fused RD001+US001
+#                  detections are found under both sensors; a per
+#                  sensor query reads one range of this key
+#   minute_counts  events per (box, sensor, minute), updated as events
+#                  arrive, so counting never scans the events
+#
+# Request threads only append to an in-memory buffer. One writer
+# thread inserts the buffer in a single transaction every
+# `batch_interval` seconds, or sooner once `batch_size` events are
+# waiting, with synchronous=NORMAL like the alert spool. Events become
+# visible to queries once their batch is committed.
+#
+# Both payload shapes are understood: the sensor manager's
+# {"sensorId": <box>, "data": "...;Sensors:RD001+US001;TimestampUs:..."}
+# and ultrasonic.py's {"cameraId", "sensorId", "eventTime", ...}.
+# Event time is TimestampUs or eventTime if present, else arrival time.
+# A time SQLite cannot store as a 64-bit integer counts as not present.
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS events ("
+    "id INTEGER PRIMARY KEY, "
+    "box TEXT NOT NULL, "
+    "ts_us INTEGER NOT NULL, "
+    "received_us INTEGER NOT NULL, "
+    "kind TEXT, "
+    "zone TEXT, "
+    "sensors TEXT, "
+    "payload TEXT NOT NULL)",
+
+    "CREATE INDEX IF NOT EXISTS events_box_time ON events (box, ts_us)",
+
+    "CREATE TABLE IF NOT EXISTS event_sensors ("
+    "box TEXT NOT NULL, "
+    "sensor TEXT NOT NULL, "
+    "ts_us INTEGER NOT NULL, "
+    "event_id INTEGER NOT NULL, "
+    "PRIMARY KEY (box, sensor, ts_us, event_id)) WITHOUT ROWID",
+
+    "CREATE TABLE IF NOT EXISTS minute_counts ("
+    "box TEXT NOT NULL, "
+    "sensor TEXT NOT NULL, "
+    "minute INTEGER NOT NULL, "
+    "count INTEGER NOT NULL, "
+    "PRIMARY KEY (box, sensor, minute)) WITHOUT ROWID",
+
+    "CREATE INDEX IF NOT EXISTS minute_counts_box_time ON minute_counts (box, minute)"
+)
+
+MINUTE_US = 60 * 1000000
+
+QUERY_LIMIT = 1000
+
+MAX_TS_US = 2 ** 63 - 1
+
+
+def _storable(ts_us, received_us):
+    """``ts_us``, or the arrival time if SQLite cannot store it."""
+
+    return ts_us if -MAX_TS_US - 1 <= ts_us <= MAX_TS_US else received_us
+
+
+def parse_event(box_id, event, received_us):
+    """Normalize one event to (box, ts_us, kind, zone, sensors)."""
+
+    if not isinstance(event, dict):
+        return box_id or "unknown", received_us, None, None, ()
+
+    data = event.get("data")
+
+    if isinstance(data, str):
+
+        fields = dict(
+            item.split(":", 1)
+            for item in data.split(";")
+            if ":" in item
+        )
+
+        box = box_id or event.get("sensorId") or "unknown"
+
+        sensors = tuple(filter(None, fields.get("Sensors", "").split("+")))
+
+        try:
+            ts_us = int(fields["TimestampUs"])
+
+        except (KeyError, ValueError):
+            ts_us = received_us
+
+        return box, _storable(ts_us, received_us), fields.get("Event") or fields.get("Type"), fields.get("Zone"), sensors
+
+    box = box_id or event.get("cameraId") or "unknown"
+
+    sensor = event.get("sensorId") or event.get("cameraId")
+
+    try:
+        ts_us = int(float(event["eventTime"]) * 1000000)
+
+    except (KeyError, TypeError, ValueError, OverflowError):
+        ts_us = received_us
+
+    return box, _storable(ts_us, received_us), event.get("eventTag") or event.get("eventType"), None, (sensor,) if sensor else ()
+
+
+class EventStore:
+    """Append-only, indexed store of received events."""
+
+    def __init__(self, path, batch_size=500, batch_interval=0.25):
+
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+        self._db.commit()
+
+        self._next_id = (
+            self._db.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+        ) + 1
+
+        # Queries use their own connection; WAL lets them read while
+        # the writer commits.
+
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+        self._pending = []
+        self._pending_events = 0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+        self.stored = 0
+        self.batches = 0
+
+    # Ingest
+
+    def add(self, box_id, events, received_us=None):
+        """Queue events from one request. Never waits for the disk."""
+
+        if received_us is None:
+            received_us = time.time_ns() // 1000
+
+        with self._cond:
+
+            self._pending.append((box_id, events, received_us))
+
+            self._pending_events += len(events)
+
+            if self._pending_events >= self.batch_size:
+                self._cond.notify()
+
+    def _write(self, pending):
+
+        rows = []
+        sensor_rows = []
+        counts = collections.Counter()
+
+        for box_id, events, received_us in pending:
+
+            for event in events:
+
+                box, ts_us, kind, zone, sensors = parse_event(box_id, event, received_us)
+
+                event_id = self._next_id
+                self._next_id += 1
+
+                rows.append((
+                    event_id, box, ts_us, received_us, kind, zone,
+                    "+".join(sensors), json.dumps(event)
+                ))
+
+                minute = ts_us // MINUTE_US * MINUTE_US
+
+                for sensor in sensors or ("",):
+                    sensor_rows.append((box, sensor, ts_us, event_id))
+                    counts[(box, sensor, minute)] += 1
+
+        with self._db:
+
+            self._db.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+            self._db.executemany(
+                "INSERT OR IGNORE INTO event_sensors VALUES (?, ?, ?, ?)",
+                sensor_rows
+            )
+
+            self._db.executemany(
+                "INSERT INTO minute_counts VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (box, sensor, minute) "
+                "DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in counts.items()]
+            )
+
+        self.stored += len(rows)
+        self.batches += 1
+
+    def _run(self):
+
+        while True:
+
+            with self._cond:
+
+                if not self._stop:
+                    self._cond.wait(self.batch_interval)
+
+                pending, self._pending = self._pending, []
+
+                self._pending_events = 0
+
+                stop = self._stop
+
+            if pending:
+
+                # Whatever fails, only this batch is lost; the thread
+                # keeps draining, so the buffer cannot grow without bound
+
+                try:
+                    self._write(pending)
+
+                except Exception as e:
+                    logging.error(f"Event store write failed, {len(pending)} requests lost: {e}")
+
+            if stop:
+                return
+
+    def start(self):
+
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="event-store",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def close(self):
+
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self._db.close()
+        self._reader.close()
+
+    # Queries
+
+    def events(self, box, start_us, end_us, sensor=None, limit=QUERY_LIMIT):
+        """Events of ``box`` with start_us <= time < end_us, oldest first."""
+
+        if sensor is None:
+
+            sql = (
+                "SELECT id, box, ts_us, kind, zone, sensors, payload FROM events "
+                "WHERE box = ? AND ts_us >= ? AND ts_us < ? "
+                "ORDER BY ts_us, id LIMIT ?"
+            )
+
+            args = (box, start_us, end_us, limit)
+
+        else:
+
+            sql = (
+                "SELECT e.id, e.box, e.ts_us, e.kind, e.zone, e.sensors, e.payload "
+                "FROM event_sensors s JOIN events e ON e.id = s.event_id "
+                "WHERE s.box = ? AND s.sensor = ? AND s.ts_us >= ? AND s.ts_us < ? "
+                "ORDER BY s.ts_us, s.event_id LIMIT ?"
+            )
+
+            args = (box, sensor, start_us, end_us, limit)
+
+        with self._read_lock:
+            rows = self._reader.execute(sql, args).fetchall()
+
+        return [
+            {
+                "id": row_id,
+                "sensorBoxId": row_box,
+                "timestampUs": ts_us,
+                "event": kind,
+                "zone": zone,
+                "sensors": sensors.split("+") if sensors else [],
+                "payload": json.loads(payload)
+            }
+            for row_id, row_box, ts_us, kind, zone, sensors, payload in rows
+        ]
+
+    def minute_counts(self, box, start_us, end_us, sensor=None):
+        """Events per sensor per minute for ``box`` in [start_us, end_us)."""
+
+        sql = (
+            "SELECT sensor, minute, count FROM minute_counts "
+            "WHERE box = ? AND minute >= ? AND minute < ?"
+        )
+
+        args = [box, start_us // MINUTE_US * MINUTE_US, end_us]
+
+        if sensor is not None:
+            sql += " AND sensor = ?"
+            args.append(sensor)
+
+        sql += " ORDER BY sensor, minute"
+
+        with self._read_lock:
+            rows = self._reader.execute(sql, args).fetchall()
+
+        return [
+            {"sensor": sensor, "minuteUs": minute, "count": count}
+            for sensor, minute, count in rows
+        ]
@@ -0,0 +1,172 @@
+import collections
+import threading
+from collections import namedtuple
+
+# Sensor Fusion
+# Sensors that watch the same zone (RD001 and US001 on one box) are
+# fused into a single detection. Every sensor keeps a short,
+# time-ordered window of its recent samples; when one sensor reports
+# an in-range sample, the other sensors' samples within `skew`
+# seconds of it are checked for agreement:
+#
+#   partner in range at a similar distance  -> agreement up to 1.0
+#   partner in range at a different distance -> less agreement
+#   partner sampled but saw nothing in range -> agreement 0.0
+#   partner has no samples near that time    -> not counted
+#
+# confidence = SOLO_CONFIDENCE when no partner had data, otherwise
+# FLOOR + (1 - FLOOR) * mean(agreement).
+#
+# add() scores a sample as soon as it arrives, so partner samples taken
+# after it but arriving later are missed; rescore() scores it again once
+# the skew has passed or every sensor has reported since (caught_up()),
+# which the detection pipeline does for "enter".
+#
+# Each add() only looks at samples inside the skew window, and the
+# windows are trimmed by age and length, so the cost and memory per
+# sample are bounded whatever the history.
+
+SOLO_CONFIDENCE = 0.6
+
+FLOOR = 0.3
+
+FusedDetection = namedtuple(
+    "FusedDetection",
+    ["timestamp", "distance", "confidence", "sensors"]
+)
+
+
+class FusionEngine:
+    """Correlates the samples of one zone's sensors within a time skew."""
+
+    def __init__(self, sensor_ids, skew=0.5, tolerance=50.0, max_samples=64):
+
+        self.skew = skew
+        self.tolerance = tolerance
+
+        self._windows = {
+            sensor_id: collections.deque(maxlen=max_samples)
+            for sensor_id in sensor_ids
+        }
+
+        self._lock = threading.Lock()
+
+        self.detections = 0
+        self.confirmed = 0
+
+    def configure(self, skew=0.5, tolerance=50.0):
+
+        self.skew = skew
+        self.tolerance = tolerance
+
+    def _agreement(self, window, timestamp, distance):
+
+        # Walk back from the newest sample; stop once we are further
+        # than `skew` in the past. Anything newer than timestamp+skew
+        # is skipped.
+
+        seen = False
+        best = 0.0
+
+        for sample_time, sample_distance, in_range in reversed(window):
+
+            if sample_time > timestamp + self.skew:
+                continue
+
+            if sample_time < timestamp - self.skew:
+                break
+
+            seen = True
+
+            if in_range:
+
+                score = 1.0 - abs(sample_distance - distance) / self.tolerance
+
+                if score > best:
+                    best = score
+
+        return best if seen else None
+
+    def add(self, sensor_id, timestamp, distance, in_range):
+        """Record a sample. Returns a FusedDetection for in-range samples."""
+
+        with self._lock:
+
+            window = self._windows[sensor_id]
+
+            window.append((timestamp, distance, in_range))
+
+            # Keep two skews of history: a late-arriving sample from
+            # another sensor may still need to be matched against it.
+
+            cutoff = timestamp - 2 * self.skew
+
+            while window and window[0][0] < cutoff:
+                window.popleft()
+
+            if not in_range:
+                return None
+
+            detection = self._score(sensor_id, timestamp, distance)
+
+            self.detections += 1
+
+            if len(detection.sensors) > 1:
+                self.confirmed += 1
+
+            return detection
+
+    def rescore(self, detection):
+        """``detection`` scored again against the partner samples now
+        in its skew window, including ones that arrived after it."""
+
+        with self._lock:
+
+            return self._score(
+                detection.sensors[0],
+                detection.timestamp,
+                detection.distance
+            )
+
+    def caught_up(self, timestamp):
+        """Whether every sensor has a sample taken at or after ``timestamp``."""
+
+        with self._lock:
+
+            return all(
+                window and window[-1][0] >= timestamp
+                for window in self._windows.values()
+            )
+
+    def _score(self, sensor_id, timestamp, distance):
+
+        scores = []
+        agreeing = [sensor_id]
+
+        for other_id, other in self._windows.items():
+
+            if other_id == sensor_id:
+                continue
+
+            score = self._agreement(other, timestamp, distance)
+
+            if score is None:
+                continue
+
+            scores.append(score)
+
+            if score > 0:
+                agreeing.append(other_id)
+
+        if not scores:
+            confidence = SOLO_CONFIDENCE
+
+        else:
+            confidence = FLOOR + (1 - FLOOR) * sum(scores) / len(scores)
+
+        return FusedDetection(
+            timestamp,
+            distance,
+            round(confidence, 2),
+            tuple(agreeing)
+        )
@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+
+# Simulated GPIO
+# A stand-in for RPi.GPIO for running and benchmarking the sensor
+# code off a Pi. Pins hold a level, edge callbacks fire on level
+# changes, and an ultrasonic echo can be attached to a trigger/echo
+# pin pair: a falling edge on the trigger produces an echo pulse whose
+# width matches the configured distance.
+
+CM_PER_SECOND = 17150
+
+
+class SimulatedGPIO:
+    """Subset of the RPi.GPIO API backed by in-memory pin state."""
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+
+    def __init__(self, edge_detection=True):
+
+        self.edge_detection = edge_detection
+
+        self.mode = None
+        self._levels = {}
+        self._directions = {}
+        self._callbacks = {}
+        self._echoes = {}
+        self._lock = threading.Lock()
+
+        # Wall-clock (perf_counter_ns) times of the last simulated echo
+        # edges per echo pin, for judging measurement accuracy.
+
+        self.last_pulse = {}
+
+        # Called with (echo, rise_ns, fall_ns) after every simulated
+        # echo pulse, e.g. to measure end-to-end latency.
+
+        self.on_echo = None
+
+    # RPi.GPIO API
+
+    def setmode(self, mode):
+
+        self.mode = mode
+
+    def setwarnings(self, flag):
+
+        pass
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+
+        self._directions[channel] = direction
+        self._levels.setdefault(
+            channel,
+            self.LOW if initial is None else initial
+        )
+
+    def output(self, channel, value):
+
+        previous = self._levels.get(channel, self.LOW)
+
+        self._set(channel, value)
+
+        echo = self._echoes.get(channel)
+
+        if echo is not None and previous == self.HIGH and value == self.LOW:
+            echo.fire()
+
+    def input(self, channel):
+
+        return self._levels.get(channel, self.LOW)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+
+        if not self.edge_detection:
+            raise RuntimeError("Failed to add edge detection")
+
+        if channel in self._callbacks:
+            raise RuntimeError("Conflicting edge detection already enabled")
+
+        self._callbacks[channel] = (edge, [callback] if callback else [])
+
+    def add_event_callback(self, channel, callback):
+
+        self._callbacks[channel][1].append(callback)
+
+    def remove_event_detect(self, channel):
+
+        self._callbacks.pop(channel, None)
+
+    def cleanup(self, channel=None):
+
+        if channel is None:
+
+            self._levels.clear()
+            self._directions.clear()
+            self._callbacks.clear()
+
+        else:
+
+            self._levels.pop(channel, None)
+            self._directions.pop(channel, None)
+            self._callbacks.pop(channel, None)
+
+    # Simulation
+
+    def _set(self, channel, value):
+
+        with self._lock:
+
+            previous = self._levels.get(channel, self.LOW)
+
+            self._levels[channel] = value
+
+            detect = self._callbacks.get(channel)
+
+        if detect is None or previous == value:
+            return
+
+        edge, callbacks = detect
+
+        if (
+            edge == self.BOTH
+            or (edge == self.RISING and value == self.HIGH)
+            or (edge == self.FALLING and value == self.LOW)
+        ):
+
+            for callback in callbacks:
+                callback(channel)
+
+    def attach_echo(self, trig, echo, distance=100.0, noise=0.0, latency=0.0002):
+        """Simulate an ultrasonic sensor on ``trig``/``echo``.
+
+        ``distance`` is in cm, or a callable returning cm (or None for no
+        echo). ``noise`` is the standard deviation in cm added per ping.
+        """
+
+        self._echoes[trig] = _SimulatedEcho(
+            self, echo, distance, noise, latency
+        )
+
+    def set_distance(self, trig, distance):
+
+        self._echoes[trig].distance = distance
+
+    def set_powered(self, trig, powered):
+        """A sensor without power never echoes."""
+
+        self._echoes[trig].powered = powered
+
+
+class _SimulatedEcho:
+
+    def __init__(self, gpio, echo, distance, noise, latency):
+
+        self.gpio = gpio
+        self.echo = echo
+        self.distance = distance
+        self.noise = noise
+        self.latency = latency
+        self.powered = True
+
+    def fire(self):
+
+        if not self.powered:
+            return
+
+        distance = self.distance() if callable(self.distance) else self.distance
+
+        if distance is None:
+            return
+
+        if self.noise:
+            distance = max(0.0, random.gauss(distance, self.noise))
+
+        threading.Thread(
+            target=self._pulse,
+            args=(distance / CM_PER_SECOND,),
+            daemon=True
+        ).start()
+
+    def _pulse(self, width):
+
+        gpio = self.gpio
+
+        time.sleep(self.latency)
+
+        rise = time.perf_counter_ns()
+        gpio._set(self.echo, gpio.HIGH)
+
+        # Sleep most of the pulse, then spin for an accurate edge.
+
+        end = rise + int(width * 1e9)
+
+        if width > 0.001:
+            time.sleep(width - 0.001)
+
+        while time.perf_counter_ns() < end:
+            pass
+
+        fall = time.perf_counter_ns()
+        gpio._set(self.echo, gpio.LOW)
+
+        gpio.last_pulse[self.echo] = (rise, fall)
+
+        if gpio.on_echo is not None:
+            gpio.on_echo(self.echo, rise, fall)
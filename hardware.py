@@ -0,0 +1,221 @@
+import abc
+import logging
+import os
+
+# Hardware Backends
+# The sensor manager talks to GPIO, power pins and serial ports only
+# through a backend chosen at startup:
+#
+#   rpi  RPi.GPIO and pyserial on a Raspberry Pi (default)
+#   sim  simulated GPIO with echo pulses and pty-based virtual radars,
+#        for running and benchmarking on any Linux box
+#
+# Pick one with SENSORBOX_BACKEND=sim or by passing the name to
+# select_backend(). The sim backend reads SENSORBOX_SIM_DISTANCE
+# (cm), SENSORBOX_SIM_NOISE (cm) and SENSORBOX_SIM_RADAR_RATE
+# (lines/s) for its defaults.
+
+BACKEND_ENV = "SENSORBOX_BACKEND"
+
+DEFAULT_BACKEND = "rpi"
+
+
+class HardwareBackend(abc.ABC):
+    """GPIO, power-pin and serial access for the sensor manager.
+
+    ``gpio`` exposes the RPi.GPIO interface. Power pins are active-low:
+    driving the pin LOW powers the sensor.
+    """
+
+    name = None
+
+    gpio = None
+
+    def setup(self, sensors):
+
+        gpio = self.gpio
+
+        gpio.setmode(gpio.BCM)
+
+        for sensor in sensors.values():
+
+            gpio.setup(sensor["power_pin"], gpio.OUT)
+
+            gpio.output(sensor["power_pin"], gpio.HIGH)
+
+            if sensor["type"] == "ultrasonic":
+
+                gpio.setup(sensor["trig"], gpio.OUT)
+                gpio.setup(sensor["echo"], gpio.IN)
+
+    def power_on(self, power_pin):
+
+        self.gpio.output(power_pin, self.gpio.LOW)
+
+    def power_off(self, power_pin):
+
+        self.gpio.output(power_pin, self.gpio.HIGH)
+
+    @abc.abstractmethod
+    def open_serial(self, path, baudrate):
+
+        raise NotImplementedError
+
+    def cleanup(self):
+
+        self.gpio.cleanup()
+
+
+# Raspberry Pi
+
+class RPiBackend(HardwareBackend):
+
+    name = "rpi"
+
+    def __init__(self, sensors=None):
+
+        import RPi.GPIO as GPIO
+        import serial
+
+        self.gpio = GPIO
+        self._serial = serial
+
+    def open_serial(self, path, baudrate):
+
+        return self._serial.Serial(path, baudrate=baudrate, timeout=0)
+
+
+# Simulation
+
+class SimBackend(HardwareBackend):
+    """Simulated sensors for every entry in ``sensors``.
+
+    Ultrasonic sensors get a simulated echo on their trig/echo pins and
+    each radar gets a VirtualRadar; ``open_serial`` maps the configured
+    UART path (e.g. /dev/ttyS0) to that radar's pty. A sensor whose power
+    pin is switched off goes silent until it is switched on again.
+    """
+
+    name = "sim"
+
+    def __init__(self, sensors, distance=None, noise=None, radar_rate=None):
+
+        from gpio_sim import SimulatedGPIO
+        from radar_sim import VirtualRadar
+
+        if distance is None:
+            distance = float(os.environ.get("SENSORBOX_SIM_DISTANCE", 700))
+
+        if noise is None:
+            noise = float(os.environ.get("SENSORBOX_SIM_NOISE", 0))
+
+        if radar_rate is None:
+            radar_rate = float(os.environ.get("SENSORBOX_SIM_RADAR_RATE", 20))
+
+        self.gpio = SimulatedGPIO()
+
+        self.radars = {}
+
+        for sensor_id, sensor in sensors.items():
+
+            if sensor["type"] == "ultrasonic":
+
+                self.gpio.attach_echo(
+                    sensor["trig"],
+                    sensor["echo"],
+                    distance=distance,
+                    noise=noise
+                )
+
+            elif sensor["type"] == "radar":
+
+                radar = VirtualRadar(distance=distance, rate=radar_rate, noise=noise)
+
+                radar.start()
+
+                self.radars[sensor["uart"]] = radar
+
+                logging.info(f"{sensor_id} simulated on {radar.path}")
+
+        self._sensors = sensors
+
+    def _set_powered(self, power_pin, powered):
+
+        for sensor in self._sensors.values():
+
+            if sensor["power_pin"] != power_pin:
+                continue
+
+            if sensor["type"] == "radar":
+                self.radars[sensor["uart"]].powered = powered
+
+            else:
+                self.gpio.set_powered(sensor["trig"], powered)
+
+    def power_on(self, power_pin):
+
+        super().power_on(power_pin)
+
+        self._set_powered(power_pin, True)
+
+    def power_off(self, power_pin):
+
+        super().power_off(power_pin)
+
+        self._set_powered(power_pin, False)
+
+    def set_distance(self, sensor_id, distance):
+        """Move the simulated target seen by one sensor."""
+
+        sensor = self._sensors[sensor_id]
+
+        if sensor["type"] == "radar":
+            self.radars[sensor["uart"]].set_distance(distance)
+
+        else:
+            self.gpio.set_distance(sensor["trig"], distance)
+
+    def open_serial(self, path, baudrate):
+
+        import serial
+
+        radar = self.radars.get(path)
+
+        return serial.Serial(
+            radar.path if radar else path,
+            baudrate=baudrate,
+            timeout=0
+        )
+
+    def cleanup(self):
+
+        for radar in self.radars.values():
+            radar.close()
+
+        self.gpio.cleanup()
+
+
+BACKENDS = {
+    "rpi": RPiBackend,
+    "sim": SimBackend
+}
+
+
+def select_backend(name=None, sensors=None, **options):
+
+    name = name or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+
+    try:
+        backend_class = BACKENDS[name]
+
+    except KeyError:
+        raise ValueError(
+            f"Unknown hardware backend {name!r}, "
+            f"expected one of {', '.join(BACKENDS)}"
+        ) from None
+
+    backend = backend_class(sensors or {}, **options)
+
+    logging.info(f"Hardware backend: {backend.name}")
+
+    return backend
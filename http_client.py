@@ -0,0 +1,162 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Delivery Client
+# One pooled keep-alive session shared by every script that talks to
+# the AI Box, so an alert costs a request on an open connection
+# instead of a fresh TCP handshake.
+
+CONNECT_TIMEOUT = 2.0
+
+READ_TIMEOUT = 5.0
+
+POOL_SIZE = 4
+
+
+# Retry Policy
+
+class RetryPolicy:
+    """Retry with full-jitter exponential backoff.
+
+    The delay before retry ``n`` is uniform in
+    ``[0, min(max_backoff, backoff * 2 ** n)]``.
+    """
+
+    def __init__(
+        self,
+        attempts=3,
+        backoff=0.2,
+        max_backoff=2.0,
+        retry_statuses=(429, 502, 503, 504)
+    ):
+
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def delay(self, attempt):
+
+        return random.uniform(
+            0,
+            min(self.max_backoff, self.backoff * (2 ** attempt))
+        )
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+class DeliveryClient:
+    """Thread-safe HTTP client with a pooled keep-alive session."""
+
+    def __init__(
+        self,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retry=None,
+        pool_size=POOL_SIZE
+    ):
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = retry or RetryPolicy()
+
+        self.session = requests.Session()
+
+        # Retries are handled here rather than by urllib3 so the
+        # backoff is jittered and the policy is the same everywhere.
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.requests = 0
+        self.retries = 0
+
+    def request(self, method, url, retry=None, **kwargs):
+        """Send a request, retrying per policy. Raises on final failure."""
+
+        retry = retry or self.retry
+
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+
+        while True:
+
+            self.requests += 1
+
+            try:
+
+                response = self.session.request(method, url, **kwargs)
+
+                if (
+                    response.status_code not in retry.retry_statuses
+                    or attempt + 1 >= retry.attempts
+                ):
+
+                    response.raise_for_status()
+
+                    return response
+
+                error = f"HTTP {response.status_code}"
+
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout
+            ) as e:
+
+                if attempt + 1 >= retry.attempts:
+                    raise
+
+                error = e
+
+            delay = retry.delay(attempt)
+
+            logging.warning(
+                f"Retrying {method} {url} in {delay:.2f}s "
+                f"(attempt {attempt + 1}/{retry.attempts}): {error}"
+            )
+
+            time.sleep(delay)
+
+            attempt += 1
+            self.retries += 1
+
+    def post_json(self, url, payload, **kwargs):
+
+        return self.request("POST", url, json=payload, **kwargs)
+
+    def close(self):
+
+        self.session.close()
+
+
+# Shared Client
+
+_client = None
+
+_client_lock = threading.Lock()
+
+
+def get_client():
+
+    global _client
+
+    if _client is None:
+
+        with _client_lock:
+
+            if _client is None:
+                _client = DeliveryClient()
+
+    return _client
@@ -1,27 +1,374 @@
 import requests
+import argparse
+import asyncio
+import heapq
 import json
-import time 
+import random
+import time
+from urllib.parse import urlsplit
+
+from http_client import get_client
+
+# AI Box URL
+URL = 'http://192.168.1.5:3300/analyticEvent' #url for AI BOX
+#URL = 'http://192.168.0.79:80' #url for testing on local server
 
 def send_http_command(url, method='POST', params=None, data=None, headers=None):
     try:
-        response = requests.request(method, url, params=params, data=data, headers=headers)
+        response = get_client().request(method, url, params=params, data=data, headers=headers)
         response.raise_for_status()  # Raise an exception for 4xx or 5xx status codes
         return response.text
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
         return None
-# Example usage:
-url = 'http://192.168.1.5:3300/analyticEvent' #url for AI BOX
-#url = 'http://192.168.0.79:80' #url for testing on local server
-method = 'POST'
-data = {
-            "cameraId": "RD001",
-            "eventTime": int(time.time()),
-            "timeStampStr": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "eventType": "Sensor_Event",
-            "eventTag": "distance"
+
+def send_example(url):
+    # One hand-built event, as this script always sent
+    data = {
+                "cameraId": "RD001",
+                "eventTime": int(time.time()),
+                "timeStampStr": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "eventType": "Sensor_Event",
+                "eventTag": "distance"
+            }
+    headers = {'Content-Type': 'application/json'}
+    response = send_http_command(url, 'POST', data=json.dumps(data), headers=headers)
+    if response:
+        print("Response:", response)
+
+# Load Generator
+# Simulates a site of --boxes sensor boxes with --sensors sensors each
+# posting detections to the AI Box, to size it for the whole site.
+#
+#   shapes    manager     radar_ultrasonic.py alerts, {"sensorId": <box>,
+#                         "data": "Type:...;Event:enter;Zone:...;..."},
+#                         or --batch events per {"sensorBoxId", "events"}
+#             ultrasonic  ultrasonic.py's {"cameraId", "eventTime", ...}
+#             mixed       alternate boxes of each
+#   patterns  steady      Poisson arrivals at --rate requests/s
+#             bursty      same mean rate, but BURST_FACTOR x for
+#                         BURST_LENGTH s of every BURST_PERIOD s
+#             storm       steady, plus every --storm-every s each sensor
+#                         of every box reports an intrusion (enter, then
+#                         exit STORM_DWELL s later) within STORM_SPREAD s
+#
+# --concurrency asyncio senders each keep one HTTP/1.1 connection open
+# and post without retries; a thread and a requests session per
+# in-flight request would cap the rate well below what the AI Box can
+# take on the same machine. Latency is measured from when a request was
+# due, not when a free thread sent it, so a saturated AI Box (or load
+# generator) shows up as latency instead of a quietly lower rate.
+
+PATTERNS = ('steady', 'bursty', 'storm')
+SHAPES = ('manager', 'ultrasonic', 'mixed')
+
+BURST_PERIOD = 10.0  # Seconds between burst starts
+BURST_LENGTH = 2.0   # Seconds each burst lasts
+BURST_FACTOR = 4.0   # Rate during a burst, times --rate
+
+STORM_START = 2.0    # Seconds into the run of the first storm
+STORM_SPREAD = 0.5   # Seconds over which every sensor fires
+STORM_DWELL = 3.0    # Seconds from enter to exit
+
+KINDS = ('enter', 'exit', 'still-present')
+KIND_WEIGHTS = (0.45, 0.45, 0.1)
+FUSED_SHARE = 0.6     # Share of manager alerts fused from a zone's radar and ultrasonic
+
+class Site:
+    """Sensor boxes and the payloads they send."""
+
+    def __init__(self, boxes, sensors, shape='manager', batch=1):
+        self.boxes = [f"sensor{i + 1}" for i in range(boxes)]
+        # RD001, US001, RD002, ... with RDnnn and USnnn sharing zone nnn
+        self.sensors = [f"{('RD', 'US')[i % 2]}{i // 2 + 1:03d}" for i in range(sensors)]
+        self.batch = batch
+        if shape == 'mixed':
+            self.shapes = {box: ('manager', 'ultrasonic')[i % 2] for i, box in enumerate(self.boxes)}
+        else:
+            self.shapes = dict.fromkeys(self.boxes, shape)
+
+    def event(self, box, sensor, kind):
+        if self.shapes[box] == 'ultrasonic':
+            now = time.time()
+            return {
+                "cameraId": box,
+                "eventTime": int(now),
+                "timeStampStr": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+                "eventType": "Sensor_Event",
+                "eventTag": "distance",
+                "sensorId": sensor,
+                "sensorType": "Radar" if sensor.startswith('RD') else "Ultrasonic"
+            }
+        zone = f"zone{sensor[2:]}"
+        partner = ('US' if sensor.startswith('RD') else 'RD') + sensor[2:]
+        if partner in self.sensors and random.random() < FUSED_SHARE:
+            sensors, confidence = sorted((sensor, partner)), random.uniform(0.8, 1.0)
+        else:
+            sensors, confidence = [sensor], 0.6
+        return {
+            "sensorId": box,
+            "data": (
+                f"Type:nx.base.Detection;Event:{kind};Zone:{zone};"
+                f"Sensors:{'+'.join(sensors)};Confidence:{confidence:.2f};"
+                f"TimestampUs:{time.time_ns() // 1000};"
+            )
         }
-headers = {'Content-Type': 'application/json'}
-response = send_http_command(url, method, data=json.dumps(data), headers=headers)
-if response:
-    print("Response:", response)
+
+    def payload(self, box, sensor, kind):
+        """The request body for one arrival, and how many events it carries."""
+        if self.batch <= 1 or self.shapes[box] == 'ultrasonic':
+            return self.event(box, sensor, kind), 1
+        events = [self.event(box, sensor, kind)]
+        events += [self.event(box, random.choice(self.sensors), random.choices(KINDS, KIND_WEIGHTS)[0])
+                   for _ in range(self.batch - 1)]
+        return {"sensorBoxId": box, "events": events}, len(events)
+
+def steady_rate(rate):
+    return lambda t: rate
+
+def bursty_rate(rate):
+    # The rate between bursts keeps the mean at `rate`
+    quiet = max(0.0, rate * (BURST_PERIOD - BURST_FACTOR * BURST_LENGTH) / (BURST_PERIOD - BURST_LENGTH))
+    return lambda t: rate * BURST_FACTOR if t % BURST_PERIOD < BURST_LENGTH else quiet
+
+def poisson_arrivals(site, rate_at, peak, duration):
+    """(offset, box, sensor, kind) at a time-varying rate, by thinning."""
+    t = 0.0
+    while peak > 0:
+        t += random.expovariate(peak)
+        if t >= duration:
+            return
+        if random.random() * peak < rate_at(t):
+            yield t, random.choice(site.boxes), random.choice(site.sensors), random.choices(KINDS, KIND_WEIGHTS)[0]
+
+def storm_arrivals(site, start):
+    storm = []
+    for box in site.boxes:
+        for sensor in site.sensors:
+            enter = start + random.uniform(0, STORM_SPREAD)
+            storm.append((enter, box, sensor, 'enter'))
+            storm.append((enter + STORM_DWELL, box, sensor, 'exit'))
+    storm.sort()
+    return storm
+
+def schedule(site, pattern, rate, duration, storm_every):
+    if pattern == 'bursty':
+        return poisson_arrivals(site, bursty_rate(rate), rate * BURST_FACTOR, duration)
+    arrivals = poisson_arrivals(site, steady_rate(rate), rate, duration)
+    if pattern == 'storm':
+        # Storms may overlap when --storm-every is shorter than a storm
+        starts = [STORM_START + i * storm_every for i in range(int((duration - STORM_START) // storm_every) + 1)]
+        storms = heapq.merge(*(storm_arrivals(site, start) for start in starts if start < duration))
+        return heapq.merge(arrivals, (arrival for arrival in storms if arrival[0] < duration))
+    return arrivals
+
+def storm_interval(value):
+    # Shorter intervals pile up more overlapping storms than a run can schedule
+    seconds = float(value)
+    if not seconds >= 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1 second, got {value}")
+    return seconds
+
+def percentile(values, q):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+class LoadResults:
+    """Per-request outcomes."""
+
+    def __init__(self):
+        self.latencies = []  # Seconds from due to response
+        self.service = []    # Seconds from send to response
+        self.events = 0
+        self.errors = {}
+        self.max_lag = 0.0   # How far sends fell behind schedule
+
+    def record(self, due, sent, done, events, error=None):
+        if error is None:
+            self.latencies.append(done - due)
+            self.service.append(done - sent)
+            self.events += events
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        self.max_lag = max(self.max_lag, sent - due)
+
+    def summary(self, elapsed, target_rate):
+        latencies = sorted(self.latencies)
+        service = sorted(self.service)
+        ms = lambda value: round(value * 1000, 3) if value is not None else None
+        ok = len(latencies)
+        failed = sum(self.errors.values())
+        return {
+            'target_rps': round(target_rate, 1),
+            'requests': ok + failed,
+            'ok': ok,
+            'errors': dict(self.errors),
+            'achieved_rps': round((ok + failed) / elapsed, 1),
+            'ok_rps': round(ok / elapsed, 1),
+            'events_per_s': round(self.events / elapsed, 1),
+            'latency_ms': {f"p{q * 100:g}": ms(percentile(latencies, q)) for q in (0.5, 0.9, 0.99, 0.999)}
+                          | {'max': ms(latencies[-1] if latencies else None)},
+            'service_ms': {'p50': ms(percentile(service, 0.5)), 'p99': ms(percentile(service, 0.99))},
+            'max_schedule_lag_ms': ms(self.max_lag),
+            'elapsed_s': round(elapsed, 2)
+        }
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection posting JSON."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise ValueError(f"Only http:// URLs are supported, got {url}")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.head = (f"POST {parts.path or '/'}{'?' + parts.query if parts.query else ''} HTTP/1.1\r\n"
+                     f"Host: {parts.netloc}\r\nContent-Type: application/json\r\n").encode()
+        self.reader = self.writer = None
+
+    async def post(self, payload):
+        """Send one request and return the response status."""
+        if self.writer is None:
+            # asyncio sets TCP_NODELAY, so headers and body leave at once
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode()
+        self.writer.write(self.head + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        version, status = (await self.reader.readline()).split(None, 2)[:2]
+        status = int(status)
+        # HTTP/1.0 closes after each response unless it says keep-alive
+        length, chunked, close = None, False, version == b'HTTP/1.0'
+        while (line := await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.partition(b':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'transfer-encoding':
+                chunked = value.endswith(b'chunked')
+            elif name == b'connection':
+                close = value == b'close'
+        if status < 200 or status in (204, 304):
+            pass
+        elif chunked:
+            await self.read_chunks()
+        elif length is not None:
+            await self.reader.readexactly(length)
+        else:
+            # No length: the body runs until the server closes
+            await self.reader.read()
+            close = True
+        if close:
+            self.close()
+        return status
+
+    async def read_chunks(self):
+        while (size := int((await self.reader.readline()).split(b';')[0], 16)) > 0:
+            await self.reader.readexactly(size + 2)
+        # Skip any trailers up to the blank line
+        while await self.reader.readline() not in (b'\r\n', b'\n', b''):
+            pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+async def generate_load(url, site, pattern, rate, duration, concurrency, storm_every, timeout, progress):
+    loop = asyncio.get_running_loop()
+    results = LoadResults()
+    due_queue = asyncio.Queue()
+    connections = [Connection(url) for _ in range(concurrency)]
+
+    async def sender(connection):
+        while True:
+            item = await due_queue.get()
+            if item is None:
+                connection.close()
+                return
+            due, box, sensor, kind = item
+            payload, events = site.payload(box, sensor, kind)
+            sent = loop.time()
+            try:
+                status = await asyncio.wait_for(connection.post(payload), timeout)
+                results.record(due, sent, loop.time(), events, None if status < 400 else f"HTTP {status}")
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                # The connection is in an unknown state; the next request reopens it
+                connection.close()
+                results.record(due, sent, loop.time(), events, type(e).__name__)
+
+    senders = [asyncio.create_task(sender(connection)) for connection in connections]
+    started = loop.time()
+    next_progress = started + 1.0
+    scheduled = 0
+    for offset, box, sensor, kind in schedule(site, pattern, rate, duration, storm_every):
+        due = started + offset
+        if due > loop.time():
+            await asyncio.sleep(due - loop.time())
+        due_queue.put_nowait((due, box, sensor, kind))
+        scheduled += 1
+        if progress and loop.time() >= next_progress:
+            progress(loop.time() - started, scheduled, results)
+            next_progress += 1.0
+    for _ in senders:
+        due_queue.put_nowait(None)
+    await asyncio.gather(*senders)
+    return results.summary(loop.time() - started, scheduled / duration)
+
+def run_load(url, site, pattern='steady', rate=100.0, duration=10.0, concurrency=32,
+             storm_every=20.0, timeout=5.0, progress=None):
+    """Send the schedule and return LoadResults.summary()."""
+    return asyncio.run(generate_load(url, site, pattern, rate, duration, concurrency,
+                                     storm_every, timeout, progress))
+
+def print_progress(elapsed, sent, results):
+    print(f"[load] {elapsed:5.1f}s sent={sent} ok={len(results.latencies)} "
+          f"errors={sum(results.errors.values())}")
+
+def print_summary(summary):
+    ms = lambda values, *keys: ' '.join(f"{key}={'-' if values[key] is None else f'{values[key]}ms'}" for key in keys)
+    print(
+        f"requests={summary['requests']} ok={summary['ok']} errors={summary['errors'] or 0}\n"
+        f"throughput {summary['achieved_rps']} req/s ({summary['ok_rps']} ok), "
+        f"{summary['events_per_s']} events/s, scheduled {summary['target_rps']} req/s\n"
+        f"latency {ms(summary['latency_ms'], 'p50', 'p90', 'p99', 'p99.9', 'max')}\n"
+        f"service {ms(summary['service_ms'], 'p50', 'p99')}, "
+        f"max schedule lag {summary['max_schedule_lag_ms']}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Send one example event, or simulate a site's sensor boxes.")
+    parser.add_argument('--url', help=f"target URL (default for the example event: {URL})")
+    parser.add_argument('--load', action='store_true', help="run the load generator; needs an explicit --url")
+    parser.add_argument('--boxes', type=int, default=10)
+    parser.add_argument('--sensors', type=int, default=4, help="sensors per box")
+    parser.add_argument('--shape', choices=SHAPES, default='manager')
+    parser.add_argument('--batch', type=int, default=1, help="events per manager request")
+    parser.add_argument('--pattern', choices=PATTERNS, default='steady')
+    parser.add_argument('--rate', type=float, default=100.0, help="mean requests/s for the whole site")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=32, help="open connections")
+    parser.add_argument('--storm-every', type=storm_interval, default=20.0, help="seconds between storms")
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--json', help="also write the summary to this file")
+    args = parser.parse_args()
+
+    if not args.load:
+        send_example(args.url or URL)
+        return
+
+    # Never load test the AI Box by accident
+    if not args.url:
+        parser.error("--load needs an explicit --url")
+
+    site = Site(args.boxes, args.sensors, args.shape, args.batch)
+    print(f"{args.pattern} load: {args.boxes} boxes x {args.sensors} sensors ({args.shape}), "
+          f"{args.rate} req/s for {args.duration}s to {args.url}")
+    summary = run_load(args.url, site, args.pattern, args.rate, args.duration, args.concurrency,
+                       args.storm_every, args.timeout, progress=print_progress)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
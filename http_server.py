@@ -1,51 +1,268 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import collections
 import json
+import random
+import threading
+import time
+
+from event_store import EventStore
 
 # Define the host and port to run the HTTP server
 HOST = '192.168.1.2'  # Listen on all available interfaces
 PORT = 80       # Default port for the HTTP server
 
+# AI Box stand-in
+# A thread per connection, HTTP/1.1 keep-alive, single alerts or
+# {"sensorBoxId": ..., "events": [...]} batches, and a minimal
+# {"status": ..., "receivedEvents": n} response. --latency/--jitter
+# delay every response and --error-rate answers a share of requests
+# with --error-status, to see how sensor boxes behave against a slow
+# or flaky AI Box. Request rate and latency are printed every
+# --stats-interval seconds and served as JSON on GET /stats.
+#
+# With --store, events are kept in an indexed EventStore and can be
+# queried (times as epoch seconds or ISO 8601; end defaults to now):
+#
+#   GET /events?box=sensor1&start=...&end=...[&sensor=RD001][&limit=100]
+#   GET /counts?box=sensor1&start=...&end=...[&sensor=RD001]
+
+# Latencies kept for the percentiles of one stats interval
+LATENCY_WINDOW = 10000
+
+
+class ReceiverStats:
+    """Thread-safe request, event and latency counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.events = 0
+        self.errors = 0
+        self.bad_requests = 0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._last = (self.started, 0, 0)
+
+    def record(self, latency, events=0, error=False, bad=False):
+        with self._lock:
+            self.requests += 1
+            self.events += events
+            self.errors += error
+            self.bad_requests += bad
+            self._latencies.append(latency)
+
+    def snapshot(self, interval=False):
+        """Totals plus rates and latency percentiles since the last
+        interval snapshot (or since start)."""
+        with self._lock:
+            now = time.monotonic()
+            since, requests, events = self._last
+            latencies = sorted(self._latencies)
+            if interval:
+                self._last = (now, self.requests, self.events)
+                self._latencies.clear()
+            elapsed = max(now - since, 1e-9)
+
+            def percentile(q):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 3)
+
+            return {
+                'uptime_s': round(now - self.started, 1),
+                'requests': self.requests,
+                'events': self.events,
+                'errors': self.errors,
+                'bad_requests': self.bad_requests,
+                'requests_per_s': round((self.requests - requests) / elapsed, 1),
+                'events_per_s': round((self.events - events) / elapsed, 1),
+                'p50_ms': percentile(0.50),
+                'p99_ms': percentile(0.99),
+                'max_ms': round(latencies[-1] * 1000, 3) if latencies else None
+            }
+
+
+class ReceiverServer(ThreadingHTTPServer):
+    """Threaded server holding the stats and fault injection settings."""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, verbose=False, store=None):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.verbose = verbose
+        self.stats = ReceiverStats()
+        self.store = store
+        if store is not None:
+            store.start()
+
+    def server_close(self):
+        super().server_close()
+        if self.store is not None:
+            self.store.close()
+
+
 class CustomHTTPRequestHandler(BaseHTTPRequestHandler):
     """Custom HTTP request handler to handle POST requests."""
 
+    # Keep-alive; headers and body go out as separate writes, so
+    # without TCP_NODELAY Nagle plus delayed ACK adds ~40 ms each.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
     def do_POST(self):
+        started = time.perf_counter()
+        server = self.server
         content_length = int(self.headers.get('Content-Length', 0))
-        post_data = self.rfile.read(content_length).decode('utf-8')
+        post_data = self.rfile.read(content_length)
+
+        delay = server.latency + random.uniform(0, server.jitter) if server.jitter else server.latency
+        if delay:
+            time.sleep(delay)
+
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_json(server.error_status, {'status': 'error'})
+            server.stats.record(time.perf_counter() - started, error=True)
+            return
 
         try:
             # Parse the JSON data
             data = json.loads(post_data)
-            print(f"Received POST request on {self.path} with data: {data}")
+        except ValueError:
+            self.send_json(400, {'error': 'Invalid JSON'})
+            server.stats.record(time.perf_counter() - started, bad=True)
+            return
 
-            # Process the data (modify this as per your needs)
-            response = {
-                "status": "success",
-                "message": "Data received successfully",
-                "receivedData": data
-            }
+        # Batched alerts arrive as {"sensorBoxId": ..., "events": [...]}
+        if isinstance(data, dict) and isinstance(data.get('events'), list):
+            box_id = data.get('sensorBoxId')
+            events = data['events']
+        else:
+            # The box is read from the event itself
+            box_id = None
+            events = [data]
+
+        self.handle_events(box_id, events)
+
+        self.send_json(200, {'status': 'success', 'receivedEvents': len(events)})
+        server.stats.record(time.perf_counter() - started, events=len(events))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        store = self.server.store
+        if url.path == '/stats':
+            self.send_json(200, self.server.stats.snapshot())
+        elif url.path in ('/events', '/counts') and store is not None:
+            self.send_query(url.path, {key: values[-1] for key, values in parse_qs(url.query).items()})
+        else:
+            self.send_json(404, {'error': 'Not found'})
 
-            # Send response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-        except json.JSONDecodeError:
-            self.send_response(400)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Invalid JSON"}).encode('utf-8'))
+    def send_query(self, path, query):
+        try:
+            box = query['box']
+            start_us = parse_time(query.get('start'), 0)
+            end_us = parse_time(query.get('end'), time.time_ns() // 1000 + 1)
+            sensor = query.get('sensor')
+            if path == '/events':
+                limit = min(int(query.get('limit', 1000)), 10000)
+                rows = self.server.store.events(box, start_us, end_us, sensor=sensor, limit=limit)
+                self.send_json(200, {'events': rows, 'count': len(rows)})
+            else:
+                self.send_json(200, {'counts': self.server.store.minute_counts(box, start_us, end_us, sensor=sensor)})
+        except KeyError:
+            self.send_json(400, {'error': 'box is required'})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+
+    def handle_events(self, box_id, events):
+        # Process the data (override or modify this as per your needs)
+        if self.server.store is not None:
+            self.server.store.add(box_id, events)
+        if self.server.verbose:
+            for event in events:
+                print(f"Received event on {self.path} from {box_id}: {event}")
+
+    def send_json(self, status, body):
+        # Content-Length lets keep-alive clients reuse the connection
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
 
     def log_message(self, format, *args):
-        # Customize log format
-        print("[HTTP Server]", self.address_string(), "-", format % args)
+        # Per-request lines only in verbose mode; stats cover the rest
+        if self.server.verbose:
+            print("[HTTP Server]", self.address_string(), "-", format % args)
+
+
+def parse_time(value, default):
+    """Epoch seconds or ISO 8601 to epoch microseconds."""
+    if value is None:
+        return default
+    try:
+        return int(float(value) * 1000000)
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp() * 1000000)
+
+
+def start_server(host='127.0.0.1', port=0, handler=CustomHTTPRequestHandler, **options):
+    """Run a receiver on a background thread (port 0 picks a free one)."""
+    server = ReceiverServer((host, port), handler, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def report_stats(server, interval):
+    while True:
+        time.sleep(interval)
+        stats = server.stats.snapshot(interval=True)
+        print(
+            f"[HTTP Server] {stats['requests_per_s']} req/s "
+            f"{stats['events_per_s']} events/s "
+            f"p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms "
+            f"total={stats['requests']} errors={stats['errors']} bad={stats['bad_requests']}"
+        )
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Box stand-in receiving sensor box alerts.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds, uniformly")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--stats-interval', type=float, default=5.0)
+    parser.add_argument('--verbose', action='store_true', help="print every request and event")
+    parser.add_argument('--store', help="keep events in this SQLite database and serve /events and /counts")
+    args = parser.parse_args()
+
     try:
         # Create an HTTP server instance
-        server = HTTPServer((HOST, PORT), CustomHTTPRequestHandler)
-        print(f"Starting HTTP server on {HOST}:{PORT}...")
+        server = ReceiverServer(
+            (args.host, args.port),
+            CustomHTTPRequestHandler,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            verbose=args.verbose,
+            store=EventStore(args.store) if args.store else None
+        )
+        print(f"Starting HTTP server on {args.host}:{args.port}...")
         print("Press Ctrl+C to stop the server.")
-        
+
+        threading.Thread(target=report_stats, args=(server, args.stats_interval), daemon=True).start()
+
         # Run the server
         server.serve_forever()
     except KeyboardInterrupt:
@@ -53,4 +270,4 @@ if __name__ == "__main__":
         server.server_close()
         print("Server stopped.")
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
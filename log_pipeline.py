@@ -0,0 +1,365 @@
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler
+
+# Log Pipeline
+# Sensor threads never write logs themselves: records go through a
+# bounded queue to one background writer thread, which writes them in
+# batches (one flush per batch) to a size-rotated file or stderr.
+#
+#   rate limiting  every call site (or an explicit extra={"log_key": k})
+#                  gets a token bucket of LOG_RATE records/s with bursts
+#                  of LOG_BURST; records over the limit are dropped and
+#                  the next one that passes says how many were, so the
+#                  log keeps a counted sample of a noisy message
+#   backpressure   when the queue is full, records are dropped rather
+#                  than blocking the caller
+#   rotation       at LOG_MAX_BYTES the file moves to .1, .1 to .2, ...
+#                  keeping LOG_BACKUPS old files
+#
+# Lines are compact and fixed-field:
+#
+#   2026-01-31T12:00:00.123 I radar-worker radar_ultrasonic:420 message
+#
+# SENSORBOX_LOG_FILE picks the file (default: stderr) and
+# SENSORBOX_LOG_LEVEL the level (default: INFO).
+
+LOG_FILE_ENV = "SENSORBOX_LOG_FILE"
+
+LOG_LEVEL_ENV = "SENSORBOX_LOG_LEVEL"
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+
+LOG_BACKUPS = 3
+
+LOG_RATE = 1.0
+
+LOG_BURST = 10
+
+LOG_QUEUE_SIZE = 1024
+
+LOG_BATCH = 256
+
+LOG_FORMAT = "%(asctime)s %(levelname).1s %(threadName)s %(module)s:%(lineno)d %(message)s"
+
+
+class CompactFormatter(logging.Formatter):
+
+    default_time_format = "%Y-%m-%dT%H:%M:%S"
+
+    default_msec_format = "%s.%03d"
+
+    def __init__(self):
+
+        super().__init__(LOG_FORMAT)
+
+    def format(self, record):
+
+        line = super().format(record)
+
+        suppressed = getattr(record, "suppressed", 0)
+
+        if suppressed:
+            line += f" (+{suppressed} suppressed)"
+
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message key (the call site by default)."""
+
+    def __init__(self, rate=LOG_RATE, burst=LOG_BURST):
+
+        super().__init__()
+
+        self.rate = rate
+        self.burst = burst
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+        self.suppressed = 0
+
+    def filter(self, record):
+
+        key = getattr(record, "log_key", None) or (record.pathname, record.lineno)
+
+        now = record.created
+
+        with self._lock:
+
+            bucket = self._buckets.get(key)
+
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+            bucket[1] = now
+
+            if tokens < 1:
+
+                bucket[0] = tokens
+                bucket[2] += 1
+
+                self.suppressed += 1
+
+                return False
+
+            bucket[0] = tokens - 1
+
+            skipped = bucket[2]
+            bucket[2] = 0
+
+        if skipped:
+            record.suppressed = skipped
+
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking on a full queue."""
+
+    def __init__(self, log_queue):
+
+        super().__init__(log_queue)
+
+        self.dropped = 0
+
+    def enqueue(self, record):
+
+        try:
+            self.queue.put_nowait(record)
+
+        except queue.Full:
+            self.dropped += 1
+
+
+class RotatingLogFile(logging.Handler):
+    """Size-rotated log file, flushed by the writer once per batch."""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+
+        super().__init__()
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+        self._open()
+
+    def _open(self):
+
+        self.stream = open(self.path, "ab", buffering=64 * 1024)
+
+        self.size = self.stream.tell()
+
+    def _rotate(self):
+
+        self.stream.close()
+
+        for index in range(self.backups - 1, 0, -1):
+
+            source = f"{self.path}.{index}"
+
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+
+        else:
+            os.remove(self.path)
+
+        self._open()
+
+    def emit(self, record):
+
+        try:
+
+            data = (self.format(record) + "\n").encode("utf-8", "replace")
+
+            if self.size and self.size + len(data) > self.max_bytes:
+                self._rotate()
+
+            self.stream.write(data)
+
+            self.size += len(data)
+
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+
+        if self.stream and not self.stream.closed:
+            self.stream.flush()
+
+    def close(self):
+
+        self.flush()
+
+        self.stream.close()
+
+        super().close()
+
+
+class LogWriter:
+    """Background thread draining the queue into the output handler."""
+
+    def __init__(self, log_queue, handler):
+
+        self.queue = log_queue
+        self.handler = handler
+
+        self.written = 0
+
+        self._thread = None
+
+    def _run(self):
+
+        log_queue = self.queue
+        handler = self.handler
+
+        while True:
+
+            record = log_queue.get()
+
+            batch = [record]
+
+            while len(batch) < LOG_BATCH:
+
+                try:
+                    batch.append(log_queue.get_nowait())
+
+                except queue.Empty:
+                    break
+
+            stop = False
+
+            for record in batch:
+
+                if record is None:
+                    stop = True
+                    continue
+
+                handler.handle(record)
+
+                self.written += 1
+
+            handler.flush()
+
+            if stop:
+                return
+
+    def start(self):
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="log-writer",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+
+        if self._thread is None:
+            return
+
+        # Waits for room if the queue is full, so queued records are
+        # written before the stop marker
+
+        try:
+            self.queue.put(None, timeout=timeout)
+
+        except queue.Full:
+            return
+
+        self._thread.join(timeout)
+
+        self._thread = None
+
+
+_pipeline = None
+
+
+def setup_logging(level=None, path=None, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+                  rate=LOG_RATE, burst=LOG_BURST):
+    """Route the root logger through the queue and background writer."""
+
+    global _pipeline
+
+    if _pipeline is not None:
+        return _pipeline
+
+    level = level or os.environ.get(LOG_LEVEL_ENV, "INFO")
+    path = path or os.environ.get(LOG_FILE_ENV)
+
+    if path:
+        output = RotatingLogFile(path, max_bytes, backups)
+
+    else:
+        output = logging.StreamHandler(sys.stderr)
+
+    output.setFormatter(CompactFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    handler = DroppingQueueHandler(log_queue)
+
+    limiter = RateLimitFilter(rate, burst)
+
+    handler.addFilter(limiter)
+
+    writer = LogWriter(log_queue, output)
+
+    writer.start()
+
+    root = logging.getLogger()
+
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _pipeline = (handler, limiter, writer)
+
+    return _pipeline
+
+
+def shutdown_logging():
+    """Write out everything queued and close the output."""
+
+    global _pipeline
+
+    if _pipeline is None:
+        return
+
+    handler, _, writer = _pipeline
+
+    logging.getLogger().removeHandler(handler)
+
+    writer.stop()
+
+    writer.handler.close()
+
+    _pipeline = None
+
+
+def stats():
+
+    if _pipeline is None:
+        return {}
+
+    handler, limiter, writer = _pipeline
+
+    return {
+        "written": writer.written,
+        "suppressed": limiter.suppressed,
+        "dropped": handler.dropped,
+        "queued": handler.queue.qsize()
+    }
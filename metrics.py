@@ -0,0 +1,364 @@
+import abc
+import bisect
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Metrics
+# An in-process registry of counters, gauges and fixed-bucket
+# histograms, rendered in the Prometheus text format (0.0.4) by a
+# small HTTP endpoint.
+#
+# Families are declared once at import time. Hot paths look up the
+# labelled child once (e.g. per sensor) and then only call inc() or
+# observe(), which take an uncontended per-child lock. Values that
+# already exist elsewhere (queue depth, parser error counts) are not
+# copied on every change: the family is given a function that reads
+# them when the endpoint is scraped.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_value(value):
+
+    if value == math.inf:
+        return "+Inf"
+
+    if value == -math.inf:
+        return "-Inf"
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+def _escape(value):
+
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(names, values, extra=()):
+
+    pairs = list(zip(names, values)) + list(extra)
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+# Values
+
+class CounterValue:
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+
+        with self._lock:
+            self.value += amount
+
+
+class GaugeValue:
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def set(self, value):
+
+        self.value = value
+
+    def inc(self, amount=1):
+
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+
+        self.inc(-amount)
+
+
+class HistogramValue:
+
+    def __init__(self, buckets):
+
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+# Families
+
+class MetricFamily(abc.ABC):
+    """A named metric with optional labels, e.g. samples per sensor."""
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+
+        self._children = {}
+        self._lock = threading.Lock()
+        self._function = None
+
+    @abc.abstractmethod
+    def _new_value(self):
+
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The value for one set of label values, created on first use."""
+
+        child = self._children.get(values)
+
+        if child is None:
+
+            values = tuple(str(value) for value in values)
+
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+
+            with self._lock:
+                child = self._children.setdefault(values, self._new_value())
+
+        return child
+
+    def set_function(self, function):
+        """Read the values from ``function`` at scrape time instead.
+
+        Unlabelled families expect a number; labelled ones a mapping of
+        label value (or tuple of values) to number.
+        """
+
+        self._function = function
+
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value)."""
+
+        if self._function is not None:
+
+            result = self._function()
+
+            if not self.labelnames:
+                yield "", (), (), result
+                return
+
+            for values, value in result.items():
+
+                if not isinstance(values, tuple):
+                    values = (values,)
+
+                yield "", values, (), value
+
+            return
+
+        for values, child in list(self._children.items()):
+            yield "", values, (), child.value
+
+    def render(self):
+
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+
+        for suffix, values, extra, value in self.samples():
+
+            lines.append(
+                f"{self.name}{suffix}{_labels(self.labelnames, values, extra)} "
+                f"{_format_value(value)}"
+            )
+
+        return "\n".join(lines)
+
+
+class Counter(MetricFamily):
+
+    kind = "counter"
+
+    def _new_value(self):
+
+        return CounterValue()
+
+    def inc(self, amount=1):
+
+        self.labels().inc(amount)
+
+
+class Gauge(MetricFamily):
+
+    kind = "gauge"
+
+    def _new_value(self):
+
+        return GaugeValue()
+
+    def set(self, value):
+
+        self.labels().set(value)
+
+
+class Histogram(MetricFamily):
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+
+        super().__init__(name, help, labels)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self):
+
+        return HistogramValue(self.buckets)
+
+    def observe(self, value):
+
+        self.labels().observe(value)
+
+    def samples(self):
+
+        for values, child in list(self._children.items()):
+
+            counts, total = child.snapshot()
+
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+
+                cumulative += count
+
+                yield "_bucket", values, (("le", _format_value(float(bound))),), cumulative
+
+            yield "_sum", values, (), total
+            yield "_count", values, (), cumulative
+
+
+# Registry
+
+class Registry:
+
+    def __init__(self):
+
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family):
+
+        with self._lock:
+
+            if family.name in self._families:
+                raise ValueError(f"Metric {family.name} already registered")
+
+            self._families[family.name] = family
+
+        return family
+
+    def counter(self, name, help, labels=()):
+
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+
+        parts = []
+
+        for family in list(self._families.values()):
+
+            try:
+                parts.append(family.render())
+
+            except Exception as e:
+                logging.error(f"Metric {family.name} failed: {e}")
+
+        return "\n".join(parts) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# HTTP Endpoint
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    registry = REGISTRY
+
+    def do_GET(self):
+
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+
+            self.send_error(404)
+            return
+
+        body = self.registry.render().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+
+        pass
+
+
+def start_metrics_server(host, port, registry=REGISTRY):
+    """Serve ``registry`` on http://host:port/metrics from a daemon thread."""
+
+    handler = type("BoundMetricsHandler", (MetricsHandler,), {"registry": registry})
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    threading.Thread(
+        target=server.serve_forever,
+        name="metrics-http",
+        daemon=True
+    ).start()
+
+    logging.info(f"Metrics on http://{host}:{server.server_address[1]}/metrics")
+
+    return server
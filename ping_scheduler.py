@@ -0,0 +1,358 @@
+import collections
+import logging
+import threading
+import time
+
+# Ultrasonic Ping Scheduler
+# Owns every ultrasonic sensor and decides when each one fires.
+#
+# Sensors that can hear each other's pings are put in the same
+# crosstalk group. A group fires one sensor at a time and leaves at
+# least `echo_window` seconds between triggers, so a late echo from
+# one transducer is never read by another. Separate groups run in
+# their own threads and fire in parallel. Inside a group the sensor
+# whose next ping is most overdue goes first, which keeps each sensor
+# close to its target rate until the group runs out of echo windows.
+#
+# A sensor can be paused with set_active(sensor_id, False), e.g. while
+# its power is off; it keeps its place and fires again when resumed.
+
+ECHO_WINDOW = 0.025  # 20 ms max echo plus ringdown
+
+DEFAULT_GROUP = "default"
+
+
+class _Sensor:
+
+    def __init__(self, sensor_id, measure, rate_hz):
+
+        self.sensor_id = sensor_id
+        self.measure = measure
+        self.rate_hz = rate_hz
+        self.next_due = 0.0
+        self.active = True
+
+        self.pings = 0
+        self.misses = 0
+        self.history = collections.deque(maxlen=32)
+
+    def achieved_hz(self):
+
+        history = self.history
+
+        if len(history) < 2 or history[-1] == history[0]:
+            return 0.0
+
+        return (len(history) - 1) / (history[-1] - history[0])
+
+
+class _PingGroup:
+
+    def __init__(self, name, echo_window, on_result):
+
+        self.name = name
+        self.echo_window = echo_window
+        self.on_result = on_result
+
+        self.sensors = {}
+        self._wake = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    def add(self, sensor):
+
+        with self._wake:
+
+            sensor.next_due = time.monotonic()
+
+            self.sensors[sensor.sensor_id] = sensor
+
+            self._wake.notify()
+
+    def remove(self, sensor_id):
+
+        with self._wake:
+            return self.sensors.pop(sensor_id, None)
+
+    def set_rate(self, sensor_id, rate_hz):
+
+        with self._wake:
+
+            sensor = self.sensors.get(sensor_id)
+
+            if sensor is None:
+                return
+
+            sensor.rate_hz = rate_hz
+
+            # A faster rate counts from the last ping, not from a ping
+            # planned at the old, slower rate
+
+            if sensor.history:
+                sensor.next_due = min(sensor.next_due, sensor.history[-1] + 1.0 / rate_hz)
+
+            self._wake.notify()
+
+    def set_active(self, sensor_id, active):
+
+        with self._wake:
+
+            sensor = self.sensors.get(sensor_id)
+
+            if sensor is None or sensor.active == active:
+                return
+
+            sensor.active = active
+
+            if active:
+                sensor.next_due = time.monotonic()
+
+            self._wake.notify()
+
+    def _next(self):
+
+        # Earliest-deadline-first among the group's sensors.
+
+        with self._wake:
+
+            while not self._stop:
+
+                active = [s for s in self.sensors.values() if s.active]
+
+                if active:
+
+                    sensor = min(active, key=lambda s: s.next_due)
+
+                    delay = sensor.next_due - time.monotonic()
+
+                    if delay <= 0:
+                        return sensor
+
+                    self._wake.wait(delay)
+
+                else:
+                    self._wake.wait()
+
+        return None
+
+    def _run(self):
+
+        while True:
+
+            sensor = self._next()
+
+            if sensor is None:
+                return
+
+            fired = time.monotonic()
+
+            try:
+                distance = sensor.measure()
+
+            except Exception as e:
+
+                logging.error(f"{sensor.sensor_id} Ping Error : {e}")
+
+                distance = -1
+
+            sensor.pings += 1
+            sensor.history.append(fired)
+
+            if distance == -1:
+                sensor.misses += 1
+
+            # Never catch up with a burst: if the sensor fell behind,
+            # its next ping is one period from now.
+
+            sensor.next_due = max(
+                sensor.next_due + 1.0 / sensor.rate_hz,
+                fired
+            )
+
+            try:
+                self.on_result(sensor.sensor_id, distance, fired)
+
+            except Exception as e:
+                logging.error(f"{sensor.sensor_id} Pipeline Error : {e}")
+
+            # Hold the whole group until this ping's echoes have died.
+
+            remaining = fired + self.echo_window - time.monotonic()
+
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def alive(self):
+
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"ping-{self.name}",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self, timeout=None):
+
+        with self._wake:
+
+            self._stop = True
+
+            self._wake.notify()
+
+        # on_result may remove the group's last sensor from its own thread
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+class PingScheduler:
+    """Fires ultrasonic sensors at per-sensor rates without crosstalk.
+
+    ``measure`` is a zero-argument callable returning a distance in cm or
+    -1. ``on_result(sensor_id, distance, timestamp)`` runs on the group
+    thread after every ping, so it must not block. It may call back into
+    the scheduler: group threads are never joined while ``_lock`` is held.
+    """
+
+    def __init__(self, on_result, echo_window=ECHO_WINDOW):
+
+        self.on_result = on_result
+        self.echo_window = echo_window
+
+        self._groups = {}
+        self._sensor_groups = {}
+        self._lock = threading.Lock()
+
+    def add(self, sensor_id, measure, rate_hz, group=None):
+
+        group = group or DEFAULT_GROUP
+
+        with self._lock:
+
+            empty = self._remove(sensor_id)
+
+            ping_group = self._groups.get(group)
+
+            # A group whose thread died is replaced, and its other
+            # sensors move over with their rates and pause state.
+
+            if ping_group is None or not ping_group.alive():
+
+                dead = ping_group
+
+                ping_group = _PingGroup(group, self.echo_window, self.on_result)
+
+                if dead is not None:
+
+                    for sensor in list(dead.sensors.values()):
+                        ping_group.add(sensor)
+
+                ping_group.start()
+
+                self._groups[group] = ping_group
+
+            ping_group.add(_Sensor(sensor_id, measure, rate_hz))
+
+            self._sensor_groups[sensor_id] = group
+
+        if empty is not None:
+            empty.stop()
+
+    def remove(self, sensor_id):
+
+        with self._lock:
+            empty = self._remove(sensor_id)
+
+        if empty is not None:
+            empty.stop()
+
+    def _remove(self, sensor_id):
+
+        # Returns the sensor's group if it is now empty; the caller stops
+        # it once the lock is released.
+
+        group = self._sensor_groups.pop(sensor_id, None)
+
+        if group is None:
+            return None
+
+        ping_group = self._groups[group]
+
+        ping_group.remove(sensor_id)
+
+        if ping_group.sensors:
+            return None
+
+        return self._groups.pop(group)
+
+    def set_rate(self, sensor_id, rate_hz):
+
+        with self._lock:
+
+            group = self._sensor_groups.get(sensor_id)
+
+            if group is not None:
+                self._groups[group].set_rate(sensor_id, rate_hz)
+
+    def set_active(self, sensor_id, active):
+        """Pause (False) or resume (True) a sensor's pings."""
+
+        with self._lock:
+
+            group = self._sensor_groups.get(sensor_id)
+
+            if group is not None:
+                self._groups[group].set_active(sensor_id, active)
+
+    def sensor_ids(self):
+
+        return list(self._sensor_groups)
+
+    def alive(self, sensor_id):
+        """Whether the sensor's group thread is running."""
+
+        with self._lock:
+
+            group = self._sensor_groups.get(sensor_id)
+
+            return group is not None and self._groups[group].alive()
+
+    def stop(self, timeout=None):
+
+        with self._lock:
+
+            groups = list(self._groups.values())
+
+            self._groups.clear()
+            self._sensor_groups.clear()
+
+        for ping_group in groups:
+            ping_group.stop(timeout)
+
+    # Stats
+
+    def stats(self):
+
+        stats = {}
+
+        with self._lock:
+
+            for name, ping_group in self._groups.items():
+
+                for sensor in list(ping_group.sensors.values()):
+
+                    stats[sensor.sensor_id] = {
+                        "group": name,
+                        "target_hz": sensor.rate_hz,
+                        "active": sensor.active,
+                        "achieved_hz": round(sensor.achieved_hz(), 2),
+                        "pings": sensor.pings,
+                        "misses": sensor.misses
+                    }
+
+        return stats
@@ -0,0 +1,140 @@
+import threading
+from collections import namedtuple
+
+# Presence Tracking
+# Turns a stream of in-range / out-of-range samples into one "enter"
+# event when an intrusion starts and one "exit" event when it ends,
+# with an optional "still-present" heartbeat in between.
+#
+#   min_dwell      seconds a target must stay in range before "enter"
+#   clear_timeout  seconds without an in-range sample before "exit"
+#   hysteresis     cm the range is widened by while present, so a
+#                  target hovering at the edge does not flap
+#   heartbeat      seconds between "still-present" events (None: off)
+
+ENTER = "enter"
+
+EXIT = "exit"
+
+STILL_PRESENT = "still-present"
+
+PresenceEvent = namedtuple(
+    "PresenceEvent",
+    ["kind", "timestamp", "distance", "duration"]
+)
+
+
+class PresenceTracker:
+    """Per-sensor presence state machine with enter/exit hysteresis."""
+
+    def __init__(self, min_dwell=0.0, clear_timeout=3.0, hysteresis=20.0, heartbeat=None):
+
+        self._lock = threading.Lock()
+
+        self.present = False
+        self._first_hit = None
+        self._last_hit = None
+        self._entered = None
+        self._last_heartbeat = None
+        self._last_distance = None
+
+        self.events = 0
+
+        self.configure(min_dwell, clear_timeout, hysteresis, heartbeat)
+
+    def configure(self, min_dwell=0.0, clear_timeout=3.0, hysteresis=20.0, heartbeat=None):
+
+        self.min_dwell = min_dwell
+        self.clear_timeout = clear_timeout
+        self.hysteresis = hysteresis
+        self.heartbeat = heartbeat
+
+    def configure_from(self, config):
+
+        config = config or {}
+
+        self.configure(
+            min_dwell=config.get("min_dwell", 0.0),
+            clear_timeout=config.get("clear_timeout", 3.0),
+            hysteresis=config.get("hysteresis", 20.0),
+            heartbeat=config.get("heartbeat")
+        )
+
+    def _event(self, kind, timestamp):
+
+        self.events += 1
+
+        duration = 0.0 if self._entered is None else timestamp - self._entered
+
+        return PresenceEvent(kind, timestamp, self._last_distance, duration)
+
+    def update(self, distances, min_range, max_range, timestamp):
+        """Feed a batch of filtered distances. Returns a PresenceEvent or None."""
+
+        with self._lock:
+
+            margin = self.hysteresis if self.present else 0.0
+
+            hit = None
+
+            for distance in distances:
+
+                if min_range - margin <= distance <= max_range + margin:
+                    hit = distance
+
+            if hit is None:
+                return self._expire(timestamp)
+
+            self._last_hit = timestamp
+            self._last_distance = float(hit)
+
+            if self.present:
+
+                if (
+                    self.heartbeat
+                    and timestamp - self._last_heartbeat >= self.heartbeat
+                ):
+
+                    self._last_heartbeat = timestamp
+
+                    return self._event(STILL_PRESENT, timestamp)
+
+                return None
+
+            if self._first_hit is None:
+                self._first_hit = timestamp
+
+            if timestamp - self._first_hit < self.min_dwell:
+                return None
+
+            self.present = True
+            self._entered = timestamp
+            self._last_heartbeat = timestamp
+
+            return self._event(ENTER, timestamp)
+
+    def expire(self, timestamp):
+        """Check the clear timeout when no samples are arriving."""
+
+        with self._lock:
+            return self._expire(timestamp)
+
+    def _expire(self, timestamp):
+
+        if self._last_hit is None or timestamp - self._last_hit < self.clear_timeout:
+            return None
+
+        # A candidate that went quiet before min_dwell never entered.
+
+        self._first_hit = None
+
+        if not self.present:
+            return None
+
+        self.present = False
+
+        event = self._event(EXIT, timestamp)
+
+        self._entered = None
+
+        return event
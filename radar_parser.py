@@ -0,0 +1,105 @@
+import time
+from collections import namedtuple
+
+# Radar Frame Parser
+# The radar prints one "Range <n>" line per measurement. Serial reads
+# return arbitrary chunks, so a line can be split across reads; the
+# parser keeps the unterminated tail in a carry-over buffer and
+# parses complete lines straight from bytes, without decoding the
+# chunk to str first.
+
+RadarSample = namedtuple("RadarSample", ["distance", "timestamp"])
+
+# Builds a RadarSample without going through the generated __new__,
+# roughly halving the per-sample construction cost.
+
+_new_sample = tuple.__new__
+
+
+class RangeParser:
+    """Incremental parser for ``Range <n>`` records.
+
+    ``feed`` returns the samples completed by the chunk, stamped with the
+    time the chunk was received. A line longer than ``max_line`` bytes
+    without a newline is treated as garbage and discarded.
+    """
+
+    def __init__(self, prefix=b"Range", max_line=128):
+
+        self.prefix = prefix
+        self.max_line = max_line
+
+        self._buffer = bytearray()
+
+        self.samples = 0
+        self.parse_errors = 0
+        self.overflows = 0
+
+    def feed(self, data, timestamp=None):
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        buffer = self._buffer
+        buffer += data
+
+        end = buffer.rfind(b"\n")
+
+        if end < 0:
+
+            if len(buffer) > self.max_line:
+
+                buffer.clear()
+
+                self.overflows += 1
+
+            return []
+
+        # Split every complete line in one C-level call, then leave only
+        # the unterminated tail in the buffer.
+
+        lines = buffer[:end].split(b"\n")
+
+        del buffer[:end + 1]
+
+        prefix = self.prefix
+        skip = len(prefix)
+        samples = []
+        append = samples.append
+
+        for line in lines:
+
+            start = line.find(prefix)
+
+            if start < 0:
+                continue
+
+            # float() accepts bytes and ignores surrounding whitespace,
+            # including the radar's trailing "\r".
+
+            try:
+                append(_new_sample(RadarSample, (float(line[start + skip:]), timestamp)))
+
+            except ValueError:
+
+                fields = line[start + skip:].split()
+
+                try:
+                    append(_new_sample(RadarSample, (float(fields[0]), timestamp)))
+
+                except (IndexError, ValueError):
+                    self.parse_errors += 1
+
+        if len(buffer) > self.max_line:
+
+            buffer.clear()
+
+            self.overflows += 1
+
+        self.samples += len(samples)
+
+        return samples
+
+    def reset(self):
+
+        self._buffer.clear()
@@ -1,18 +1,19 @@
 import serial
 import time
 
+from radar_parser import RangeParser
+
 def read_uart():
     # Configure the serial connection
     ser = serial.Serial('/dev/ttyS0', 115200, timeout=1)
+    parser = RangeParser()  # Keeps partial lines between reads
 
     try:
         while True:
             if ser.in_waiting > 0:  # Check if there is data waiting to be read
-                line = ser.readline().decode('utf-8').rstrip()  # Read a line and decode it
-                # Attempt to extract numeric values only
-                numeric_values = ''.join(filter(str.isdigit, line))
-                if numeric_values:  # Only print if there are numeric values
-                    print(numeric_values)  # Print the numeric values
+                data = ser.read(ser.in_waiting)
+                for sample in parser.feed(data):
+                    print(f"{sample.distance:g}")  # Print the parsed distance
             time.sleep(0.1)  # Sleep briefly to avoid busy waiting
     except KeyboardInterrupt:
         print("Exiting...")
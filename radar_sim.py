@@ -0,0 +1,126 @@
+import os
+import pty
+import random
+import threading
+import time
+import tty
+
+# Virtual Radar
+# A pty pair that behaves like the radar's UART: a background thread
+# writes "Range <n>\r\n" lines into the master end at a fixed rate,
+# and the slave end's path (/dev/pts/N) is opened with pyserial or
+# the SerialMultiplexer exactly like /dev/ttyS0.
+
+
+class VirtualRadar:
+    """Emits ``Range`` lines on a pty at ``rate`` lines per second.
+
+    ``distance`` is in cm, or a callable returning cm (None skips the
+    line). ``noise`` is the standard deviation in cm added per line.
+    """
+
+    def __init__(self, distance=700.0, rate=20.0, noise=0.0):
+
+        self.distance = distance
+        self.rate = rate
+        self.noise = noise
+
+        self._master, self._slave = pty.openpty()
+
+        # Raw mode so the line discipline leaves "\r\n" alone.
+
+        tty.setraw(self._slave)
+
+        self.path = os.ttyname(self._slave)
+
+        self.lines = 0
+
+        # Cleared while the radar's power pin is off: no lines
+
+        self.powered = True
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Called with the perf_counter_ns stamp of every line written,
+        # e.g. to measure end-to-end latency.
+
+        self.on_emit = None
+
+    def set_distance(self, distance):
+
+        self.distance = distance
+
+    def _line(self):
+
+        distance = self.distance() if callable(self.distance) else self.distance
+
+        if distance is None:
+            return None
+
+        if self.noise:
+            distance = max(0.0, random.gauss(distance, self.noise))
+
+        return f"Range {distance:.0f}\r\n".encode()
+
+    def _run(self):
+
+        interval = 1.0 / self.rate
+        tick = time.monotonic()
+
+        while not self._stop.is_set():
+
+            line = self._line() if self.powered else None
+
+            if line is not None:
+
+                stamp = time.perf_counter_ns()
+
+                try:
+                    os.write(self._master, line)
+
+                except OSError:
+                    return
+
+                self.lines += 1
+
+                if self.on_emit is not None:
+                    self.on_emit(stamp)
+
+            tick += interval
+
+            delay = tick - time.monotonic()
+
+            if delay > 0:
+                self._stop.wait(delay)
+
+            else:
+                tick = time.monotonic()
+
+    def start(self):
+
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"virtual-radar-{self.path}",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self):
+
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+
+        self.stop()
+
+        os.close(self._master)
+        os.close(self._slave)
@@ -1,28 +1,32 @@
-import requests
-import json
-import RPi.GPIO as GPIO
+import functools
 import time
-import serial
-import threading
 import logging
 import os
 
-# Logging
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-#lock for send_alert 
-alert_lock = threading.Lock()
-
-# GPIO Mode
-# Using BCM numbering because power pins use GPIO numbers.
-# If you prefer BOARD numbering, change the pin numbers
-# accordingly.
+from adaptive_rate import RateController
+from alert_dispatcher import AlertDispatcher
+from alert_spool import AlertSpool
+from config_cache import ConfigCache
+from control import LiveRates, start_control_server
+from detection import DetectionPipeline
+from duty_cycle import DutyCycler
+from echo_timing import make_echo_timer
+from hardware import select_backend
+from http_client import get_client
+from log_pipeline import setup_logging, shutdown_logging
+from log_pipeline import stats as log_stats
+from metrics import REGISTRY, start_metrics_server
+from ping_scheduler import PingScheduler
+from sample_recorder import SampleRecorder
+from sensor_registry import SensorSchema
+from serial_mux import SerialMultiplexer
+from supervisor import Supervisor
 
-GPIO.setmode(GPIO.BCM)
+# Logging
+# Configured in __main__ by log_pipeline.setup_logging(): records are
+# queued to a background writer, rate limited per call site and
+# written to a size-rotated SENSORBOX_LOG_FILE (or stderr), so the
+# sample loops never wait on the SD card.
 
 # AI Box URL
 #change the ip according to the AI Box ip address
@@ -30,12 +34,20 @@ GPIO.setmode(GPIO.BCM)
 SERVER_URL = "http://192.168.1.100:5000/api/alerts/from-nx"
 
 # Configuration File
+# sensors.json and the alert spool live next to this script unless
+# SENSORBOX_DATA_DIR points somewhere else (a benchmark's temp dir).
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-CONFIG_FILE = os.path.join(BASE_DIR, "sensors.json")
+DATA_DIR = os.environ.get("SENSORBOX_DATA_DIR", BASE_DIR)
+
+CONFIG_FILE = os.path.join(DATA_DIR, "sensors.json")
+
+SPOOL_FILE = os.path.join(DATA_DIR, "alert_spool.db")
 
 # Sensor Definitions
+# Any number of radars can be listed; extra ones on USB-serial
+# adapters use "uart": "/dev/ttyUSB0", "/dev/ttyUSB1", ...
 
 SENSORS = {
 
@@ -43,355 +55,1045 @@ SENSORS = {
         "type": "radar",
         "uart": "/dev/ttyS0",
         "baudrate": 115200,
-        "power_pin": 17
+        "power_pin": 17,
+        "zone": "front"
     },
 
     "US001": {
         "type": "ultrasonic",
         "trig": 23,
         "echo": 24,
-        "power_pin": 27
+        "power_pin": 27,
+        "crosstalk_group": "front",
+        "zone": "front"
     }
 
 }
 
-# GPIO Setup
+# Hardware Backend
+# GPIO, power pins and serial ports are reached only through the
+# backend chosen at startup ("rpi" on the Pi, "sim" anywhere else;
+# see hardware.py). Nothing touches hardware at import time.
+# Pins use BCM numbering because power pins use GPIO numbers.
 
-for sensor in SENSORS.values():
+hardware = None
 
-    GPIO.setup(sensor["power_pin"], GPIO.OUT)
 
-    GPIO.output(sensor["power_pin"], GPIO.HIGH)
+def init_hardware(backend=None):
 
-    if sensor["type"] == "ultrasonic":
+    global hardware
+
+    hardware = select_backend(backend, SENSORS)
 
-        GPIO.setup(sensor["trig"], GPIO.OUT)
-        GPIO.setup(sensor["echo"], GPIO.IN)
+    hardware.setup(SENSORS)
+
+    return hardware
 
 # Power Control
 
 def sensor_on(power_pin):
 
-    GPIO.output(power_pin, GPIO.LOW)
+    hardware.power_on(power_pin)
 
 
 def sensor_off(power_pin):
 
-    GPIO.output(power_pin, GPIO.HIGH)
+    hardware.power_off(power_pin)
 
 
 # Configuration Loader
+# sensors.json is cached and only re-read when the file changes. Each
+# load is migrated, validated against SENSORS and compiled into a
+# SensorRegistry (sensor_registry.py); a bad file is rejected, at
+# startup with an error listing every problem. The hot loops read the
+# registry's SensorConfig attributes and never touch the SD card.
+#
+# Like the hardware, the file is only read (and created from
+# DEFAULT_CONFIG if missing) once start_manager() calls init_config().
+
+DEFAULT_CONFIG = {
+
+    "sensorBoxId":"sensor1",
+
+    "sensors": {
+
+        "RD001": {
+            "enabled": True,
+            "min_range": 120,
+            "max_range": 400
+        },
+
+        "US001": {
+            "enabled": True,
+            "min_range": 120,
+            "max_range": 400
+        }
+
+    }
+
+}
+
+# The supervisor waits on config_cache for a new generation, so changes
+# made through the control socket apply at once; it still wakes every
+# SENSOR_POLL_INTERVAL to check the workers and the clear timeouts.
+
+SENSOR_POLL_INTERVAL = 0.5
+
+config_cache = None
+
+
+def init_config():
+
+    global config_cache
+
+    config_cache = ConfigCache(
+        CONFIG_FILE,
+        default=DEFAULT_CONFIG,
+        poll_interval=1.0,
+        schema=SensorSchema(SENSORS)
+    )
+
+    return config_cache
+
 
 def load_config():
 
-    if not os.path.exists(CONFIG_FILE):
+    return config_cache.snapshot()
 
-        default = {
 
-            "sensorBoxId":"sensor1",
+def registry():
 
-            "RD001": {
-                "enabled": True,
-                "min_range": 120,
-                "max_range": 400
-            },
+    return config_cache.compiled
 
-            "US001": {
-                "enabled": True,
-                "min_range": 120,
-                "max_range": 400
-            }
+# Metrics
+# Served in Prometheus text format on SENSORBOX_METRICS_ADDR
+# (host:port, default 127.0.0.1:9108; empty to disable). The sample
+# loops only bump counters; everything else is read from the reader,
+# scheduler and dispatcher stats when the endpoint is scraped. The
+# per-sensor sample rate is rate(sensorbox_samples_total[1m]); every
+# sample is counted on arrival, before the duty cycle and adaptive rate
+# gates, and a missed ultrasonic echo counts as a sample.
 
-        }
+METRICS_ENV = "SENSORBOX_METRICS_ADDR"
+
+METRICS_ADDR = "127.0.0.1:9108"
+
+metrics_server = None
+
+samples_total = REGISTRY.counter(
+    "sensorbox_samples_total",
+    "Distance samples received",
+    labels=("sensor",)
+)
+
+http_latency = REGISTRY.histogram(
+    "sensorbox_http_request_seconds",
+    "Alert POST latency including retries"
+)
+
+http_failures = REGISTRY.counter(
+    "sensorbox_http_failures_total",
+    "Alert POSTs that failed after all retries"
+)
+
+
+def radar_stat(key):
+
+    return lambda: {
+        sensor_id: stats[key]
+        for sensor_id, stats in radar_reader.stats().items()
+    }
+
+
+def ping_stat(key):
+
+    return lambda: {
+        sensor_id: stats[key]
+        for sensor_id, stats in ping_scheduler.stats().items()
+    }
+
+
+def echo_timeouts():
+
+    return {
+        sensor_id: echo_timers[sensor["echo"]].timeouts
+        for sensor_id, sensor in SENSORS.items()
+        if sensor["type"] == "ultrasonic" and sensor["echo"] in echo_timers
+    }
+
+
+def dispatcher_stat(*keys):
+
+    def read():
+
+        stats = dispatcher.stats()
+
+        return {key: stats.get(key, 0) for key in keys}
+
+    return read
+
+
+REGISTRY.counter(
+    "sensorbox_parse_errors_total",
+    "Radar lines that could not be parsed",
+    labels=("sensor",)
+).set_function(radar_stat("parse_errors"))
+
+REGISTRY.counter(
+    "sensorbox_serial_reconnects_total",
+    "Radar serial port reconnects",
+    labels=("sensor",)
+).set_function(radar_stat("reconnects"))
+
+REGISTRY.counter(
+    "sensorbox_echo_timeouts_total",
+    "Ultrasonic pings whose echo timed out",
+    labels=("sensor",)
+).set_function(echo_timeouts)
+
+REGISTRY.counter(
+    "sensorbox_ping_misses_total",
+    "Ultrasonic pings fired late or skipped by the scheduler",
+    labels=("sensor",)
+).set_function(ping_stat("misses"))
+
+REGISTRY.gauge(
+    "sensorbox_alert_queue_depth",
+    "Alerts waiting in the dispatcher queue"
+).set_function(lambda: dispatcher.queue_depth())
+
+REGISTRY.gauge(
+    "sensorbox_alert_spool_depth",
+    "Undelivered alerts in the on-disk spool"
+).set_function(lambda: spool.depth())
+
+REGISTRY.counter(
+    "sensorbox_alerts_total",
+    "Alerts by outcome",
+    labels=("outcome",)
+).set_function(dispatcher_stat("sent", "failed", "dropped", "suppressed", "replayed"))
+
+REGISTRY.counter(
+    "sensorbox_log_records_total",
+    "Log records by outcome",
+    labels=("outcome",)
+).set_function(lambda: {
+    outcome: log_stats().get(outcome, 0)
+    for outcome in ("written", "suppressed", "dropped")
+})
+
+REGISTRY.gauge(
+    "sensorbox_config_generation",
+    "sensors.json loads since start"
+).set_function(lambda: config_cache.generation)
+
+
+def worker_stat(key):
+
+    return lambda: {
+        sensor_id: stats[key]
+        for sensor_id, stats in supervisor.stats().items()
+    }
+
+
+REGISTRY.counter(
+    "sensorbox_worker_restarts_total",
+    "Sensor worker restarts after a crash",
+    labels=("sensor",)
+).set_function(worker_stat("restarts"))
+
+REGISTRY.gauge(
+    "sensorbox_worker_uptime_seconds",
+    "Seconds since the sensor worker (re)started, 0 while down",
+    labels=("sensor",)
+).set_function(worker_stat("uptime_s"))
+
+
+def duty_stat(key):
+
+    return lambda: {
+        sensor_id: stats[key]
+        for sensor_id, stats in duty_cycler.stats().items()
+    }
+
+
+REGISTRY.counter(
+    "sensorbox_sensor_powered_seconds_total",
+    "Seconds the sensor has been powered",
+    labels=("sensor",)
+).set_function(duty_stat("powered_s"))
+
+REGISTRY.gauge(
+    "sensorbox_sensor_duty_ratio",
+    "Share of time the sensor has been powered since its worker started",
+    labels=("sensor",)
+).set_function(duty_stat("duty"))
+
+REGISTRY.counter(
+    "sensorbox_sensor_wakes_total",
+    "Times the sensor was powered early by a hit in its zone",
+    labels=("sensor",)
+).set_function(duty_stat("wakes"))
+
+REGISTRY.gauge(
+    "sensorbox_sampling_active",
+    "1 while an adaptive sensor samples at full rate, 0 while idle",
+    labels=("sensor",)
+).set_function(lambda: {
+    sensor_id: int(controller.active)
+    for sensor_id, controller in list(rate_controllers.items())
+})
+
+REGISTRY.counter(
+    "sensorbox_untrusted_samples_total",
+    "Samples dropped because the sensor was off or warming up",
+    labels=("sensor",)
+).set_function(duty_stat("untrusted_samples"))
 
-        with open(CONFIG_FILE, "w") as f:
-             json.dump(default, f, indent=4)
 
-        return default
+def start_metrics(address=None):
 
-    with open(CONFIG_FILE, "r") as f:
+    global metrics_server
+
+    address = os.environ.get(METRICS_ENV, METRICS_ADDR) if address is None else address
+
+    if not address:
+        return None
+
+    host, _, port = address.rpartition(":")
+
+    try:
+        metrics_server = start_metrics_server(host or "127.0.0.1", int(port))
+
+    except OSError as e:
+        logging.error(f"Metrics endpoint on {address} failed: {e}")
+
+    return metrics_server
 
-        return json.load(f)
-    
 # HTTP Communication
 
 def send_http_command(payload):
 
+    started = time.perf_counter()
+
     try:
 
-        response = requests.post(
+        response = get_client().post_json(
             SERVER_URL,
-            json=payload,
-            timeout=5
+            payload
         )
 
         response.raise_for_status()
 
+        http_latency.observe(time.perf_counter() - started)
+
         logging.info(
-            f"Alert sent successfully ({payload['sensorId']})"
+            f"Alert sent successfully "
+            f"({payload.get('sensorId', payload.get('sensorBoxId'))})"
         )
 
+        return True
+
     except Exception as e:
 
+        http_latency.observe(time.perf_counter() - started)
+
+        http_failures.inc()
+
         logging.error(f"HTTP Error : {e}")
 
+        return False
+
+# Alert Dispatcher
+# Detections are queued and delivered by a single background thread.
+# Presence tracking already limits each zone to enter/exit events,
+# so there is no cooldown by default; a top-level "cooldown" (seconds)
+# in sensors.json suppresses repeat alerts from a zone inside that
+# window.
+#
+# Setting "alert_batch_size" above 1 in sensors.json groups alerts
+# into one {"sensorBoxId": ..., "events": [...]} POST, flushed after
+# "alert_batch_max_delay" seconds at the latest.
+#
+# Alerts that cannot be delivered go to an on-disk spool and are
+# replayed at up to SPOOL_REPLAY_RATE alerts/s once the AI Box is
+# reachable again.
+#
+# The spool and the dispatcher are built by start_manager(), so
+# importing this module creates no files. A change to the batch
+# settings applies from the next batch on.
+
+ALERT_QUEUE_SIZE = 64
+
+ALERT_COOLDOWN = 0.0
+
+SPOOL_MAX_ALERTS = 10000
+
+SPOOL_REPLAY_RATE = 5.0
+
+
+def send_http_batch(payloads):
+
+    return send_http_command({
+
+        "sensorBoxId": registry().box_id,
+
+        "events": payloads
+
+    })
+
+
+spool = None
+
+dispatcher = None
+
+
+def init_alerts():
+
+    global spool, dispatcher
+
+    config = registry()
+
+    spool = AlertSpool(
+        SPOOL_FILE,
+        max_alerts=SPOOL_MAX_ALERTS
+    )
+
+    dispatcher = AlertDispatcher(
+        send_http_command,
+        maxsize=ALERT_QUEUE_SIZE,
+        cooldown=ALERT_COOLDOWN,
+        send_batch=send_http_batch,
+        batch_size=config.alert_batch_size,
+        batch_max_delay=config.alert_batch_max_delay,
+        spool=spool,
+        replay_rate=SPOOL_REPLAY_RATE
+    )
+
+    return dispatcher
+
 # Alert Generator
 
-def send_alert(sensor_id):
+def send_alert(zone, event, confidence, sensors):
 
-    with alert_lock:
-        timestamp_us = int(time.time() * 1000000)
-        config = load_config()
-        sensor_box_id = config["sensorBoxId"]
-        
-        payload = {
+    timestamp_us = int(time.time() * 1000000)
+    config = registry()
 
-        "sensorId": "sensorBoxId",
+    payload = {
 
-        "data":"Type:nx.base.Detection;Confidence:0.72;TimestampUs:{timestamp_us};"
-        }
-        send_http_command(payload)
-        time.sleep(3)
+    "sensorId": config.box_id,
+
+    "data": (
+        f"Type:nx.base.Detection;Event:{event};Zone:{zone};"
+        f"Sensors:{'+'.join(sensors)};Confidence:{confidence:.2f};"
+        f"TimestampUs:{timestamp_us};"
+    )
+    }
+
+    return dispatcher.submit(zone, payload, cooldown=config.cooldown)
 
 
 # Ultrasonic Distance Function
+# Each sensor gets one echo timer: edge-triggered (GPIO callbacks
+# stamped with perf_counter_ns) where the GPIO library supports it,
+# otherwise polling.
+
+ECHO_MODE = "auto"
+
+echo_timers = {}
+
 
 def measure_distance(trig, echo):
 
-    GPIO.output(trig, GPIO.HIGH)
-    time.sleep(0.00001)
-    GPIO.output(trig, GPIO.LOW)
+    timer = echo_timers.get(echo)
 
-    pulse_start = time.time()
-    timeout = pulse_start
+    if timer is None:
 
-    while GPIO.input(echo) == 0:
+        timer = make_echo_timer(hardware.gpio, trig, echo, mode=ECHO_MODE)
 
-        pulse_start = time.time()
+        echo_timers[echo] = timer
 
-        if pulse_start - timeout > 0.02:
+        logging.info(f"Echo pin {echo} timed by {timer.mode}")
 
-            return -1
+    return timer.measure()
 
-    while GPIO.input(echo) == 1:
+# Duty Cycling
+# The workers hand their sensors to the DutyCycler (duty_cycle.py),
+# which switches the power pins in the "duty_on"/"duty_off" windows
+# from sensors.json and wakes a zone's sensors on a hit. Samples taken
+# while a sensor is off or warming up never reach the pipeline. An
+# ultrasonic sensor's pings are paused while it is off.
 
-        pulse_end = time.time()
 
-        if pulse_end - pulse_start > 0.02:
-            
-            return -1
+def set_power(sensor_id, powered):
 
-    duration = pulse_end - pulse_start
+    sensor = SENSORS[sensor_id]
 
-    distance = duration * 17150
+    if powered:
+        sensor_on(sensor["power_pin"])
 
-    if distance < 2 or distance > 800:
+    else:
+        sensor_off(sensor["power_pin"])
 
-        return -1
+    if sensor["type"] == "ultrasonic":
+        ping_scheduler.set_active(sensor_id, powered)
 
-    return distance
 
-# Radar Worker
+# wake_hold is set from sensors.json on every config generation
 
-def radar_worker(sensor_id):
+duty_cycler = DutyCycler(set_power)
 
-    logging.info(f"radar working is started {"sensor_id"}")
-    sensor = SENSORS[sensor_id]
+# Detection
+# Filtering, range check, zone fusion and presence tracking live in
+# DetectionPipeline (detection.py), shared with the replay tool.
+# Presence events become alerts; every in-range sample wakes the
+# sensor's zone.
 
-    while True:
+def report_presence(zone, event, confidence, sensors):
 
-        config = load_config()
+    send_alert(zone, event.kind, confidence, sensors)
 
-        sensor_config = config["sensors"].get(sensor_id, {})
 
-        if not sensor_config.get("enabled", False):
+pipeline = None
 
-            sensor_off(sensor["power_pin"])
 
-            time.sleep(2)
+def init_pipeline():
 
-            continue
+    global pipeline
 
-        sensor_on(sensor["power_pin"])
+    pipeline = DetectionPipeline(SENSORS, config_cache, report_presence, on_hit=duty_cycler.hit)
 
-        try:
+    pipeline.build_zones()
 
-            with serial.Serial(
-                sensor["uart"],
-                baudrate=sensor["baudrate"],
-                timeout=1
-            ) as ser:
+    return pipeline
 
-                logging.info(
-                    f"{sensor_id} connected on "
-                    f"{sensor['uart']}"
-                )
+# Adaptive Sampling
+# A sensor with an "adaptive" policy in sensors.json gets a
+# RateController (adaptive_rate.py): an ultrasonic sensor pings at its
+# idle rate while the scene is empty and at "rate_hz" once something
+# is near or moving; a radar's frames are all looked at, but idle ones
+# are mostly not filtered or detected. Warm-up samples are not fed.
 
-                while True:
-                     config = load_config()
+rate_controllers = {}
 
-                     sensor_config = config["sensors"].get(
-                        sensor_id,
-                        {}
-                     )
 
-                     if not sensor_config.get("enabled",False):
-                        break
+def adapt_rate(sensor):
+    """(Re)start the sensor's controller, at full rate."""
 
-                     min_range = sensor_config.get(
-                        "min_range",
-                        120
-                     )
+    if sensor.adaptive is None:
 
-                     max_range = sensor_config.get(
-                        "max_range",
-                        400
-                     )
+        rate_controllers.pop(sensor.sensor_id, None)
 
-                     logging.info(f"Bytes waiting: {ser.in_waiting}")
-                     if ser.in_waiting:
-                        data = ser.read(ser.in_waiting)
+        return
 
-                        try:
-                            text = data.decode("utf-8", errors="ignore")
+    rate_controllers[sensor.sensor_id] = RateController(
+        sensor.adaptive,
+        sensor.max_range,
+        active_hz=sensor.rate_hz if sensor.type == "ultrasonic" else None,
+        now=time.monotonic()
+    )
 
-                            for line in text.splitlines():
+# Recording
+# With SENSORBOX_RECORD=<file> every raw sample is written to a
+# recording (sample_recorder.py) that replay.py can feed back through
+# the detection pipeline. Samples stopped by the duty cycle or the
+# adaptive rate are recorded too, flagged as gated, so a replay feeds
+# the pipeline exactly what it saw live.
 
-                                line = line.strip()
+RECORD_ENV = "SENSORBOX_RECORD"
 
-                                if not line:
-                                    continue
+recorder = None
 
-                                if line.startswith("Range"):
 
-                                     parts = line.split()
+# Radar Reader
+# Every radar UART is read by one SerialMultiplexer thread that
+# blocks in select() until a port has data. Parsed samples are fanned
+# out to a per-sensor pipeline doing the range check.
 
-                                     if len(parts) >= 2:
+def open_radar_port(path, baudrate):
 
-                                         distance = float(parts[1])
+    return hardware.open_serial(path, baudrate)
 
-                                         logging.info(f"{sensor_id} Distance={distance}")
 
-                                         if min_range <= distance <= max_range:
-                                             
-                                             logging.info(
-                                                 f"{sensor_id} DETECTED {distance}"
-                                             )
+radar_reader = SerialMultiplexer(open_port=open_radar_port)
 
-                                             send_alert(...)
-                                             time.sleep(3)
-                        except Exception as e:
-                            logging.error(e)
-        except Exception as e:
 
-            logging.error(
-                f"{sensor_id} Error : {e}"
-            )
+def radar_pipeline(sensor_id):
 
-            time.sleep(0.5)
+    received = samples_total.labels(sensor_id)
 
-# Ultrasonic Worker
+    def on_samples(sensor_id, samples):
 
-def ultrasonic_worker(sensor_id):
+        received.inc(len(samples))
 
-    logging.info(f"ultrasonic worker started with {"sensor_id"}")
-    sensor = SENSORS[sensor_id]
+        timestamp = samples[-1].timestamp
 
-    while True:
+        distances = [sample.distance for sample in samples]
 
-        config = load_config()
+        fed = duty_cycler.trusted(sensor_id, timestamp)
 
-        sensor_config = config["sensors"].get(
-            sensor_id,
-            {}
-        )
+        controller = rate_controllers.get(sensor_id)
 
-        if not sensor_config.get(
-            "enabled",
-            False
-        ):
+        if fed and controller is not None:
 
-            sensor_off(
-                sensor["power_pin"]
-            )
-            
-            time.sleep(2)
+            controller.update(min(distances), timestamp)
 
-            continue
+            fed = controller.admit(timestamp)
 
-        sensor_on(
-            sensor["power_pin"]
-        )
+        if recorder is not None:
+            recorder.record_many(sensor_id, timestamp, distances, gated=not fed)
 
-        min_range = sensor_config.get(
-            "min_range",
-            120
-        )
+        if fed:
+            pipeline.sample(sensor_id, distances, timestamp)
+
+    return on_samples
+
+
+# Ultrasonic Scheduler
+# One PingScheduler owns every ultrasonic sensor. Sensors sharing a
+# "crosstalk_group" in SENSORS never fire together; each fires at its
+# "rate_hz" from sensors.json, or its idle rate while adaptive sampling
+# finds the scene empty.
+
+
+def ultrasonic_pipeline(sensor_id, distance, timestamp):
+
+    samples_total.labels(sensor_id).inc()
+
+    trusted = duty_cycler.trusted(sensor_id, timestamp)
+
+    if recorder is not None:
+        recorder.record(sensor_id, timestamp, distance, gated=not trusted)
+
+    if not trusted:
+        return
+
+    controller = rate_controllers.get(sensor_id)
+
+    if (
+        controller is not None
+        and controller.update(None if distance == -1 else distance, timestamp)
+    ):
+        ping_scheduler.set_rate(sensor_id, controller.rate_hz)
+
+    if distance == -1:
+
+        pipeline.no_echo(sensor_id, timestamp)
+
+        return
+
+    pipeline.sample(sensor_id, [distance], timestamp)
+
+
+ping_scheduler = PingScheduler(ultrasonic_pipeline)
+
+
+# Sensor Workers
+# One worker per enabled sensor. A radar worker attaches its radar to
+# the shared serial reader; an ultrasonic worker hands its sensor to
+# the ping scheduler. Both register with the duty cycler, which powers
+# them. A worker is alive as long as the thread it runs on (the
+# reader, its ping group) is.
+
+
+def duty_cycle(sensor):
 
-        max_range = sensor_config.get(
-            "max_range",
-            400
+    duty_cycler.add(
+        sensor.sensor_id,
+        sensor.zone,
+        warmup=sensor.warmup,
+        duty_on=sensor.duty_on,
+        duty_off=sensor.duty_off,
+        duty_offset=sensor.duty_offset
+    )
+
+class RadarWorker:
+
+    def __init__(self, sensor_id, sensor):
+
+        self.sensor_id = sensor_id
+        self.sensor = sensor
+
+    def start(self):
+
+        radar_reader.start()
+
+        adapt_rate(self.sensor)
+
+        duty_cycle(self.sensor)
+
+        radar_reader.add(
+            self.sensor_id,
+            self.sensor.uart,
+            self.sensor.baudrate,
+            radar_pipeline(self.sensor_id)
         )
 
-        distance = measure_distance(
-            sensor["trig"],
-            sensor["echo"]
+    def stop(self):
+
+        radar_reader.remove(self.sensor_id)
+
+        duty_cycler.remove(self.sensor_id)
+
+        rate_controllers.pop(self.sensor_id, None)
+
+    def alive(self):
+
+        return radar_reader.alive()
+
+    def update(self, sensor):
+
+        # Ranges and filters are read by the detection pipeline
+
+        if not sensor.same_hardware(self.sensor):
+            return False
+
+        if (sensor.adaptive, sensor.max_range) != (self.sensor.adaptive, self.sensor.max_range):
+            adapt_rate(sensor)
+
+        duty_cycle(sensor)
+
+        self.sensor = sensor
+
+        return True
+
+
+class UltrasonicWorker:
+
+    def __init__(self, sensor_id, sensor):
+
+        self.sensor_id = sensor_id
+        self.sensor = sensor
+
+    def start(self):
+
+        adapt_rate(self.sensor)
+
+        ping_scheduler.add(
+            self.sensor_id,
+            functools.partial(
+                measure_distance,
+                self.sensor.trig,
+                self.sensor.echo
+            ),
+            self.sensor.rate_hz,
+            group=self.sensor.crosstalk_group
         )
 
-        if distance != -1:
-            logging.info(
-                f"{sensor_id}"
-                f" Distance="
-                f"{distance:.2f}"
-            )
+        duty_cycle(self.sensor)
 
-            if (min_range<= distance<= max_range):
+    def stop(self):
 
-                logging.info(
-                    f"{sensor_id}"f" DETECTED"f"{distance}"
-                )
+        ping_scheduler.remove(self.sensor_id)
 
-                send_alert(sensor_id)
-                time.sleep(3)
+        duty_cycler.remove(self.sensor_id)
 
-# Thread Manager
+        rate_controllers.pop(self.sensor_id, None)
 
-def start_sensor_threads():
+    def alive(self):
 
-    threads = []
+        return ping_scheduler.alive(self.sensor_id)
 
-    for sensor_id, sensor in SENSORS.items():
+    def update(self, sensor):
 
-        if sensor["type"] == "ultrasonic":
+        if not sensor.same_hardware(self.sensor):
+            return False
 
-            thread = threading.Thread(
-                target=ultrasonic_worker,
-                args=(sensor_id,)
-            )
+        rate = (sensor.rate_hz, sensor.adaptive, sensor.max_range)
 
-        elif sensor["type"] == "radar":
+        if rate != (self.sensor.rate_hz, self.sensor.adaptive, self.sensor.max_range):
 
-            thread = threading.Thread(
-                target=radar_worker,
-                args=(sensor_id,)
-            )
+            # Back to full rate; the new controller idles it again
 
-        else:
+            adapt_rate(sensor)
 
-            continue
-        thread.daemon = True
+            ping_scheduler.set_rate(self.sensor_id, sensor.rate_hz)
 
-        thread.start()
+        duty_cycle(sensor)
 
-        threads.append(thread)
+        self.sensor = sensor
 
-        logging.info(
-            f"Started thread "
-            f"{sensor_id}"
+        return True
+
+
+WORKER_TYPES = {
+    "radar": RadarWorker,
+    "ultrasonic": UltrasonicWorker
+}
+
+# Supervisor
+# Reconciles the workers against the enabled sensors on every config
+# generation (supervisor.py): starts and stops them, applies changed
+# settings in place, and restarts crashed ones with exponential
+# backoff. Between changes it wakes every SENSOR_POLL_INTERVAL to check
+# the workers and run the presence clear timeouts, so a radar that
+# stops reporting still produces its exit.
+
+
+def desired_workers():
+
+    config = registry()
+
+    # The box-wide settings; the rest come with each sensor
+
+    duty_cycler.wake_hold = config.wake_hold
+
+    dispatcher.set_batching(config.alert_batch_size, config.alert_batch_max_delay)
+
+    return config.enabled()
+
+
+def make_worker(sensor_id, sensor):
+
+    return WORKER_TYPES[sensor.type](sensor_id, sensor)
+
+
+def expire_presence():
+
+    pipeline.expire(
+        time.monotonic(),
+        {pipeline.zone_of(sensor_id) for sensor_id in supervisor.running()}
+    )
+
+
+supervisor = None
+
+
+def init_supervisor():
+
+    global supervisor
+
+    supervisor = Supervisor(
+        config_cache,
+        desired_workers,
+        make_worker,
+        interval=SENSOR_POLL_INTERVAL,
+        on_tick=expire_presence
+    )
+
+    return supervisor
+
+# Control Socket
+# sensorctl (systemctl.py) talks to the running manager over a Unix
+# socket (control.py) at SENSORBOX_CONTROL_SOCKET, default
+# sensorbox.sock in the data directory; empty disables it. Changes go
+# through config_cache.update(): sensors.json is rewritten atomically
+# and the workers wake on the new generation.
+
+CONTROL_ENV = "SENSORBOX_CONTROL_SOCKET"
+
+CONTROL_SOCKET = os.path.join(DATA_DIR, "sensorbox.sock")
+
+control_server = None
+
+sample_rates = LiveRates(
+    lambda: {
+        sensor_id: samples_total.labels(sensor_id).value
+        for sensor_id in SENSORS
+    }
+)
+
+
+def update_sensor(sensor_id, **settings):
+
+    if sensor_id not in SENSORS:
+        raise ValueError(f"Sensor {sensor_id} not found")
+
+    def change(config):
+        config.setdefault("sensors", {}).setdefault(sensor_id, {}).update(settings)
+
+    return {
+        "sensor": sensor_id,
+        **settings,
+        "generation": config_cache.update(change)
+    }
+
+
+def control_on(sensor):
+
+    return update_sensor(sensor, enabled=True)
+
+
+def control_off(sensor):
+
+    return update_sensor(sensor, enabled=False)
+
+
+def control_range(sensor, min, max):
+
+    # The registry rejects a range that is not valid
+
+    return update_sensor(sensor, min_range=int(min), max_range=int(max))
+
+
+def control_status():
+
+    config = registry()
+
+    rates = sample_rates.rates()
+
+    workers = supervisor.stats()
+
+    duty = duty_cycler.stats()
+
+    sampling = adaptive_stats()
+
+    sensors = {}
+
+    for sensor_id, sensor in config.sensors.items():
+
+        sensors[sensor_id] = {
+            "type": sensor.type,
+            "enabled": sensor.enabled,
+            "min_range": sensor.min_range,
+            "max_range": sensor.max_range,
+            "samples": samples_total.labels(sensor_id).value,
+            "sample_hz": rates.get(sensor_id),
+            "worker": workers.get(sensor_id),
+            "power": duty.get(sensor_id),
+            "sampling": sampling.get(sensor_id)
+        }
+
+    return {
+        "sensorBoxId": config.box_id,
+        "generation": config_cache.generation,
+        "sensors": sensors
+    }
+
+
+def adaptive_stats():
+
+    return {
+        sensor_id: controller.stats()
+        for sensor_id, controller in list(rate_controllers.items())
+    }
+
+
+def control_stats():
+
+    return {
+        "config": {
+            "generation": config_cache.generation,
+            "reload_errors": config_cache.reload_errors
+        },
+        "workers": supervisor.stats(),
+        "duty_cycle": duty_cycler.stats(),
+        "adaptive": adaptive_stats(),
+        "dispatcher": dispatcher.stats(),
+        "radar_reader": radar_reader.stats(),
+        "ping_scheduler": ping_scheduler.stats(),
+        "log": log_stats()
+    }
+
+
+CONTROL_COMMANDS = {
+    "status": control_status,
+    "stats": control_stats,
+    "on": control_on,
+    "off": control_off,
+    "range": control_range
+}
+
+
+def start_control(path=None):
+
+    global control_server
+
+    path = os.environ.get(CONTROL_ENV, CONTROL_SOCKET) if path is None else path
+
+    if not path:
+        return None
+
+    try:
+        control_server = start_control_server(path, CONTROL_COMMANDS, sample_rates)
+
+    except OSError as e:
+        logging.error(f"Control socket on {path} failed: {e}")
+
+    return control_server
+
+# Startup and Shutdown
+
+def start_manager(backend=None, record=None):
+
+    global recorder
+
+    init_config()
+
+    init_pipeline()
+
+    init_supervisor()
+
+    init_hardware(backend)
+
+    record = record or os.environ.get(RECORD_ENV)
+
+    if record:
+
+        recorder = SampleRecorder(record, SENSORS, load_config())
+
+        logging.info(f"Recording samples to {record}")
+
+    config_cache.start()
+
+    init_alerts().start()
+
+    start_metrics()
+
+    start_control()
+
+    duty_cycler.start()
+
+    supervisor.start()
+
+    return supervisor
+
+
+def stop_manager():
+
+    if metrics_server is not None:
+        metrics_server.shutdown()
+
+    if control_server is not None:
+        control_server.shutdown()
+        control_server.server_close()
+
+    if supervisor is not None:
+        supervisor.stop(timeout=2)
+
+    duty_cycler.stop(timeout=2)
+
+    radar_reader.stop(timeout=2)
+
+    ping_scheduler.stop(timeout=2)
+
+    if dispatcher is not None:
+        dispatcher.stop(timeout=2)
+
+    if config_cache is not None:
+        config_cache.stop()
+
+    if recorder is not None:
+        recorder.close()
+
+    if spool is not None:
+        spool.close()
+
+    if hardware is None:
+        return
+
+    for sensor in SENSORS.values():
+
+        sensor_off(
+            sensor["power_pin"]
         )
 
-    return threads
-                
+    hardware.cleanup()
+
+    logging.info(
+        "GPIO Cleaned"
+    )
+
 # Main
 
 def main():
@@ -400,16 +1102,30 @@ def main():
         "Sensor Manager Started"
     )
 
-    start_sensor_threads()
+    start_manager()
 
     while True:
 
         time.sleep(10)
 
+        logging.info(f"Alert dispatcher {dispatcher.stats()}")
+
+        logging.info(f"Radar reader {radar_reader.stats()}")
+
+        logging.info(f"Ping scheduler {ping_scheduler.stats()}")
+
+        logging.info(f"Workers {supervisor.stats()}")
+
+        logging.info(f"Duty cycle {duty_cycler.stats()}")
+
+        logging.info(f"Adaptive sampling {adaptive_stats()}")
+
 # Entry Point
 
 if __name__ == "__main__":
 
+    setup_logging()
+
     try:
 
         main()
@@ -422,14 +1138,6 @@ if __name__ == "__main__":
 
     finally:
 
-        for sensor in SENSORS.values():
+        stop_manager()
 
-            sensor_off(
-                sensor["power_pin"]
-            )
-
-        GPIO.cleanup()
-
-        logging.info(
-            "GPIO Cleaned"
-        )
+        shutdown_logging()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from config_cache import StaticConfig
+from detection import DetectionPipeline
+from sample_recorder import FLAG_GATED, NO_ECHO, Recording
+from sensor_registry import SensorSchema
+
+# Replay
+# Feeds a recording made with SENSORBOX_RECORD back through the
+# detection pipeline, as fast as possible or at --speed times real
+# time, and prints the presence events it produces. Thresholds and
+# filters can be tuned by pointing --config at an edited sensors.json;
+# by default the settings recorded with the samples are used.
+#
+# Samples the manager did not feed to the pipeline (sensor off or
+# warming up, thinned by adaptive sampling) are flagged in the
+# recording and skipped, unless --all is given.
+#
+#   python replay.py field.rec
+#   python replay.py field.rec --config sensors.json --events out.jsonl
+
+# How often the clear timeouts are checked, in recorded time; the
+# sensor manager's supervisor does the same every SENSOR_POLL_INTERVAL.
+
+EXPIRE_INTERVAL = 0.5
+
+
+def batches(records):
+    """Yield (sensor index, timestamp_ns, distances) in time order.
+
+    Consecutive samples of one sensor with the same timestamp came
+    from one read and are replayed as one batch, like the live reader
+    delivers them.
+    """
+
+    order = np.argsort(records["timestamp"], kind="stable")
+
+    timestamps = records["timestamp"][order]
+    sensors = records["sensor"][order]
+    distances = records["distance"][order].astype(np.float64)
+
+    if not len(order):
+        return
+
+    starts = np.flatnonzero(
+        (np.diff(timestamps) != 0) | (np.diff(sensors) != 0)
+    ) + 1
+
+    bounds = np.concatenate(([0], starts, [len(order)]))
+
+    for start, end in zip(bounds[:-1], bounds[1:]):
+
+        yield int(sensors[start]), int(timestamps[start]), distances[start:end]
+
+
+def replay(recording, config, speed=None, on_event=None, all_samples=False):
+
+    events = []
+
+    def record_event(zone, event, confidence, sensors):
+
+        events.append((zone, event, confidence, sensors))
+
+        if on_event is not None:
+            on_event(zone, event, confidence, sensors)
+
+    sensors = {
+        sensor_id: recording.definitions.get(sensor_id, {})
+        for sensor_id in recording.sensor_ids
+    }
+
+    pipeline = DetectionPipeline(sensors, config, record_event)
+
+    sensor_ids = recording.sensor_ids
+
+    started = time.monotonic()
+    first = None
+    next_expire = None
+
+    records = recording.records
+
+    if not all_samples:
+        records = records[records["flags"] & FLAG_GATED == 0]
+
+    for index, stamp_ns, distances in batches(records):
+
+        timestamp = stamp_ns / 1e9
+
+        if first is None:
+            first = timestamp
+            next_expire = timestamp + EXPIRE_INTERVAL
+
+        if speed:
+
+            delay = (timestamp - first) / speed - (time.monotonic() - started)
+
+            if delay > 0:
+                time.sleep(delay)
+
+        while timestamp >= next_expire:
+            pipeline.expire(next_expire)
+            next_expire += EXPIRE_INTERVAL
+
+        sensor_id = sensor_ids[index]
+
+        if len(distances) == 1 and distances[0] == NO_ECHO:
+            pipeline.no_echo(sensor_id, timestamp)
+
+        else:
+            pipeline.sample(sensor_id, distances, timestamp)
+
+    # Let intrusions still open at the end of the recording clear
+
+    if next_expire is not None:
+
+        timeout = config.compiled.presence.get("clear_timeout", 3.0)
+
+        pipeline.expire(next_expire + timeout)
+
+    return events, time.monotonic() - started
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Replay a sample recording through the detection pipeline."
+    )
+    parser.add_argument("recording")
+    parser.add_argument(
+        "--config",
+        help="sensors.json to use instead of the settings in the recording"
+    )
+    parser.add_argument(
+        "--speed", type=float,
+        help="replay at this multiple of real time (default: as fast as possible)"
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="also feed the samples the manager gated out"
+    )
+    parser.add_argument("--events", help="also write the events as JSON lines")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    recording = Recording(args.recording)
+
+    # Settings are validated against the recorded sensor definitions
+
+    schema = SensorSchema(recording.definitions)
+
+    if args.config:
+
+        with open(args.config) as f:
+            config = StaticConfig(json.load(f), schema)
+
+    else:
+        config = StaticConfig(recording.config, schema)
+
+    origin = recording.start_monotonic_ns / 1e9
+
+    def show(zone, event, confidence, sensors):
+
+        if not args.quiet:
+            print(
+                f"{event.timestamp - origin:10.3f}s {zone:10} {event.kind:13} "
+                f"distance={event.distance:.1f} duration={event.duration:.1f}s "
+                f"confidence={confidence} sensors={'+'.join(sensors)}"
+            )
+
+    events, elapsed = replay(
+        recording, config, speed=args.speed, on_event=show, all_samples=args.all
+    )
+
+    if args.events:
+
+        with open(args.events, "w") as f:
+
+            for zone, event, confidence, sensors in events:
+
+                f.write(json.dumps({
+                    "offset": round(event.timestamp - origin, 6),
+                    "zone": zone,
+                    "event": event.kind,
+                    "distance": round(event.distance, 2),
+                    "duration": round(event.duration, 3),
+                    "confidence": confidence,
+                    "sensors": list(sensors)
+                }) + "\n")
+
+    duration = recording.duration()
+
+    gated = int(np.count_nonzero(recording.records["flags"] & FLAG_GATED))
+
+    print(
+        f"{len(recording)} samples ({gated} gated) from {len(recording.sensor_ids)} sensors, "
+        f"{duration:.1f}s recorded{' (truncated)' if recording.truncated else ''}; "
+        f"{len(events)} events; replayed in {elapsed:.2f}s "
+        f"({duration / elapsed if elapsed else 0:.0f}x real time)"
+    )
+
+    recording.close()
+
+
+if __name__ == "__main__":
+    main()
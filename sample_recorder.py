@@ -0,0 +1,246 @@
+import json
+import mmap
+import struct
+import threading
+import time
+
+import numpy as np
+
+# Sample Recordings
+# A recording holds every raw sample the sensor manager saw, so field
+# data can be replayed through the detection pipeline later.
+#
+# Layout (little-endian):
+#
+#   header   HEADER struct: magic, version, record size, header size,
+#            wall and monotonic start time (ns), record count
+#   index    JSON: sensor ids in index order, their SENSORS
+#            definitions and the sensors.json snapshot at start
+#   padding  up to header_size (a multiple of HEADER_ALIGN)
+#   records  RECORD_SIZE bytes each: monotonic timestamp (int64 ns),
+#            distance (float32 cm, -1 for a ping without echo),
+#            sensor index (uint16), flags (uint8), 1 byte padding
+#
+# FLAG_GATED marks a sample the manager did not feed to the detection
+# pipeline: the sensor was off or warming up, or adaptive sampling
+# thinned it out. Version 1 recordings have no flags (the byte was
+# padding), so all of their samples count as fed.
+#
+# Samples from one radar read share a timestamp. The record count is
+# written on close; a recording cut short (power loss) is read up to
+# its last complete record instead.
+
+MAGIC = b"SBXREC\x00\x01"
+
+VERSION = 2
+
+HEADER = struct.Struct("<8sHHIqqQ")
+
+RECORD = struct.Struct("<qfHBx")
+
+RECORD_SIZE = RECORD.size
+
+RECORD_DTYPE = np.dtype({
+    "names": ["timestamp", "distance", "sensor", "flags"],
+    "formats": ["<i8", "<f4", "<u2", "<u1"],
+    "offsets": [0, 8, 12, 14],
+    "itemsize": RECORD_SIZE
+})
+
+HEADER_ALIGN = 4096
+
+NO_ECHO = -1.0
+
+FLAG_GATED = 1
+
+# Records are packed into a buffer and written out when it fills or
+# FLUSH_INTERVAL seconds after the last write.
+
+BUFFER_RECORDS = 4096
+
+FLUSH_INTERVAL = 1.0
+
+
+def _plain(value):
+
+    # Config snapshots are mappingproxy objects
+    return dict(value)
+
+
+class SampleRecorder:
+    """Appends raw samples to a recording file. Thread-safe."""
+
+    def __init__(self, path, sensors, config=None):
+
+        self.path = path
+
+        self._index = {sensor_id: i for i, sensor_id in enumerate(sensors)}
+
+        index = json.dumps({
+            "sensors": list(sensors),
+            "definitions": sensors,
+            "config": config or {}
+        }, default=_plain).encode()
+
+        header_size = -(-(HEADER.size + 4 + len(index)) // HEADER_ALIGN) * HEADER_ALIGN
+
+        self._file = open(path, "wb")
+
+        self._file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                RECORD_SIZE,
+                header_size,
+                time.time_ns(),
+                time.monotonic_ns(),
+                0
+            )
+        )
+
+        self._file.write(struct.pack("<I", len(index)) + index)
+        self._file.write(b"\0" * (header_size - self._file.tell()))
+
+        self._buffer = bytearray(BUFFER_RECORDS * RECORD_SIZE)
+        self._used = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.records = 0
+
+    def record(self, sensor_id, timestamp, distance, gated=False):
+        """Record one sample; ``timestamp`` is time.monotonic() seconds.
+        ``gated`` marks a sample that was not fed to the pipeline."""
+
+        self.record_many(sensor_id, timestamp, (distance,), gated)
+
+    def record_many(self, sensor_id, timestamp, distances, gated=False):
+
+        index = self._index[sensor_id]
+        stamp = int(timestamp * 1e9)
+        flags = FLAG_GATED if gated else 0
+        pack_into = RECORD.pack_into
+
+        with self._lock:
+
+            if self._file is None:
+                return
+
+            for distance in distances:
+
+                if self._used == len(self._buffer):
+                    self._flush()
+
+                pack_into(self._buffer, self._used, stamp, distance, index, flags)
+
+                self._used += RECORD_SIZE
+
+            self.records += len(distances)
+
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+
+        if self._used:
+
+            self._file.write(memoryview(self._buffer)[:self._used])
+            self._file.flush()
+
+            self._used = 0
+
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+
+        with self._lock:
+
+            if self._file is not None:
+                self._flush()
+
+    def close(self):
+
+        with self._lock:
+
+            if self._file is None:
+                return
+
+            self._flush()
+
+            self._file.seek(HEADER.size - 8)
+            self._file.write(struct.pack("<Q", self.records))
+
+            self._file.close()
+            self._file = None
+
+
+class Recording:
+    """A memory-mapped recording.
+
+    ``records`` is a NumPy structured array (timestamp, distance,
+    sensor, flags) viewing the file directly; nothing is copied.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+
+        with open(path, "rb") as f:
+
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            record_size,
+            header_size,
+            self.start_wall_ns,
+            self.start_monotonic_ns,
+            count
+        ) = HEADER.unpack_from(self._mmap)
+
+        if magic != MAGIC or version not in (1, VERSION) or record_size != RECORD_SIZE:
+            raise ValueError(f"{path} is not a version 1 or {VERSION} sample recording")
+
+        (index_size,) = struct.unpack_from("<I", self._mmap, HEADER.size)
+
+        index = json.loads(
+            self._mmap[HEADER.size + 4:HEADER.size + 4 + index_size]
+        )
+
+        self.sensor_ids = index["sensors"]
+        self.definitions = index["definitions"]
+        self.config = index["config"]
+
+        complete = (len(self._mmap) - header_size) // RECORD_SIZE
+
+        self.truncated = count == 0 or count > complete
+
+        self.records = np.frombuffer(
+            self._mmap,
+            dtype=RECORD_DTYPE,
+            count=complete if self.truncated else count,
+            offset=header_size
+        )
+
+    def __len__(self):
+
+        return len(self.records)
+
+    def duration(self):
+
+        if not len(self.records):
+            return 0.0
+
+        timestamps = self.records["timestamp"]
+
+        return (int(timestamps.max()) - int(timestamps.min())) / 1e9
+
+    def close(self):
+        """Unmap the file. Arrays taken from ``records`` (fields,
+        slices) still view the mapping: drop them first, or close()
+        raises BufferError; copy() what must outlive the recording."""
+
+        self.records = None
+
+        self._mmap.close()
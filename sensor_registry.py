@@ -0,0 +1,560 @@
+import math
+from collections import namedtuple
+
+from config_cache import freeze
+
+# Sensor Registry
+# The hardware map (SENSORS in the manager: type, pins, UART) and the
+# runtime settings (sensors.json: enabled, ranges, rates, filters, duty
+# cycles) are merged once per config load into SensorConfig objects
+# with plain numeric attributes, so the sample paths never repeat
+# .get() lookups with defaults. A config that does not validate is rejected as a
+# whole with every problem listed; the last good one stays live.
+#
+# Older sensors.json shapes are migrated on load:
+#
+#   "sensors": [{"sensorId": "RD001", "min_range": "120", ...}, ...]
+#                        a list with string numbers (the shipped
+#                        sensor.json); entries become enabled
+#   {"RD001": {...}, "sensorBoxId": ...}
+#                        per-sensor settings at the top level
+#
+# Numeric strings become numbers wherever a number is expected.
+#
+# Adaptive sampling (adaptive_rate.py) is off unless an "adaptive"
+# policy is given: at the top level for every sensor, per sensor to
+# override some of its fields ("adaptive": true takes the defaults),
+# or "adaptive": false to keep one sensor at full rate.
+
+SENSOR_TYPES = ("radar", "ultrasonic")
+
+HARDWARE_FIELDS = {
+    "radar": ("uart", "baudrate", "power_pin"),
+    "ultrasonic": ("trig", "echo", "power_pin")
+}
+
+DEFAULT_MIN_RANGE = 120
+
+DEFAULT_MAX_RANGE = 400
+
+DEFAULT_RATE_HZ = 15.0
+
+# Seconds from power-up until a sensor's samples are trusted
+
+DEFAULT_WARMUP = {
+    "radar": 1.0,
+    "ultrasonic": 0.1
+}
+
+DEFAULT_WAKE_HOLD = 5.0
+
+DEFAULT_ADAPTIVE = {
+    "idle_hz": 2.0,
+    "margin": 100.0,
+    "speed": 50.0,
+    "hold": 5.0
+}
+
+DEFAULT_FUSION_SKEW = 0.5
+
+DEFAULT_FUSION_TOLERANCE = 50.0
+
+DEFAULT_ALERT_BATCH_SIZE = 1
+
+DEFAULT_ALERT_BATCH_MAX_DELAY = 0.5
+
+SETTING_FIELDS = (
+    "min_range", "max_range", "rate_hz",
+    "duty_on", "duty_off", "duty_offset", "warmup"
+)
+
+PRESENCE_FIELDS = ("min_dwell", "clear_timeout", "hysteresis", "heartbeat")
+
+FILTER_FIELDS = ("median", "ema_alpha", "outlier_k", "history")
+
+
+AdaptivePolicy = namedtuple("AdaptivePolicy", list(DEFAULT_ADAPTIVE))
+
+
+class ConfigError(ValueError):
+    """A config that failed validation; ``problems`` lists why."""
+
+    def __init__(self, problems):
+
+        self.problems = problems
+
+        super().__init__("Invalid config: " + "; ".join(problems))
+
+
+# Config Objects
+
+class SensorConfig:
+    """One sensor's hardware and settings."""
+
+    __slots__ = (
+        "sensor_id", "type", "zone", "power_pin",
+        "uart", "baudrate", "trig", "echo", "crosstalk_group",
+        "enabled", "min_range", "max_range", "rate_hz", "filter",
+        "duty_on", "duty_off", "duty_offset", "warmup", "adaptive"
+    )
+
+    HARDWARE = (
+        "type", "zone", "power_pin",
+        "uart", "baudrate", "trig", "echo", "crosstalk_group"
+    )
+
+    def __init__(self, sensor_id, definition, settings, adaptive=None):
+
+        self.sensor_id = sensor_id
+
+        for name in self.HARDWARE:
+            setattr(self, name, definition.get(name))
+
+        self.zone = self.zone or sensor_id
+
+        self.enabled = settings.get("enabled", False)
+        self.min_range = float(settings.get("min_range", DEFAULT_MIN_RANGE))
+        self.max_range = float(settings.get("max_range", DEFAULT_MAX_RANGE))
+        self.rate_hz = float(settings.get("rate_hz", DEFAULT_RATE_HZ))
+        self.filter = freeze(settings.get("filter"))
+
+        # Powered duty_on seconds of every duty_on + duty_off; None
+        # (or no off time) keeps the sensor powered
+
+        duty_on = settings.get("duty_on")
+        duty_off = float(settings.get("duty_off", 0.0))
+
+        self.duty_on = float(duty_on) if duty_on is not None and duty_off > 0 else None
+        self.duty_off = duty_off
+        self.duty_offset = float(settings.get("duty_offset", 0.0))
+        self.warmup = float(settings.get("warmup", DEFAULT_WARMUP.get(self.type, 0.0)))
+
+        self.adaptive = _adaptive_policy(adaptive, settings.get("adaptive"))
+
+    def _key(self):
+
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+
+        return type(other) is SensorConfig and self._key() == other._key()
+
+    __hash__ = None
+
+    def same_hardware(self, other):
+
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.HARDWARE
+        )
+
+    def __repr__(self):
+
+        return (
+            f"SensorConfig({self.sensor_id!r}, {self.type}, "
+            f"enabled={self.enabled}, range={self.min_range:g}-{self.max_range:g})"
+        )
+
+
+class SensorRegistry:
+    """A validated config: box settings plus a SensorConfig per sensor."""
+
+    __slots__ = (
+        "box_id", "sensors", "fusion_skew", "fusion_tolerance",
+        "presence", "cooldown", "alert_batch_size", "alert_batch_max_delay",
+        "wake_hold", "data"
+    )
+
+    def __init__(self, hardware, data):
+
+        self.data = freeze(data)
+
+        self.box_id = data["sensorBoxId"]
+
+        settings = data.get("sensors", {})
+
+        self.sensors = {
+            sensor_id: SensorConfig(
+                sensor_id, definition, settings.get(sensor_id, {}), data.get("adaptive")
+            )
+            for sensor_id, definition in (hardware or {}).items()
+        }
+
+        for sensor_id, sensor_settings in settings.items():
+
+            if sensor_id not in self.sensors:
+                self.sensors[sensor_id] = SensorConfig(
+                    sensor_id, {}, sensor_settings, data.get("adaptive")
+                )
+
+        fusion = data.get("fusion") or {}
+
+        self.fusion_skew = float(fusion.get("skew", DEFAULT_FUSION_SKEW))
+        self.fusion_tolerance = float(fusion.get("tolerance", DEFAULT_FUSION_TOLERANCE))
+
+        self.presence = freeze(data.get("presence") or {})
+
+        self.cooldown = data.get("cooldown")
+
+        self.alert_batch_size = int(data.get("alert_batch_size", DEFAULT_ALERT_BATCH_SIZE))
+
+        self.alert_batch_max_delay = float(
+            data.get("alert_batch_max_delay", DEFAULT_ALERT_BATCH_MAX_DELAY)
+        )
+
+        self.wake_hold = float(data.get("wake_hold", DEFAULT_WAKE_HOLD))
+
+    def enabled(self):
+
+        return {
+            sensor_id: sensor
+            for sensor_id, sensor in self.sensors.items()
+            if sensor.enabled
+        }
+
+
+def _adaptive_policy(box, sensor):
+    """The sensor's AdaptivePolicy, or None for full rate."""
+
+    if sensor is False or (sensor is None and box in (None, False)):
+        return None
+
+    policy = dict(DEFAULT_ADAPTIVE)
+
+    for fields in (box, sensor):
+
+        if isinstance(fields, dict):
+            policy.update(fields)
+
+    return AdaptivePolicy(**{name: float(value) for name, value in policy.items()})
+
+
+# Migration
+
+def _number(value):
+
+    if isinstance(value, str):
+
+        try:
+            number = float(value)
+
+        except ValueError:
+            return value
+
+        return int(number) if number.is_integer() else number
+
+    return value
+
+
+def migrate(data):
+    """The current shape of a possibly older config. Never mutates
+    ``data``; unknown shapes are left for validation to report."""
+
+    if not isinstance(data, dict):
+        return data
+
+    data = dict(data)
+
+    sensors = data.get("sensors")
+
+    if isinstance(sensors, list):
+
+        migrated = {}
+
+        for item in sensors:
+
+            if not isinstance(item, dict):
+                continue
+
+            item = dict(item)
+
+            sensor_id = item.pop("sensorId", None) or item.pop("id", None)
+
+            if sensor_id is None:
+                continue
+
+            item.setdefault("enabled", True)
+
+            migrated[sensor_id] = item
+
+        sensors = migrated
+
+    elif isinstance(sensors, dict):
+
+        sensors = {key: dict(value) if isinstance(value, dict) else value for key, value in sensors.items()}
+
+    else:
+        sensors = {} if sensors is None else sensors
+
+    if isinstance(sensors, dict):
+
+        # Per-sensor settings left at the top level
+
+        for key in [key for key, value in data.items() if _looks_like_sensor(value)]:
+            sensors.setdefault(key, dict(data.pop(key)))
+
+        for sensor_settings in sensors.values():
+
+            if isinstance(sensor_settings, dict):
+
+                for name in SETTING_FIELDS:
+
+                    if name in sensor_settings:
+                        sensor_settings[name] = _number(sensor_settings[name])
+
+    data["sensors"] = sensors
+
+    return data
+
+
+def _looks_like_sensor(value):
+
+    return isinstance(value, dict) and any(
+        name in value for name in ("enabled", "min_range", "max_range")
+    )
+
+
+# Validation
+
+def _is_number(value):
+
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def _check_number(problems, where, value, minimum=0.0, positive=False, optional=False):
+
+    if value is None and optional:
+        return
+
+    if not _is_number(value):
+        problems.append(f"{where} must be a number, got {value!r}")
+
+    elif positive and value <= 0:
+        problems.append(f"{where} must be above 0, got {value}")
+
+    elif value < minimum:
+        problems.append(f"{where} must be at least {minimum:g}, got {value}")
+
+
+def _check_adaptive(problems, where, policy):
+
+    if policy is None or isinstance(policy, bool):
+        return
+
+    if not isinstance(policy, dict):
+        problems.append(f"{where} must be an object, true or false")
+        return
+
+    for name in policy:
+
+        if name not in DEFAULT_ADAPTIVE:
+            problems.append(f"{where}.{name} is not a setting (expected {', '.join(DEFAULT_ADAPTIVE)})")
+
+    for name in ("idle_hz", "speed"):
+        _check_number(problems, f"{where}.{name}", policy.get(name, DEFAULT_ADAPTIVE[name]), positive=True)
+
+    for name in ("margin", "hold"):
+        _check_number(problems, f"{where}.{name}", policy.get(name, DEFAULT_ADAPTIVE[name]))
+
+
+def _check_filter(problems, where, settings):
+
+    if settings is None:
+        return
+
+    if not isinstance(settings, dict):
+        problems.append(f"{where} must be an object")
+        return
+
+    for name in settings:
+
+        if name not in FILTER_FIELDS:
+            problems.append(f"{where}.{name} is not a setting (expected {', '.join(FILTER_FIELDS)})")
+
+    for name in ("median", "history"):
+
+        value = settings.get(name)
+
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            problems.append(f"{where}.{name} must be a whole number of at least 1, got {value!r}")
+
+    ema_alpha = settings.get("ema_alpha")
+
+    if ema_alpha is not None and not (_is_number(ema_alpha) and 0 < ema_alpha <= 1):
+        problems.append(f"{where}.ema_alpha must be above 0 and at most 1, got {ema_alpha!r}")
+
+    _check_number(problems, f"{where}.outlier_k", settings.get("outlier_k"), positive=True, optional=True)
+
+
+def validate(hardware, data):
+    """Every problem with ``data`` (and the hardware map), or []."""
+
+    problems = []
+
+    if not isinstance(data, dict):
+        return [f"config must be an object, got {type(data).__name__}"]
+
+    box_id = data.get("sensorBoxId")
+
+    if not isinstance(box_id, str) or not box_id:
+        problems.append(f"sensorBoxId must be a non-empty string, got {box_id!r}")
+
+    for sensor_id, definition in (hardware or {}).items():
+
+        sensor_type = definition.get("type")
+
+        if sensor_type not in SENSOR_TYPES:
+            problems.append(f"SENSORS.{sensor_id}.type must be one of {', '.join(SENSOR_TYPES)}")
+            continue
+
+        for name in HARDWARE_FIELDS[sensor_type]:
+
+            if definition.get(name) is None:
+                problems.append(f"SENSORS.{sensor_id}.{name} is required for a {sensor_type}")
+
+    sensors = data.get("sensors")
+
+    if not isinstance(sensors, dict):
+        problems.append("sensors must be an object of sensor id to settings")
+        sensors = {}
+
+    for sensor_id, settings in sensors.items():
+
+        where = f"sensors.{sensor_id}"
+
+        if hardware is not None and sensor_id not in hardware:
+            problems.append(f"{where} is not a known sensor")
+
+        if not isinstance(settings, dict):
+            problems.append(f"{where} must be an object")
+            continue
+
+        if not isinstance(settings.get("enabled", False), bool):
+            problems.append(f"{where}.enabled must be true or false")
+
+        min_range = settings.get("min_range", DEFAULT_MIN_RANGE)
+        max_range = settings.get("max_range", DEFAULT_MAX_RANGE)
+
+        _check_number(problems, f"{where}.min_range", min_range)
+        _check_number(problems, f"{where}.max_range", max_range, positive=True)
+
+        if _is_number(min_range) and _is_number(max_range) and min_range >= max_range:
+            problems.append(f"{where}: min_range {min_range} must be below max_range {max_range}")
+
+        _check_number(problems, f"{where}.rate_hz", settings.get("rate_hz", DEFAULT_RATE_HZ), positive=True)
+
+        _check_filter(problems, f"{where}.filter", settings.get("filter"))
+
+        duty_on = settings.get("duty_on")
+        warmup = settings.get("warmup")
+
+        _check_number(problems, f"{where}.duty_on", duty_on, positive=True, optional=True)
+        _check_number(problems, f"{where}.duty_off", settings.get("duty_off", 0.0))
+        _check_number(problems, f"{where}.duty_offset", settings.get("duty_offset", 0.0))
+        _check_number(problems, f"{where}.warmup", warmup, optional=True)
+
+        if warmup is None:
+
+            sensor_type = (hardware or {}).get(sensor_id, {}).get("type")
+
+            warmup = DEFAULT_WARMUP.get(sensor_type, 0.0)
+
+        if _is_number(duty_on) and _is_number(warmup) and warmup >= duty_on:
+            problems.append(
+                f"{where}: warmup {warmup} must be shorter than duty_on {duty_on}, "
+                f"or no sample is ever trusted"
+            )
+
+        adaptive = settings.get("adaptive")
+
+        if adaptive is not False:
+
+            _check_adaptive(problems, f"{where}.adaptive", adaptive)
+
+            # An ultrasonic sensor's idle rate is a slower ping rate
+
+            policy = {
+                **(data.get("adaptive") if isinstance(data.get("adaptive"), dict) else {}),
+                **(adaptive if isinstance(adaptive, dict) else {})
+            }
+
+            idle_hz = policy.get("idle_hz", DEFAULT_ADAPTIVE["idle_hz"])
+            rate_hz = settings.get("rate_hz", DEFAULT_RATE_HZ)
+
+            if (
+                (hardware or {}).get(sensor_id, {}).get("type") == "ultrasonic"
+                and _is_number(idle_hz) and _is_number(rate_hz) and idle_hz > rate_hz
+            ):
+                problems.append(f"{where}: adaptive idle_hz {idle_hz} is above rate_hz {rate_hz}")
+
+    fusion = data.get("fusion") or {}
+
+    if not isinstance(fusion, dict):
+        problems.append("fusion must be an object")
+
+    else:
+        _check_number(problems, "fusion.skew", fusion.get("skew", DEFAULT_FUSION_SKEW))
+        _check_number(problems, "fusion.tolerance", fusion.get("tolerance", DEFAULT_FUSION_TOLERANCE))
+
+    presence = data.get("presence") or {}
+
+    if not isinstance(presence, dict):
+        problems.append("presence must be an object")
+
+    else:
+
+        for name in PRESENCE_FIELDS:
+
+            if name in presence:
+                _check_number(
+                    problems, f"presence.{name}", presence[name],
+                    positive=name in ("clear_timeout", "heartbeat"),
+                    optional=name == "heartbeat"
+                )
+
+    _check_number(problems, "cooldown", data.get("cooldown"), optional=True)
+
+    _check_number(problems, "wake_hold", data.get("wake_hold", DEFAULT_WAKE_HOLD))
+
+    _check_adaptive(problems, "adaptive", data.get("adaptive"))
+
+    batch_size = data.get("alert_batch_size", DEFAULT_ALERT_BATCH_SIZE)
+
+    if not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1:
+        problems.append(f"alert_batch_size must be a whole number of at least 1, got {batch_size!r}")
+
+    _check_number(
+        problems, "alert_batch_max_delay",
+        data.get("alert_batch_max_delay", DEFAULT_ALERT_BATCH_MAX_DELAY)
+    )
+
+    return problems
+
+
+# Schema
+
+class SensorSchema:
+    """Migration and compilation of sensors.json against a hardware
+    map, for ConfigCache(schema=...). With ``hardware=None`` only the
+    settings are checked (e.g. by sensorctl, which has no hardware map)."""
+
+    def __init__(self, hardware=None):
+
+        self.hardware = hardware
+
+    def migrate(self, data):
+
+        return migrate(data)
+
+    def compile(self, data):
+
+        problems = validate(self.hardware, data)
+
+        if problems:
+            raise ConfigError(problems)
+
+        return SensorRegistry(self.hardware, data)
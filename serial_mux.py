@@ -0,0 +1,284 @@
+import logging
+import os
+import selectors
+import threading
+import time
+
+import serial
+
+from radar_parser import RangeParser
+
+# Serial Multiplexer
+# One thread waits on every radar UART at once with selectors
+# (epoll on Linux) and sleeps in the kernel until a port has data,
+# so idle CPU stays near zero however many radars are attached.
+# Each port gets its own RangeParser, and parsed samples are handed
+# to that sensor's callback.
+
+READ_SIZE = 4096
+
+
+def open_serial(path, baudrate):
+
+    return serial.Serial(path, baudrate=baudrate, timeout=0)
+
+
+class _Port:
+
+    def __init__(self, sensor_id, path, baudrate, on_samples):
+
+        self.sensor_id = sensor_id
+        self.path = path
+        self.baudrate = baudrate
+        self.on_samples = on_samples
+
+        self.parser = RangeParser()
+        self.handle = None
+        self.fd = None
+        self.retry_at = 0.0
+
+        self.bytes_read = 0
+        self.reconnects = 0
+
+
+class SerialMultiplexer:
+    """Reads many serial ports from a single selector loop.
+
+    ``add`` and ``remove`` may be called from any thread; the loop picks
+    the change up immediately. ``on_samples(sensor_id, samples)`` runs on
+    the loop thread, so it must not block.
+    """
+
+    def __init__(self, open_port=open_serial, reconnect_delay=1.0):
+
+        self.open_port = open_port
+        self.reconnect_delay = reconnect_delay
+
+        self._selector = selectors.DefaultSelector()
+        self._ports = {}
+        self._lock = threading.Lock()
+        self._changes = []
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Self-pipe so add/remove/stop can wake a blocked select().
+
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    # Port Management
+
+    def add(self, sensor_id, path, baudrate, on_samples):
+
+        with self._lock:
+            self._changes.append(
+                ("add", _Port(sensor_id, path, baudrate, on_samples))
+            )
+
+        self._wake()
+
+    def remove(self, sensor_id):
+
+        with self._lock:
+            self._changes.append(("remove", sensor_id))
+
+        self._wake()
+
+    def sensor_ids(self):
+
+        return list(self._ports)
+
+    def _wake(self):
+
+        try:
+            os.write(self._wake_w, b"\0")
+
+        except BlockingIOError:
+            pass
+
+    def _apply_changes(self):
+
+        with self._lock:
+            changes, self._changes = self._changes, []
+
+        for action, item in changes:
+
+            if action == "add":
+
+                if item.sensor_id in self._ports:
+                    self._close(self._ports[item.sensor_id])
+
+                self._ports[item.sensor_id] = item
+
+            else:
+
+                port = self._ports.pop(item, None)
+
+                if port is not None:
+
+                    self._close(port)
+
+                    logging.info(f"{port.sensor_id} removed from serial reader")
+
+    def _open(self, port):
+
+        try:
+
+            port.handle = self.open_port(port.path, port.baudrate)
+
+        except Exception as e:
+
+            port.retry_at = time.monotonic() + self.reconnect_delay
+
+            logging.error(f"{port.sensor_id} Error : {e}")
+
+            return
+
+        port.fd = port.handle.fileno()
+        port.parser.reset()
+
+        self._selector.register(port.fd, selectors.EVENT_READ, port)
+
+        logging.info(f"{port.sensor_id} connected on {port.path}")
+
+    def _close(self, port):
+
+        if port.fd is not None:
+
+            self._selector.unregister(port.fd)
+
+            port.fd = None
+
+        if port.handle is not None:
+
+            try:
+                port.handle.close()
+
+            except Exception:
+                pass
+
+            port.handle = None
+
+    def _drop(self, port, reason):
+
+        logging.error(f"{port.sensor_id} Error : {reason}")
+
+        self._close(port)
+
+        port.reconnects += 1
+        port.retry_at = time.monotonic() + self.reconnect_delay
+
+    # Loop
+
+    def _poll_once(self):
+
+        self._apply_changes()
+
+        now = time.monotonic()
+        timeout = None
+
+        for port in self._ports.values():
+
+            if port.handle is not None:
+                continue
+
+            if port.retry_at <= now:
+                self._open(port)
+
+            if port.handle is None:
+
+                wait = max(0.0, port.retry_at - now)
+
+                timeout = wait if timeout is None else min(timeout, wait)
+
+        for key, _ in self._selector.select(timeout):
+
+            port = key.data
+
+            if port is None:
+
+                try:
+                    while os.read(self._wake_r, 512):
+                        pass
+
+                except BlockingIOError:
+                    pass
+
+                continue
+
+            try:
+                data = os.read(key.fd, READ_SIZE)
+
+            except OSError as e:
+                self._drop(port, e)
+                continue
+
+            if not data:
+                self._drop(port, "port closed")
+                continue
+
+            port.bytes_read += len(data)
+
+            samples = port.parser.feed(data)
+
+            if samples:
+
+                try:
+                    port.on_samples(port.sensor_id, samples)
+
+                except Exception as e:
+                    logging.error(f"{port.sensor_id} Pipeline Error : {e}")
+
+    def run(self):
+
+        while not self._stop.is_set():
+            self._poll_once()
+
+        for port in list(self._ports.values()):
+            self._close(port)
+
+    def alive(self):
+
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+
+        # A loop thread that died is replaced
+
+        if self.alive():
+            return
+
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self.run,
+            name="serial-mux",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self, timeout=None):
+
+        self._stop.set()
+        self._wake()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Stats
+
+    def stats(self):
+
+        return {
+            port.sensor_id: {
+                "connected": port.handle is not None,
+                "bytes": port.bytes_read,
+                "samples": port.parser.samples,
+                "parse_errors": port.parser.parse_errors,
+                "reconnects": port.reconnects
+            }
+            for port in list(self._ports.values())
+        }
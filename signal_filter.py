@@ -0,0 +1,195 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Signal Filtering
+# Per-sensor clean-up of raw distances before the range check, so a
+# single spurious echo or radar glitch no longer raises an alert.
+#
+# Samples are processed a batch at a time (one serial read, or one
+# ping) with NumPy, so the Python overhead is paid per batch rather
+# than per sample. Stages, each optional:
+#
+#   outlier  drop samples further than outlier_k * MAD from the
+#            median of the recent history
+#   median   rolling median over the last `median` samples
+#   ema      exponential moving average of the median output
+#
+# Configured per sensor in sensors.json, e.g.
+#   "filter": {"median": 5, "ema_alpha": 0.4, "outlier_k": 4}
+# A sensor without a "filter" passes its samples through unchanged;
+# a filter without "median" gets DEFAULT_MEDIAN.
+
+DEFAULT_MEDIAN = 3
+
+# Floor for the MAD so a perfectly steady history does not reject
+# every sample that differs by a centimetre.
+
+MIN_DEVIATION = 5.0
+
+
+class SignalFilter:
+    """Outlier rejection, rolling median and EMA over a ring buffer."""
+
+    def __init__(self, median=DEFAULT_MEDIAN, ema_alpha=None, outlier_k=None, history=None):
+
+        self.median = max(1, int(median))
+        self.ema_alpha = ema_alpha
+        self.outlier_k = outlier_k
+
+        size = max(self.median, int(history or 0), 9 if outlier_k else 1)
+
+        self._ring = np.full(size, np.nan)
+        self._pos = 0
+        self._count = 0
+        self._ema_value = None
+
+        self.accepted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_config(cls, config):
+
+        if not config:
+            return cls(median=1)
+
+        return cls(
+            median=config.get("median", DEFAULT_MEDIAN),
+            ema_alpha=config.get("ema_alpha"),
+            outlier_k=config.get("outlier_k"),
+            history=config.get("history")
+        )
+
+    # Ring Buffer
+
+    def _history(self):
+
+        ring = self._ring
+
+        if self._count < len(ring):
+            return ring[:self._count].copy()
+
+        return np.concatenate((ring[self._pos:], ring[:self._pos]))
+
+    def _push(self, values):
+
+        ring = self._ring
+        size = len(ring)
+
+        values = values[-size:]
+        n = len(values)
+
+        end = self._pos + n
+
+        if end <= size:
+
+            ring[self._pos:end] = values
+
+        else:
+
+            split = size - self._pos
+
+            ring[self._pos:] = values[:split]
+            ring[:end - size] = values[split:]
+
+        self._pos = end % size
+        self._count = min(size, self._count + n)
+
+    # Stages
+
+    def _reject_outliers(self, values, history):
+
+        if len(history) < 3:
+            return values
+
+        center = np.median(history)
+        deviation = max(np.median(np.abs(history - center)), MIN_DEVIATION)
+
+        keep = np.abs(values - center) <= self.outlier_k * deviation
+
+        return values[keep]
+
+    def _rolling_median(self, values, history):
+
+        window = self.median
+
+        if window == 1:
+            return values
+
+        series = np.concatenate((history[-(window - 1):], values))
+
+        if len(series) >= window:
+            medians = np.median(sliding_window_view(series, window), axis=1)
+
+        else:
+            medians = np.empty(0)
+
+        # The first samples ever seen have no full window behind them;
+        # use the median of whatever is there.
+
+        missing = len(values) - len(medians)
+
+        if missing > 0:
+
+            offset = len(series) - len(values)
+
+            head = [np.median(series[:offset + i + 1]) for i in range(missing)]
+
+            medians = np.concatenate((head, medians))
+
+        return medians
+
+    def _ema(self, values):
+
+        # A plain recurrence: a batch is a handful of samples, and a
+        # closed form dividing by (1 - alpha) ** n breaks down as alpha
+        # approaches 1.
+
+        alpha = self.ema_alpha
+        value = self._ema_value
+        out = np.empty_like(values)
+
+        for i, x in enumerate(values.tolist()):
+
+            value = x if value is None else value + alpha * (x - value)
+
+            out[i] = value
+
+        self._ema_value = value
+
+        return out
+
+    def process(self, values):
+        """Filter a batch of raw distances. Returns the accepted, filtered values."""
+
+        values = np.asarray(values, dtype=np.float64)
+
+        if not len(values):
+            return values
+
+        history = self._history()
+
+        # The history keeps every raw sample, rejected or not, so that
+        # a real change in the scene becomes the new normal instead of
+        # being rejected forever.
+
+        self._push(values)
+
+        if self.outlier_k:
+
+            kept = self._reject_outliers(values, history)
+
+            self.rejected += len(values) - len(kept)
+
+            values = kept
+
+            if not len(values):
+                return values
+
+        self.accepted += len(values)
+
+        filtered = self._rolling_median(values, history)
+
+        if self.ema_alpha:
+            filtered = self._ema(filtered)
+
+        return filtered
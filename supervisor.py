@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+
+# Worker Supervisor
+# Keeps one worker per configured sensor running. The desired set
+# comes from ``desired()`` ({sensor_id: spec}) and is reconciled
+# whenever the config generation changes, and every ``interval``
+# seconds to check health:
+#
+#   new sensor      factory(sensor_id, spec) builds a worker; start()
+#   removed sensor  stop()
+#   changed spec    update(spec) applies it in place and returns True,
+#                   or returns False to have the worker restarted
+#   crashed         alive() went False (or start() raised): restarted
+#                   after BACKOFF_BASE * 2 ** (failures - 1) seconds, at
+#                   most BACKOFF_MAX; a worker that stays up for
+#                   STABLE_AFTER seconds starts again from BACKOFF_BASE
+#
+# Workers only need start(), stop(), alive() and update(spec). A worker
+# sharing a thread with others (the serial reader, a ping group) is
+# dead when that thread is, so each of them is restarted.
+
+BACKOFF_BASE = 1.0
+
+BACKOFF_MAX = 60.0
+
+STABLE_AFTER = 30.0
+
+RUNNING = "running"
+
+BACKOFF = "backoff"
+
+
+class _Entry:
+
+    def __init__(self, worker, spec):
+
+        self.worker = worker
+        self.spec = spec
+
+        self.state = BACKOFF
+        self.started_at = None
+        self.retry_at = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.last_error = None
+
+
+class Supervisor:
+    """Reconciles sensor workers against the configured sensors."""
+
+    def __init__(self, config, desired, factory, interval=0.5, on_tick=None):
+
+        self.config = config
+        self.desired = desired
+        self.factory = factory
+        self.interval = interval
+        self.on_tick = on_tick
+
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Reconcile
+
+    def _start(self, sensor_id, entry, now):
+
+        try:
+
+            entry.worker.start()
+
+        except Exception as e:
+
+            self._failed(sensor_id, entry, now, f"start failed: {e}")
+
+            return
+
+        entry.state = RUNNING
+        entry.started_at = now
+
+        logging.info(f"{sensor_id} worker started")
+
+    def _stop_worker(self, sensor_id, entry):
+
+        try:
+            entry.worker.stop()
+
+        except Exception as e:
+            logging.error(f"{sensor_id} worker stop failed: {e}")
+
+    def _failed(self, sensor_id, entry, now, error):
+
+        if entry.started_at is not None and now - entry.started_at >= STABLE_AFTER:
+            entry.failures = 0
+
+        entry.failures += 1
+
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (entry.failures - 1))
+
+        entry.state = BACKOFF
+        entry.started_at = None
+        entry.retry_at = now + delay
+        entry.last_error = error
+
+        logging.error(f"{sensor_id} worker {error}, restarting in {delay:.1f}s")
+
+    def reconcile(self, now=None):
+
+        now = time.monotonic() if now is None else now
+
+        desired = self.desired()
+
+        with self._lock:
+
+            for sensor_id in [key for key in self._entries if key not in desired]:
+
+                self._stop_worker(sensor_id, self._entries.pop(sensor_id))
+
+                logging.info(f"{sensor_id} worker stopped")
+
+            for sensor_id, spec in desired.items():
+
+                entry = self._entries.get(sensor_id)
+
+                if entry is None:
+
+                    entry = self._entries[sensor_id] = _Entry(
+                        self.factory(sensor_id, spec),
+                        spec
+                    )
+
+                    self._start(sensor_id, entry, now)
+
+                    continue
+
+                if spec != entry.spec:
+
+                    if not entry.worker.update(spec):
+
+                        # Hardware moved: a fresh worker with the new spec
+
+                        self._stop_worker(sensor_id, entry)
+
+                        entry.worker = self.factory(sensor_id, spec)
+
+                        entry.state = BACKOFF
+                        entry.retry_at = now
+
+                        logging.info(f"{sensor_id} worker restarting for new settings")
+
+                    entry.spec = spec
+
+                if entry.state == RUNNING and not entry.worker.alive():
+
+                    self._stop_worker(sensor_id, entry)
+
+                    self._failed(sensor_id, entry, now, "crashed")
+
+                if entry.state == BACKOFF and now >= entry.retry_at:
+
+                    if entry.started_at is None and entry.last_error is not None:
+                        entry.restarts += 1
+
+                    self._start(sensor_id, entry, now)
+
+    # Loop
+
+    def _run(self):
+
+        generation = None
+
+        while not self._stop.is_set():
+
+            generation = self.config.wait(generation, self.interval)
+
+            try:
+
+                self.reconcile()
+
+                if self.on_tick is not None:
+                    self.on_tick()
+
+            except Exception as e:
+                logging.error(f"Supervisor error : {e}")
+
+    def start(self):
+
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="supervisor",
+            daemon=True
+        )
+
+        self._thread.start()
+
+    def stop(self, timeout=None):
+
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        with self._lock:
+
+            for sensor_id, entry in self._entries.items():
+
+                if entry.state == RUNNING:
+                    self._stop_worker(sensor_id, entry)
+
+            self._entries.clear()
+
+    # Stats
+
+    def running(self):
+
+        with self._lock:
+
+            return [
+                sensor_id
+                for sensor_id, entry in self._entries.items()
+                if entry.state == RUNNING
+            ]
+
+    def stats(self):
+
+        now = time.monotonic()
+
+        with self._lock:
+
+            return {
+                sensor_id: {
+                    "state": entry.state,
+                    "uptime_s": round(now - entry.started_at, 1) if entry.state == RUNNING else 0.0,
+                    "restarts": entry.restarts,
+                    "last_error": entry.last_error
+                }
+                for sensor_id, entry in self._entries.items()
+            }
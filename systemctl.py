@@ -2,18 +2,100 @@ import json
 import sys
 import os
 
+from config_cache import write_json_atomic
+from control import send_command
+from sensor_registry import SensorSchema
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-CONFIG_FILE = os.path.join(BASE_DIR, "sensors.json")
+DATA_DIR = os.environ.get("SENSORBOX_DATA_DIR", BASE_DIR)
+
+CONFIG_FILE = os.path.join(DATA_DIR, "sensors.json")
+
+# Commands go to the running manager's control socket first, so they
+# apply at once and status shows live sample rates. Without a manager
+# sensors.json is edited directly (atomically; the manager reads it
+# at startup). The file is migrated and validated like the manager
+# does, without the hardware map, so a legacy or bad file is caught
+# here too. Only a sensor already listed in the file can be changed,
+# so a mistyped id never reaches it.
+
+CONTROL_SOCKET = os.environ.get(
+    "SENSORBOX_CONTROL_SOCKET",
+    os.path.join(DATA_DIR, "sensorbox.sock")
+)
+
+
+def control(command, **fields):
+    """The manager's reply, or None if it is not running."""
+
+    if not CONTROL_SOCKET:
+        return None
+
+    try:
+        reply = send_command(CONTROL_SOCKET, command, **fields)
+
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+    # A manager that is running but does not answer may still apply
+    # the command, so editing the file behind it would race with it
+
+    except OSError as e:
+        print(f"Sensor manager not responding: {e}")
+        sys.exit(1)
+
+    if not reply.get("ok"):
+        print(reply.get("error", "Command failed"))
+        sys.exit(1)
+
+    return reply
+
+
+SCHEMA = SensorSchema()
+
+
+def load_config():
+
+    with open(CONFIG_FILE, "r") as f:
+        config = SCHEMA.migrate(json.load(f))
+
+    try:
+        SCHEMA.compile(config)
+
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    return config
+
+
+def update_file(sensor_id, **settings):
+
+    config = load_config()
+
+    sensors = config["sensors"]
+
+    if sensor_id not in sensors:
+        print("Sensor not found")
+        sys.exit(1)
+
+    sensors[sensor_id].update(settings)
+
+    try:
+        SCHEMA.compile(config)
+
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
 
-with open(CONFIG_FILE, "r") as f:
-    config = json.load(f)
+    write_json_atomic(CONFIG_FILE, config)
 
-sensors = config["sensors"]
 
 if len(sys.argv) < 2:
     print("Usage:")
     print("sensorctl status")
+    print("sensorctl stats")
     print("sensorctl on SENSOR_ID")
     print("sensorctl off SENSOR_ID")
     print("sensorctl range SENSOR_ID MIN MAX")
@@ -22,18 +104,75 @@ if len(sys.argv) < 2:
 command = sys.argv[1]
 
 if command == "status":
-     print(f"Sensor Box : {config['sensorBoxId']}")
-     print("-" * 40)
 
-     for sensor_id, sensor in sensors.items():
+     reply = control("status")
+
+     if reply is None:
+
+        config = load_config()
+
+        print(f"Sensor Box : {config['sensorBoxId']} (manager not running)")
+        print("-" * 40)
+
+        for sensor_id, sensor in config["sensors"].items():
+
+            status = "ON" if sensor.get("enabled", False) else "OFF"
+
+            print(
+                f"{sensor_id:8}"
+                f" Status={status}"
+                f" Range={sensor.get('min_range', '-')}-{sensor.get('max_range', '-')} cm"
+            )
+
+     else:
+
+        print(f"Sensor Box : {reply['sensorBoxId']} (config generation {reply['generation']})")
+        print("-" * 40)
+
+        for sensor_id, sensor in reply["sensors"].items():
+
+            status = "ON" if sensor["enabled"] else "OFF"
+
+            rate = sensor["sample_hz"]
+
+            worker = sensor.get("worker")
 
-        status = "ON" if sensor["enabled"] else "OFF"
+            power = sensor.get("power")
 
-        print(
-            f"{sensor_id:8}"
-            f" Status={status}"
-            f" Range={sensor['min_range']}-{sensor['max_range']} cm"
-        )
+            sampling = sensor.get("sampling")
+
+            print(
+                f"{sensor_id:8}"
+                f" Status={status}"
+                f" Range={sensor['min_range']:g}-{sensor['max_range']:g} cm"
+                f" Rate={'-' if rate is None else f'{rate:.1f}'} Hz"
+                f" Samples={sensor['samples']}"
+                + (
+                    f" Worker={worker['state']}"
+                    f" Uptime={worker['uptime_s']:.0f}s"
+                    f" Restarts={worker['restarts']}"
+                    if worker else ""
+                )
+                + (
+                    f" Power={'ON' if power['powered'] else 'OFF'}"
+                    f" Duty={power['duty'] * 100:.0f}%"
+                    f" Wakes={power['wakes']}"
+                    if power else ""
+                )
+                + (f" Sampling={sampling['mode']}" if sampling else "")
+            )
+
+elif command == "stats":
+
+    reply = control("stats")
+
+    if reply is None:
+        print("Sensor manager not running")
+        sys.exit(1)
+
+    del reply["ok"]
+
+    print(json.dumps(reply, indent=4))
 
 elif command in ["on", "off"]:
 
@@ -43,14 +182,8 @@ elif command in ["on", "off"]:
 
     sensor_id = sys.argv[2]
 
-    if sensor_id not in sensors:
-        print("Sensor not found")
-        sys.exit(1)
-
-    sensors[sensor_id]["enabled"] = command == "on"
-
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+    if control(command, sensor=sensor_id) is None:
+        update_file(sensor_id, enabled=command == "on")
 
     print(f"{sensor_id} -> {command.upper()}")
 
@@ -62,15 +195,11 @@ elif command == "range":
 
     sensor_id = sys.argv[2]
 
-    if sensor_id not in sensors:
-        print("Sensor not found")
-        sys.exit(1)
-
-    sensors[sensor_id]["min_range"] = int(sys.argv[3])
-    sensors[sensor_id]["max_range"] = int(sys.argv[4])
+    min_range = int(sys.argv[3])
+    max_range = int(sys.argv[4])
 
-    with open(CONFIG_FILE, "w") as f:
-          json.dump(config, f, indent=4)
+    if control("range", sensor=sensor_id, min=min_range, max=max_range) is None:
+        update_file(sensor_id, min_range=min_range, max_range=max_range)
 
     print(
         f"{sensor_id} Range Updated "
@@ -0,0 +1,90 @@
+from adaptive_rate import SPEED_WINDOW, RateController
+from sensor_registry import AdaptivePolicy
+
+POLICY = AdaptivePolicy(idle_hz=2.0, margin=100.0, speed=50.0, hold=5.0)
+
+
+def settled(now=0.0):
+    """A controller that has gone idle on a steady, far reading."""
+
+    controller = RateController(POLICY, max_range=400.0, active_hz=15.0, now=now)
+
+    assert controller.update(800.0, now + 1.0) is False
+    assert controller.update(800.0, now + POLICY.hold) is True
+
+    assert not controller.active
+
+    return controller
+
+
+def test_starts_active_then_idles_after_hold():
+
+    controller = RateController(POLICY, max_range=400.0, active_hz=15.0)
+
+    assert controller.rate_hz == 15.0
+
+    controller = settled()
+
+    assert controller.rate_hz == POLICY.idle_hz
+    assert controller.switches == 1
+
+
+def test_reading_within_margin_switches_to_full_rate():
+
+    controller = settled()
+
+    # Beyond max_range but within the margin
+
+    assert controller.update(480.0, 6.0) is True
+    assert controller.active
+    assert controller.rate_hz == 15.0
+
+    # Stays active until hold after the last busy reading
+
+    assert controller.update(520.0, 6.0 + POLICY.hold - 0.1) is False
+    assert controller.update(520.0, 6.0 + POLICY.hold) is True
+
+
+def test_fast_movement_switches_to_full_rate():
+
+    controller = settled()
+
+    controller.update(800.0, 6.0)
+
+    assert controller.update(800.0 - POLICY.speed, 6.0 + SPEED_WINDOW) is True
+
+
+def test_small_noise_stays_idle():
+
+    controller = settled()
+
+    timestamp = 6.0
+
+    for distance in (800.0, 803.0, 798.0, 801.0, 799.0):
+
+        assert controller.update(distance, timestamp) is False
+
+        timestamp += 0.05
+
+    assert not controller.active
+
+
+def test_missing_echoes_count_as_idle():
+
+    controller = RateController(POLICY, max_range=400.0, active_hz=15.0)
+
+    assert controller.update(None, POLICY.hold) is True
+    assert not controller.active
+
+
+def test_admit_thins_samples_only_while_idle():
+
+    controller = settled()
+
+    admitted = [t for t in (6.0, 6.1, 6.3, 6.5, 6.6, 7.0) if controller.admit(t)]
+
+    assert admitted == [6.0, 6.5, 7.0]
+
+    controller.update(200.0, 7.1)
+
+    assert all(controller.admit(t) for t in (7.1, 7.15, 7.2))
@@ -0,0 +1,203 @@
+import threading
+import time
+
+import pytest
+
+from alert_dispatcher import AlertDispatcher
+
+
+def wait_for(condition, timeout=5.0):
+
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+
+        assert time.monotonic() < deadline, "timed out"
+
+        time.sleep(0.01)
+
+
+def test_full_queue_drops_instead_of_blocking():
+
+    dispatcher = AlertDispatcher(lambda payload: True, maxsize=2, cooldown=0)
+
+    results = [dispatcher.submit(f"US00{i}", {"n": i}) for i in range(3)]
+
+    assert results == [True, True, False]
+    assert dispatcher.dropped == 1
+    assert dispatcher.stats()["queue_depth"] == 2
+
+
+def test_cooldown_suppresses_repeat_alerts_per_sensor():
+
+    dispatcher = AlertDispatcher(lambda payload: True, cooldown=60.0)
+
+    assert dispatcher.submit("US001", {"n": 1})
+    assert not dispatcher.submit("US001", {"n": 2})
+    assert dispatcher.submit("RD001", {"n": 3})
+
+    # A per-call cooldown overrides the default
+
+    assert dispatcher.submit("US001", {"n": 4}, cooldown=0)
+
+    assert dispatcher.suppressed == 1
+    assert dispatcher.submitted == 3
+
+
+def test_dropped_alert_does_not_start_cooldown():
+
+    dispatcher = AlertDispatcher(lambda payload: True, maxsize=1, cooldown=60.0)
+
+    assert dispatcher.submit("US001", {"n": 1})
+    assert not dispatcher.submit("RD001", {"n": 2})
+
+    dispatcher._queue.get_nowait()
+
+    assert dispatcher.submit("RD001", {"n": 3})
+
+
+def test_delivers_in_order_and_counts_failures():
+
+    delivered = []
+
+    def send(payload):
+
+        if payload["n"] == 1:
+            raise OSError("connection refused")
+
+        delivered.append(payload["n"])
+
+        return payload["n"] != 2
+
+    dispatcher = AlertDispatcher(send, cooldown=0)
+
+    for n in range(4):
+        dispatcher.submit("US001", {"n": n})
+
+    dispatcher.start()
+
+    try:
+        wait_for(lambda: dispatcher.sent + dispatcher.failed == 4)
+
+    finally:
+        dispatcher.stop()
+
+    assert delivered == [0, 2, 3]
+    assert (dispatcher.sent, dispatcher.failed) == (2, 2)
+
+
+def test_slow_send_does_not_block_submit():
+
+    release = threading.Event()
+
+    dispatcher = AlertDispatcher(lambda payload: release.wait(5), cooldown=0)
+
+    dispatcher.start()
+
+    try:
+
+        started = time.monotonic()
+
+        for n in range(10):
+            dispatcher.submit("US001", {"n": n})
+
+        assert time.monotonic() - started < 0.5
+
+    finally:
+        release.set()
+        dispatcher.stop()
+
+
+def test_batch_size_needs_send_batch():
+
+    with pytest.raises(ValueError):
+        AlertDispatcher(lambda payload: True, batch_size=4)
+
+
+def test_full_batch_is_sent_at_once():
+
+    batches = []
+
+    dispatcher = AlertDispatcher(
+        None,
+        cooldown=0,
+        send_batch=lambda payloads: batches.append(payloads) or True,
+        batch_size=3,
+        batch_max_delay=5.0
+    )
+
+    for n in range(6):
+        dispatcher.submit("US001", {"n": n})
+
+    dispatcher.start()
+
+    try:
+        wait_for(lambda: dispatcher.sent == 6, timeout=2.0)
+
+    finally:
+        dispatcher.stop()
+
+    assert batches == [[{"n": 0}, {"n": 1}, {"n": 2}], [{"n": 3}, {"n": 4}, {"n": 5}]]
+    assert dispatcher.requests == 2
+
+
+def test_partial_batch_is_flushed_after_max_delay():
+
+    batches = []
+
+    dispatcher = AlertDispatcher(
+        None,
+        cooldown=0,
+        send_batch=lambda payloads: batches.append(payloads) or True,
+        batch_size=10,
+        batch_max_delay=0.1
+    )
+
+    dispatcher.start()
+
+    try:
+
+        dispatcher.submit("US001", {"n": 0})
+        dispatcher.submit("RD001", {"n": 1})
+
+        wait_for(lambda: dispatcher.sent == 2, timeout=1.0)
+
+    finally:
+        dispatcher.stop()
+
+    assert batches == [[{"n": 0}, {"n": 1}]]
+    assert dispatcher.stats()["max_latency_ms"] >= 100
+
+
+def test_batch_settings_change_while_running():
+
+    batches = []
+
+    dispatcher = AlertDispatcher(
+        lambda payload: batches.append([payload]) or True,
+        cooldown=0,
+        send_batch=lambda payloads: batches.append(payloads) or True
+    )
+
+    with pytest.raises(ValueError):
+        AlertDispatcher(lambda payload: True).set_batching(4, 0.5)
+
+    dispatcher.start()
+
+    try:
+
+        dispatcher.submit("US001", {"n": 0})
+
+        wait_for(lambda: dispatcher.sent == 1)
+
+        dispatcher.set_batching(2, 5.0)
+
+        for n in range(1, 3):
+            dispatcher.submit("US001", {"n": n})
+
+        wait_for(lambda: dispatcher.sent == 3)
+
+    finally:
+        dispatcher.stop()
+
+    assert batches == [[{"n": 0}], [{"n": 1}, {"n": 2}]]
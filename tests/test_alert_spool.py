@@ -0,0 +1,150 @@
+import time
+
+from alert_dispatcher import AlertDispatcher
+from alert_spool import AlertSpool
+
+
+def wait_for(condition, timeout=5.0):
+
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+
+        assert time.monotonic() < deadline, "timed out"
+
+        time.sleep(0.01)
+
+
+def crash(spool):
+    """Drop the connection without committing, as a power cut would."""
+
+    spool._db.close()
+
+
+def test_spool_uses_wal_and_keeps_order(tmp_path):
+
+    spool = AlertSpool(str(tmp_path / "spool.db"))
+
+    assert spool._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    for n in range(3):
+        spool.append({"n": n})
+
+    rows = spool.peek(10)
+
+    assert [payload for _, payload in rows] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+    spool.remove([rows[0][0]])
+
+    assert spool.depth() == 2
+    assert spool.peek(1)[0][1] == {"n": 1}
+
+
+def test_oldest_alerts_are_evicted_beyond_max(tmp_path):
+
+    spool = AlertSpool(str(tmp_path / "spool.db"), max_alerts=3)
+
+    for n in range(5):
+        spool.append({"n": n})
+
+    assert spool.depth() == 3
+    assert spool.evicted == 2
+    assert [payload["n"] for _, payload in spool.peek(10)] == [2, 3, 4]
+
+
+def test_crash_loses_only_the_uncommitted_group(tmp_path):
+
+    path = str(tmp_path / "spool.db")
+
+    spool = AlertSpool(path, sync_every=2, sync_interval=60.0)
+
+    for n in range(3):
+        spool.append({"n": n})
+
+    crash(spool)
+
+    spool = AlertSpool(path)
+
+    assert spool.depth() == 2
+    assert [payload["n"] for _, payload in spool.peek(10)] == [0, 1]
+
+
+def test_alerts_spooled_before_a_crash_are_replayed_in_order(tmp_path):
+
+    path = str(tmp_path / "spool.db")
+
+    spool = AlertSpool(path, sync_every=1)
+
+    for n in range(5):
+        spool.append({"n": n})
+
+    crash(spool)
+
+    delivered = []
+
+    spool = AlertSpool(path)
+
+    dispatcher = AlertDispatcher(
+        lambda payload: delivered.append(payload["n"]) or True,
+        spool=spool,
+        replay_rate=100.0
+    )
+
+    dispatcher.start()
+
+    try:
+        wait_for(lambda: spool.depth() == 0)
+
+    finally:
+        dispatcher.stop()
+
+    assert delivered == [0, 1, 2, 3, 4]
+    assert dispatcher.replayed == 5
+
+    # Replayed alerts are gone from disk as well
+
+    spool.close()
+
+    assert AlertSpool(path).depth() == 0
+
+
+def test_failed_alerts_are_spooled_and_replayed_after_backoff(tmp_path):
+
+    online = False
+    delivered = []
+
+    def send(payload):
+
+        if online:
+            delivered.append(payload["n"])
+
+        return online
+
+    spool = AlertSpool(str(tmp_path / "spool.db"))
+
+    dispatcher = AlertDispatcher(
+        send,
+        cooldown=0,
+        spool=spool,
+        replay_rate=100.0,
+        replay_backoff=0.2
+    )
+
+    dispatcher.start()
+
+    try:
+
+        for n in range(3):
+            dispatcher.submit("US001", {"n": n})
+
+        wait_for(lambda: dispatcher.spooled == 3)
+
+        online = True
+
+        wait_for(lambda: spool.depth() == 0)
+
+    finally:
+        dispatcher.stop()
+
+    assert delivered == [0, 1, 2]
+    assert dispatcher.stats()["replayed"] == 3
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+
+import pytest
+
+from config_cache import ConfigCache, write_json_atomic
+from sensor_registry import ConfigError, SensorSchema
+
+DEFAULT = {"sensorBoxId": "BOX1", "sensors": {}}
+
+
+def write(path, data):
+    """Write ``data`` and move the mtime on, so the change is seen even
+    within the file system's timestamp resolution."""
+
+    before = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+    os.utime(path, ns=(before + 10 ** 9, before + 10 ** 9))
+
+
+def test_missing_file_is_created_from_default(tmp_path):
+
+    path = tmp_path / "sensors.json"
+
+    cache = ConfigCache(str(path), default=DEFAULT)
+
+    with open(path) as f:
+        assert json.load(f) == DEFAULT
+
+    assert cache.generation == 1
+    assert cache.snapshot()["sensorBoxId"] == "BOX1"
+
+
+def test_reloads_only_when_file_changes(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    cache = ConfigCache(path, default=DEFAULT)
+
+    assert cache.refresh() is False
+    assert cache.generation == 1
+
+    write(path, {"sensorBoxId": "BOX2", "sensors": {}})
+
+    assert cache.refresh() is True
+    assert cache.generation == 2
+    assert cache.snapshot()["sensorBoxId"] == "BOX2"
+
+    assert cache.refresh() is False
+
+
+def test_snapshot_is_read_only(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    write(path, {"sensorBoxId": "BOX1", "sensors": {"RD001": {"enabled": True}}, "list": [1, 2]})
+
+    snapshot = ConfigCache(path).snapshot()
+
+    with pytest.raises(TypeError):
+        snapshot["sensors"]["RD001"]["enabled"] = False
+
+    assert snapshot["list"] == (1, 2)
+
+
+def test_invalid_file_keeps_last_good_snapshot(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    cache = ConfigCache(path, default=DEFAULT)
+
+    with open(path, "w") as f:
+        f.write('{"sensorBoxId": ')
+
+    os.utime(path, ns=(1, 1))
+
+    assert cache.refresh() is False
+    assert cache.reload_errors == 1
+    assert cache.generation == 1
+    assert cache.snapshot()["sensorBoxId"] == "BOX1"
+
+    write(path, {"sensorBoxId": "BOX3", "sensors": {}})
+
+    assert cache.refresh() is True
+    assert cache.snapshot()["sensorBoxId"] == "BOX3"
+
+
+def test_update_persists_and_publishes(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    cache = ConfigCache(path, default=DEFAULT)
+
+    generation = cache.update(lambda config: config["sensors"].update(RD001={"enabled": True}))
+
+    assert generation == 2
+    assert cache.snapshot()["sensors"]["RD001"]["enabled"] is True
+
+    with open(path) as f:
+        assert json.load(f)["sensors"] == {"RD001": {"enabled": True}}
+
+    # Its own write is not picked up again as a change
+
+    assert cache.refresh() is False
+
+
+def test_update_keeps_a_hand_edit(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    cache = ConfigCache(path, default=DEFAULT)
+
+    write(path, {"sensorBoxId": "EDITED", "sensors": {}})
+
+    cache.update(lambda config: config["sensors"].update(US001={}))
+
+    assert cache.snapshot()["sensorBoxId"] == "EDITED"
+    assert "US001" in cache.snapshot()["sensors"]
+
+
+def test_wait_wakes_on_new_generation(tmp_path):
+
+    cache = ConfigCache(str(tmp_path / "sensors.json"), default=DEFAULT)
+
+    assert cache.wait(cache.generation, timeout=0.01) == 1
+
+    woken = []
+
+    waiter = threading.Thread(target=lambda: woken.append(cache.wait(1, timeout=5)))
+    waiter.start()
+
+    cache.update(lambda config: config.update(sensorBoxId="BOX2"))
+
+    waiter.join(5)
+
+    assert woken == [2]
+
+
+def test_write_json_atomic_keeps_mode_and_leaves_no_temp_file(tmp_path):
+
+    path = tmp_path / "sensors.json"
+
+    path.write_text("{}")
+    os.chmod(path, 0o640)
+
+    write_json_atomic(str(path), {"a": 1})
+
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["sensors.json"]
+
+
+HARDWARE = {
+    "RD001": {"type": "radar", "uart": "/dev/ttyS0", "baudrate": 115200, "power_pin": 5}
+}
+
+
+def test_schema_migrates_and_rewrites_legacy_file(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    write(path, {"sensorBoxId": "BOX1", "sensors": [{"sensorId": "RD001", "min_range": "150"}]})
+
+    cache = ConfigCache(path, schema=SensorSchema(HARDWARE))
+
+    assert cache.compiled.sensors["RD001"].min_range == 150.0
+
+    with open(path) as f:
+        assert json.load(f)["sensors"] == {"RD001": {"min_range": 150, "enabled": True}}
+
+
+def test_invalid_config_fails_at_startup(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    write(path, {"sensorBoxId": "BOX1", "sensors": {"XX999": {}}})
+
+    with pytest.raises(ConfigError):
+        ConfigCache(path, schema=SensorSchema(HARDWARE))
+
+
+def test_invalid_reload_and_update_keep_last_good_config(tmp_path):
+
+    path = str(tmp_path / "sensors.json")
+
+    write(path, {"sensorBoxId": "BOX1", "sensors": {"RD001": {"enabled": True}}})
+
+    cache = ConfigCache(path, schema=SensorSchema(HARDWARE))
+
+    write(path, {"sensorBoxId": "BOX1", "sensors": {"RD001": {"min_range": 500, "max_range": 100}}})
+
+    assert cache.refresh() is False
+    assert cache.compiled.sensors["RD001"].enabled
+
+    write(path, {"sensorBoxId": "BOX1", "sensors": {"RD001": {"enabled": True}}})
+
+    assert cache.refresh() is True
+
+    with pytest.raises(ConfigError):
+        cache.update(lambda config: config["sensors"].update(XX999={}))
+
+    with open(path) as f:
+        assert "XX999" not in json.load(f)["sensors"]
@@ -0,0 +1,146 @@
+import json
+import os
+import socket
+import stat
+
+import pytest
+
+from control import ControlServer, LiveRates, send_command, start_control_server
+
+
+def make_commands(ranges):
+
+    def set_range(sensor, min, max):
+
+        if sensor not in ranges:
+            raise KeyError(f"Unknown sensor {sensor}")
+
+        if min >= max:
+            raise ValueError("min must be below max")
+
+        ranges[sensor] = (min, max)
+
+        return {"sensor": sensor}
+
+    def crash():
+
+        raise RuntimeError("boom")
+
+    return {
+        "status": lambda: {"sensors": sorted(ranges)},
+        "range": set_range,
+        "crash": crash
+    }
+
+
+@pytest.fixture
+def server(tmp_path):
+
+    ranges = {"RD001": (120, 720)}
+
+    server = start_control_server(str(tmp_path / "control.sock"), make_commands(ranges))
+
+    server.ranges = ranges
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_commands_round_trip_over_the_socket(server):
+
+    assert send_command(server.path, "status") == {"ok": True, "sensors": ["RD001"]}
+
+    reply = send_command(server.path, "range", sensor="RD001", min=100, max=400)
+
+    assert reply == {"ok": True, "sensor": "RD001"}
+    assert server.ranges["RD001"] == (100, 400)
+
+
+def test_errors_become_error_replies(server):
+
+    assert send_command(server.path, "range", sensor="XX999", min=1, max=2) == {"ok": False, "error": "Unknown sensor XX999"}
+    assert send_command(server.path, "range", sensor="RD001", min=5, max=2) == {"ok": False, "error": "min must be below max"}
+    assert send_command(server.path, "nope") == {"ok": False, "error": "Unknown command nope"}
+
+    # A missing field is a TypeError from the call
+
+    assert send_command(server.path, "range", sensor="RD001")["ok"] is False
+
+    assert send_command(server.path, "crash") == {"ok": False, "error": "crash failed: boom"}
+
+
+def test_one_connection_carries_many_requests(server):
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+
+        client.settimeout(2.0)
+        client.connect(server.path)
+
+        client.sendall(b'{"command": "status"}\n\nnot json\n{"sensor": "RD001"}\n')
+
+        with client.makefile("rb") as replies:
+            lines = [json.loads(replies.readline()) for _ in range(3)]
+
+    assert lines == [
+        {"ok": True, "sensors": ["RD001"]},
+        {"ok": False, "error": "Bad request"},
+        {"ok": False, "error": "Bad request"}
+    ]
+
+
+def test_socket_is_group_only_and_removed_on_close(tmp_path):
+
+    path = str(tmp_path / "control.sock")
+
+    server = ControlServer(path, {})
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o660
+
+    server.server_close()
+
+    assert not os.path.exists(path)
+
+
+def test_stale_socket_is_replaced_but_live_one_is_not(tmp_path, server):
+
+    with pytest.raises(OSError):
+        ControlServer(server.path, {})
+
+    path = str(tmp_path / "stale.sock")
+
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    ControlServer(path, {}).server_close()
+
+
+def test_send_command_without_manager_raises(tmp_path):
+
+    with pytest.raises(OSError):
+        send_command(str(tmp_path / "missing.sock"), "status")
+
+
+def test_live_rates_over_window(monkeypatch):
+
+    clock = [100.0]
+
+    monkeypatch.setattr("control.time.monotonic", lambda: clock[0])
+
+    counts = {"samples": 0}
+
+    rates = LiveRates(lambda: dict(counts), window=5.0)
+
+    for _ in range(10):
+
+        rates.sample()
+
+        clock[0] += 1.0
+        counts["samples"] += 20
+
+    # The base is the newest sample at least 5 s old
+
+    assert rates.rates() == {"samples": 20.0}
+    assert len(rates._history) <= 7
@@ -0,0 +1,159 @@
+import time
+
+import pytest
+
+from duty_cycle import DutyCycler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+
+    now = [1000.0]
+
+    monkeypatch.setattr("duty_cycle.time.monotonic", lambda: now[0])
+
+    return now
+
+
+def make_cycler(**options):
+
+    power = {}
+
+    cycler = DutyCycler(lambda sensor_id, powered: power.__setitem__(sensor_id, powered), **options)
+
+    return cycler, power
+
+
+def tick(cycler, clock, seconds):
+
+    clock[0] += seconds
+
+    for sensor in cycler._sensors.values():
+        cycler._apply(sensor, clock[0])
+
+
+def test_sensor_without_window_stays_on(clock):
+
+    cycler, power = make_cycler()
+
+    cycler.add("RD001", "Z1")
+
+    tick(cycler, clock, 100.0)
+
+    assert power == {"RD001": True}
+    assert cycler.stats()["RD001"]["duty"] == 1.0
+
+
+def test_samples_are_untrusted_during_warmup(clock):
+
+    cycler, power = make_cycler()
+
+    cycler.add("RD001", "Z1", warmup=2.0)
+
+    assert not cycler.trusted("RD001", clock[0] + 1.9)
+    assert cycler.trusted("RD001", clock[0] + 2.0)
+
+    assert not cycler.trusted("XX999", clock[0] + 5.0)
+    assert cycler.stats()["RD001"]["untrusted_samples"] == 1
+
+
+def test_window_follows_period_and_offset(clock):
+
+    cycler, power = make_cycler()
+
+    cycler.add("US001", "Z1", duty_on=2.0, duty_off=8.0, duty_offset=3.0)
+
+    # Starts outside its window, so it is switched off explicitly
+
+    assert power == {"US001": False}
+
+    states = []
+
+    for _ in range(20):
+
+        tick(cycler, clock, 1.0)
+
+        states.append(power["US001"])
+
+    assert states[:10] == [False, False, True, True, False, False, False, False, False, False]
+    assert states[10:] == states[:10]
+
+    assert cycler.stats()["US001"]["duty"] == pytest.approx(0.2)
+    assert cycler.stats()["US001"]["power_ups"] == 2
+
+
+def test_window_reports_next_edge(clock):
+
+    cycler, power = make_cycler()
+
+    cycler.add("US001", "Z1", duty_on=2.0, duty_off=8.0)
+
+    sensor = cycler._sensors["US001"]
+
+    assert sensor.window(cycler.epoch + 1.0, cycler.epoch) == (True, cycler.epoch + 2.0)
+    assert sensor.window(cycler.epoch + 4.0, cycler.epoch) == (False, cycler.epoch + 10.0)
+
+
+def test_hit_wakes_zone_partners_until_hold_expires(clock):
+
+    cycler, power = make_cycler(wake_hold=5.0)
+
+    cycler.add("RD001", "Z1")
+    cycler.add("US001", "Z1", warmup=0.5, duty_on=1.0, duty_off=59.0, duty_offset=30.0)
+    cycler.add("US002", "Z2", duty_on=1.0, duty_off=59.0, duty_offset=30.0)
+
+    assert power == {"RD001": True, "US001": False, "US002": False}
+
+    cycler.hit("RD001", clock[0])
+
+    assert power == {"RD001": True, "US001": True, "US002": False}
+
+    # The woken partner still warms up before its samples count
+
+    assert not cycler.trusted("US001", clock[0] + 0.2)
+    assert cycler.trusted("US001", clock[0] + 0.6)
+
+    tick(cycler, clock, 4.9)
+
+    assert power["US001"]
+
+    tick(cycler, clock, 0.1)
+
+    assert not power["US001"]
+
+    stats = cycler.stats()["US001"]
+
+    assert stats["wakes"] == 1
+    assert stats["wake_latency_s"] == pytest.approx(0.6)
+
+
+def test_remove_switches_sensor_off(clock):
+
+    cycler, power = make_cycler()
+
+    cycler.add("RD001", "Z1")
+    cycler.remove("RD001")
+
+    assert power == {"RD001": False}
+    assert cycler.stats() == {}
+    assert not cycler.trusted("RD001", clock[0])
+
+
+def test_thread_switches_at_window_edges():
+
+    switches = []
+
+    cycler = DutyCycler(lambda sensor_id, powered: switches.append(powered))
+
+    cycler.add("US001", "Z1", duty_on=0.05, duty_off=0.05)
+
+    cycler.start()
+
+    try:
+        time.sleep(0.32)
+
+    finally:
+        cycler.stop()
+
+    assert len(switches) >= 4
+    assert switches == [True, False] * (len(switches) // 2) + [True] * (len(switches) % 2)
@@ -0,0 +1,225 @@
+import time
+
+from event_store import MINUTE_US, EventStore, parse_event
+
+T0 = 1700000000 * 1000000
+
+
+def wait_for(condition, timeout=5.0):
+
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+
+        assert time.monotonic() < deadline, "timed out"
+
+        time.sleep(0.01)
+
+
+def manager_event(box, sensors, ts_us, kind="enter", zone="Z1"):
+
+    return {
+        "sensorId": box,
+        "data": f"Event:{kind};Zone:{zone};Sensors:{'+'.join(sensors)};TimestampUs:{ts_us}"
+    }
+
+
+def test_parses_manager_events():
+
+    event = manager_event("BOX1", ["RD001", "US001"], T0)
+
+    assert parse_event(None, event, 0) == ("BOX1", T0, "enter", "Z1", ("RD001", "US001"))
+
+    # A box id from the request wins over the payload's
+
+    assert parse_event("BOX2", event, 0)[0] == "BOX2"
+
+
+def test_parses_ultrasonic_events():
+
+    event = {"cameraId": "CAM1", "sensorId": "US001", "eventTime": "1700000000.5", "eventTag": "presence"}
+
+    assert parse_event(None, event, 0) == ("CAM1", T0 + 500000, "presence", None, ("US001",))
+
+
+def test_bad_event_time_falls_back_to_arrival():
+
+    assert parse_event("BOX1", {"sensorId": "BOX1", "data": "TimestampUs:soon"}, 42)[1] == 42
+    assert parse_event("BOX1", {"eventTime": None}, 42)[1] == 42
+    assert parse_event("BOX1", "not an event", 42) == ("BOX1", 42, None, None, ())
+
+
+def test_out_of_range_event_time_falls_back_to_arrival():
+
+    assert parse_event("CAM1", {"eventTime": 1e400}, 42)[1] == 42
+    assert parse_event("CAM1", {"eventTime": "-1e30"}, 42)[1] == 42
+    assert parse_event("BOX1", {"data": f"TimestampUs:{2 ** 63}"}, 42)[1] == 42
+    assert parse_event("BOX1", {"data": f"TimestampUs:{2 ** 63 - 1}"}, 42)[1] == 2 ** 63 - 1
+
+
+def test_store_uses_wal(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    try:
+        assert store._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    finally:
+        store.close()
+
+
+def test_events_are_written_in_one_batch_and_queried_by_time(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"), batch_interval=60.0)
+
+    store.add("BOX1", [manager_event("BOX1", ["RD001"], T0 + n * 1000000) for n in range(3)])
+    store.add("BOX2", [manager_event("BOX2", ["RD001"], T0)])
+
+    # Nothing is visible until the writer commits
+
+    assert store.events("BOX1", T0, T0 + MINUTE_US) == []
+
+    store.start()
+    store.close()
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    try:
+
+        events = store.events("BOX1", T0 + 1000000, T0 + MINUTE_US)
+
+        assert [event["timestampUs"] for event in events] == [T0 + 1000000, T0 + 2000000]
+        assert events[0]["sensorBoxId"] == "BOX1"
+        assert events[0]["payload"]["sensorId"] == "BOX1"
+
+        assert len(store.events("BOX1", T0, T0 + MINUTE_US, limit=2)) == 2
+
+    finally:
+        store.close()
+
+
+def test_full_batch_is_written_before_the_interval(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"), batch_size=2, batch_interval=60.0)
+
+    store.start()
+
+    try:
+
+        store.add("BOX1", [manager_event("BOX1", ["RD001"], T0), manager_event("BOX1", ["RD001"], T0 + 1)])
+
+        wait_for(lambda: store.stored == 2)
+
+        assert store.batches == 1
+
+    finally:
+        store.close()
+
+
+def test_fused_event_is_found_under_each_sensor_of_its_box(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    store.add("BOX1", [manager_event("BOX1", ["RD001", "US001"], T0)])
+    store.add("BOX2", [manager_event("BOX2", ["RD001"], T0)])
+
+    store.start()
+    store.close()
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    try:
+
+        for sensor in ("RD001", "US001"):
+
+            events = store.events("BOX1", T0, T0 + 1, sensor=sensor)
+
+            assert [event["sensors"] for event in events] == [["RD001", "US001"]]
+
+        assert [event["sensorBoxId"] for event in store.events("BOX2", T0, T0 + 1, sensor="RD001")] == ["BOX2"]
+        assert store.events("BOX2", T0, T0 + 1, sensor="US001") == []
+
+    finally:
+        store.close()
+
+
+def test_minute_counts_are_rolled_up_at_ingest(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    store.add("BOX1", [
+        manager_event("BOX1", ["RD001"], T0),
+        manager_event("BOX1", ["RD001", "US001"], T0 + 1000000),
+        manager_event("BOX1", ["RD001"], T0 + MINUTE_US)
+    ])
+
+    store.start()
+    store.close()
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    try:
+
+        minute = T0 // MINUTE_US * MINUTE_US
+
+        assert store.minute_counts("BOX1", T0, T0 + 2 * MINUTE_US) == [
+            {"sensor": "RD001", "minuteUs": minute, "count": 2},
+            {"sensor": "RD001", "minuteUs": minute + MINUTE_US, "count": 1},
+            {"sensor": "US001", "minuteUs": minute, "count": 1}
+        ]
+
+        assert store.minute_counts("BOX1", T0, T0 + 2 * MINUTE_US, sensor="US001")[0]["count"] == 1
+
+    finally:
+        store.close()
+
+
+def test_huge_timestamp_is_stored_at_arrival_time(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    store.add("BOX1", [{"sensorId": "BOX1", "data": f"Sensors:RD001;TimestampUs:{10 ** 30}"}], received_us=T0)
+
+    store.start()
+    store.close()
+
+    store = EventStore(str(tmp_path / "events.db"))
+
+    try:
+        assert [event["timestampUs"] for event in store.events("BOX1", T0, T0 + 1)] == [T0]
+
+    finally:
+        store.close()
+
+
+def test_writer_keeps_going_after_a_failed_batch(tmp_path):
+
+    store = EventStore(str(tmp_path / "events.db"), batch_size=1, batch_interval=60.0)
+
+    write = store._write
+
+    def fail_once(pending):
+
+        store._write = write
+
+        raise RuntimeError("disk gone")
+
+    store._write = fail_once
+
+    store.start()
+
+    try:
+
+        store.add("BOX1", [manager_event("BOX1", ["RD001"], T0)])
+
+        wait_for(lambda: store._write is write)
+
+        store.add("BOX1", [manager_event("BOX1", ["RD001"], T0 + 1)])
+
+        wait_for(lambda: store.stored == 1)
+
+        assert store._thread.is_alive()
+        assert store._pending == []
+
+    finally:
+        store.close()
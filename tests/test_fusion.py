@@ -0,0 +1,168 @@
+import threading
+
+from config_cache import StaticConfig
+from detection import DetectionPipeline
+from fusion import FLOOR, SOLO_CONFIDENCE, FusionEngine
+from sensor_registry import SensorSchema
+
+HARDWARE = {
+    "RD001": {"type": "radar", "uart": "/dev/ttyS0", "baudrate": 115200, "power_pin": 5, "zone": "Z1"},
+    "US001": {"type": "ultrasonic", "trig": 23, "echo": 24, "power_pin": 6, "zone": "Z1"}
+}
+
+
+def test_solo_confidence_without_partner_data():
+
+    engine = FusionEngine(["RD001", "US001"])
+
+    detection = engine.add("RD001", 1.0, 200.0, True)
+
+    assert detection.confidence == SOLO_CONFIDENCE
+    assert detection.sensors == ("RD001",)
+
+
+def test_agreeing_partner_raises_confidence():
+
+    engine = FusionEngine(["RD001", "US001"], skew=0.5, tolerance=50.0)
+
+    engine.add("US001", 0.9, 210.0, True)
+
+    detection = engine.add("RD001", 1.0, 200.0, True)
+
+    assert detection.confidence == round(FLOOR + (1 - FLOOR) * 0.8, 2)
+    assert detection.sensors == ("RD001", "US001")
+    assert engine.confirmed == 1
+
+
+def test_partner_seeing_nothing_gives_floor():
+
+    engine = FusionEngine(["RD001", "US001"])
+
+    engine.add("US001", 0.9, 600.0, False)
+
+    assert engine.add("RD001", 1.0, 200.0, True).confidence == FLOOR
+
+
+def test_samples_outside_skew_are_not_counted():
+
+    engine = FusionEngine(["RD001", "US001"], skew=0.5)
+
+    engine.add("US001", 0.2, 200.0, True)
+
+    assert engine.add("RD001", 1.0, 200.0, True).confidence == SOLO_CONFIDENCE
+
+
+def test_rescore_counts_later_partner_samples():
+
+    engine = FusionEngine(["RD001", "US001"], skew=0.5, tolerance=50.0)
+
+    engine.add("US001", 0.9, 600.0, False)
+
+    detection = engine.add("RD001", 1.0, 200.0, True)
+
+    assert detection.confidence == FLOOR
+    assert not engine.caught_up(1.0)
+
+    engine.add("US001", 1.1, 200.0, True)
+
+    assert engine.caught_up(1.0)
+
+    rescored = engine.rescore(detection)
+
+    assert rescored.confidence == 1.0
+    assert rescored.sensors == ("RD001", "US001")
+
+
+def make_pipeline(events, on_hit=None):
+
+    config = StaticConfig(
+        {
+            "sensorBoxId": "BOX1",
+            "sensors": {
+                "RD001": {"enabled": True},
+                "US001": {"enabled": True}
+            }
+        },
+        SensorSchema(HARDWARE)
+    )
+
+    return DetectionPipeline(HARDWARE, config, lambda *event: events.append(event), on_hit=on_hit)
+
+
+def test_pipeline_holds_enter_until_partner_reports():
+
+    events = []
+
+    pipeline = make_pipeline(events)
+
+    pipeline.sample("US001", [600], 0.9)
+    pipeline.sample("RD001", [200], 1.0)
+
+    assert events == []
+
+    pipeline.sample("US001", [205], 1.05)
+
+    (zone, event, confidence, sensors), = events
+
+    assert zone == "Z1"
+    assert event.kind == "enter"
+    assert event.timestamp == 1.0
+    assert confidence > 0.9
+    assert sensors == ("RD001", "US001")
+
+
+def test_pipeline_releases_enter_after_skew_without_partner():
+
+    events = []
+
+    pipeline = make_pipeline(events)
+
+    pipeline.sample("RD001", [200], 1.0)
+    pipeline.sample("RD001", [200], 1.2)
+
+    assert events == []
+
+    pipeline.expire(1.6)
+
+    (zone, event, confidence, sensors), = events
+
+    assert event.kind == "enter"
+    assert confidence == SOLO_CONFIDENCE
+    assert sensors == ("RD001",)
+
+
+def test_pipeline_serializes_threads():
+
+    events = []
+    inside = threading.Event()
+    release = threading.Event()
+
+    def on_hit(sensor_id, timestamp):
+
+        inside.set()
+        release.wait(2.0)
+
+    pipeline = make_pipeline(events, on_hit=on_hit)
+
+    radar = threading.Thread(target=pipeline.sample, args=("RD001", [200], 1.0))
+    radar.start()
+
+    assert inside.wait(2.0)
+
+    # The radar's sample is half way through; expiry has to wait for it
+
+    expiry = threading.Thread(target=pipeline.expire, args=(1.6,))
+    expiry.start()
+    expiry.join(0.1)
+
+    assert expiry.is_alive()
+
+    release.set()
+
+    radar.join(2.0)
+    expiry.join(2.0)
+
+    (zone, event, confidence, sensors), = events
+
+    assert event.kind == "enter"
+    assert event.timestamp == 1.0
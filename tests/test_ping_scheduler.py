@@ -0,0 +1,166 @@
+import threading
+import time
+
+from ping_scheduler import PingScheduler
+
+
+def wait_until(condition, timeout=2.0):
+
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+
+        if condition():
+            return True
+
+        time.sleep(0.01)
+
+    return False
+
+
+def test_dead_group_is_replaced_with_all_its_sensors():
+
+    pings = {}
+    lock = threading.Lock()
+
+    def on_result(sensor_id, distance, timestamp):
+
+        with lock:
+            pings[sensor_id] = pings.get(sensor_id, 0) + 1
+
+    scheduler = PingScheduler(on_result, echo_window=0.001)
+
+    try:
+
+        scheduler.add("US1", lambda: 100.0, 50.0, group="g")
+        scheduler.add("US2", lambda: 100.0, 50.0, group="g")
+
+        scheduler.set_rate("US1", 25.0)
+        scheduler.set_active("US2", False)
+
+        # The group's thread dies
+
+        dead = scheduler._groups["g"]
+        dead.stop(timeout=1)
+
+        assert not scheduler.alive("US1")
+
+        scheduler.add("US3", lambda: 100.0, 50.0, group="g")
+
+        replacement = scheduler._groups["g"]
+
+        assert replacement is not dead
+        assert set(replacement.sensors) == {"US1", "US2", "US3"}
+
+        assert scheduler.alive("US1")
+        assert scheduler.alive("US2")
+
+        stats = scheduler.stats()
+
+        assert stats["US1"]["target_hz"] == 25.0
+        assert stats["US2"]["active"] is False
+
+        with lock:
+            pings.clear()
+
+        assert wait_until(lambda: pings.get("US1", 0) >= 3 and pings.get("US3", 0) >= 3)
+        assert "US2" not in pings
+
+    finally:
+        scheduler.stop(timeout=1)
+
+
+def test_groups_fire_one_sensor_at_a_time():
+
+    active = []
+    overlaps = []
+
+    def measure():
+
+        active.append(1)
+
+        if len(active) > 1:
+            overlaps.append(len(active))
+
+        time.sleep(0.002)
+
+        active.pop()
+
+        return 100.0
+
+    scheduler = PingScheduler(lambda *args: None, echo_window=0.001)
+
+    try:
+
+        for sensor_id in ("US1", "US2", "US3"):
+            scheduler.add(sensor_id, measure, 100.0, group="g")
+
+        assert wait_until(lambda: all(s["pings"] >= 5 for s in scheduler.stats().values()))
+
+        assert not overlaps
+
+    finally:
+        scheduler.stop(timeout=1)
+
+
+def test_stop_does_not_deadlock_with_on_result_calling_back():
+
+    scheduler = None
+
+    def on_result(sensor_id, distance, timestamp):
+
+        # Blocks on the scheduler's lock if stop() still holds it
+
+        time.sleep(0.005)
+
+        scheduler.set_rate(sensor_id, 200.0)
+
+    scheduler = PingScheduler(on_result, echo_window=0.001)
+
+    scheduler.add("US1", lambda: 100.0, 200.0, group="g")
+
+    ping_group = scheduler._groups["g"]
+
+    assert wait_until(lambda: ping_group.sensors["US1"].pings >= 3)
+
+    stopper = threading.Thread(target=scheduler.stop, daemon=True)
+    stopper.start()
+    stopper.join(2.0)
+
+    assert not stopper.is_alive()
+    assert not ping_group.alive()
+
+
+def test_removing_last_sensor_stops_its_group():
+
+    scheduler = PingScheduler(lambda *args: None, echo_window=0.001)
+
+    try:
+
+        scheduler.add("US1", lambda: 100.0, 50.0, group="g")
+        scheduler.add("US2", lambda: 100.0, 50.0, group="g")
+
+        ping_group = scheduler._groups["g"]
+
+        scheduler.remove("US1")
+
+        assert ping_group.alive()
+
+        scheduler.remove("US2")
+
+        assert not ping_group.alive()
+        assert scheduler._groups == {}
+
+        # Moving a sensor to another group stops the one it left
+
+        scheduler.add("US3", lambda: 100.0, 50.0, group="a")
+
+        left = scheduler._groups["a"]
+
+        scheduler.add("US3", lambda: 100.0, 50.0, group="b")
+
+        assert not left.alive()
+        assert list(scheduler._groups) == ["b"]
+
+    finally:
+        scheduler.stop(timeout=1)
@@ -0,0 +1,67 @@
+from presence import ENTER, EXIT, STILL_PRESENT, PresenceTracker
+
+
+def test_enter_once_then_exit_after_clear_timeout():
+
+    tracker = PresenceTracker(clear_timeout=3.0)
+
+    event = tracker.update([200], 120, 400, 1.0)
+
+    assert event.kind == ENTER
+    assert event.distance == 200
+
+    assert tracker.update([210], 120, 400, 2.0) is None
+    assert tracker.update([500], 120, 400, 4.0) is None
+
+    event = tracker.update([500], 120, 400, 5.0)
+
+    assert event.kind == EXIT
+    assert event.duration == 4.0
+    assert not tracker.present
+
+
+def test_min_dwell_delays_enter():
+
+    tracker = PresenceTracker(min_dwell=1.0)
+
+    assert tracker.update([200], 120, 400, 0.0) is None
+    assert tracker.update([200], 120, 400, 0.5) is None
+    assert tracker.update([200], 120, 400, 1.0).kind == ENTER
+
+
+def test_candidate_that_goes_quiet_never_enters():
+
+    tracker = PresenceTracker(min_dwell=1.0, clear_timeout=0.5)
+
+    assert tracker.update([200], 120, 400, 0.0) is None
+    assert tracker.expire(0.6) is None
+
+    # The dwell starts again from the next hit
+
+    assert tracker.update([200], 120, 400, 1.0) is None
+    assert tracker.update([200], 120, 400, 2.0).kind == ENTER
+
+
+def test_hysteresis_widens_range_while_present():
+
+    tracker = PresenceTracker(clear_timeout=1.0, hysteresis=20.0)
+
+    assert tracker.update([410], 120, 400, 0.0) is None
+
+    assert tracker.update([390], 120, 400, 1.0).kind == ENTER
+
+    # Just beyond max_range still counts while present
+
+    assert tracker.update([415], 120, 400, 1.8) is None
+    assert tracker.expire(2.5) is None
+    assert tracker.expire(2.9).kind == EXIT
+
+
+def test_heartbeat():
+
+    tracker = PresenceTracker(heartbeat=2.0)
+
+    assert tracker.update([200], 120, 400, 0.0).kind == ENTER
+    assert tracker.update([200], 120, 400, 1.0) is None
+    assert tracker.update([200], 120, 400, 2.0).kind == STILL_PRESENT
+    assert tracker.update([200], 120, 400, 3.0) is None
@@ -0,0 +1,50 @@
+from radar_parser import RadarSample, RangeParser
+
+
+def test_parses_complete_lines():
+
+    parser = RangeParser()
+
+    samples = parser.feed(b"Range 123\r\nRange 45.5\r\n", timestamp=1.0)
+
+    assert samples == [RadarSample(123.0, 1.0), RadarSample(45.5, 1.0)]
+    assert parser.samples == 2
+
+
+def test_line_split_across_chunks():
+
+    parser = RangeParser()
+
+    assert parser.feed(b"Range 1", timestamp=1.0) == []
+    assert parser.feed(b"50\r\nRan", timestamp=2.0) == [RadarSample(150.0, 2.0)]
+    assert parser.feed(b"ge 200\r\n", timestamp=3.0) == [RadarSample(200.0, 3.0)]
+
+
+def test_skips_other_lines_and_counts_bad_numbers():
+
+    parser = RangeParser()
+
+    samples = parser.feed(b"ON\r\nRange abc\r\nnoise Range 80 cm\r\n", timestamp=1.0)
+
+    assert samples == [RadarSample(80.0, 1.0)]
+    assert parser.parse_errors == 1
+
+
+def test_discards_overlong_line():
+
+    parser = RangeParser(max_line=16)
+
+    assert parser.feed(b"x" * 20, timestamp=1.0) == []
+    assert parser.overflows == 1
+
+    assert parser.feed(b"Range 90\n", timestamp=2.0) == [RadarSample(90.0, 2.0)]
+
+
+def test_reset_drops_partial_line():
+
+    parser = RangeParser()
+
+    parser.feed(b"Range 12", timestamp=1.0)
+    parser.reset()
+
+    assert parser.feed(b"3\nRange 7\n", timestamp=2.0) == [RadarSample(7.0, 2.0)]
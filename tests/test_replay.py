@@ -0,0 +1,58 @@
+from config_cache import StaticConfig
+from replay import replay
+from sample_recorder import FLAG_GATED, NO_ECHO, Recording, SampleRecorder
+from sensor_registry import SensorSchema
+
+SENSORS = {
+    "RD001": {"type": "radar", "uart": "/dev/ttyS0", "baudrate": 115200, "power_pin": 5, "zone": "Z1"}
+}
+
+CONFIG = {"sensorBoxId": "BOX1", "sensors": {"RD001": {"enabled": True, "min_range": 120, "max_range": 400}}}
+
+
+def record(path, samples):
+
+    recorder = SampleRecorder(path, SENSORS, CONFIG)
+
+    for timestamp, distances, gated in samples:
+        recorder.record_many("RD001", timestamp, distances, gated=gated)
+
+    recorder.close()
+
+    return Recording(path)
+
+
+def test_gated_flag_is_recorded(tmp_path):
+
+    recording = record(str(tmp_path / "site.rec"), [
+        (1.0, [200.0, 210.0], True),
+        (1.1, [NO_ECHO], False)
+    ])
+
+    assert list(recording.records["flags"] & FLAG_GATED) == [FLAG_GATED, FLAG_GATED, 0]
+    assert list(recording.records["distance"]) == [200.0, 210.0, NO_ECHO]
+
+    recording.close()
+
+
+def test_replay_skips_gated_samples_unless_asked(tmp_path):
+
+    # The radar was still warming up when it saw something in range
+
+    recording = record(str(tmp_path / "site.rec"), [
+        (1.0, [200.0], True),
+        (1.5, [600.0], False),
+        (2.0, [600.0], False)
+    ])
+
+    config = StaticConfig(recording.config, SensorSchema(recording.definitions))
+
+    events, _ = replay(recording, config)
+
+    assert events == []
+
+    events, _ = replay(recording, config, all_samples=True)
+
+    assert [event.kind for _, event, _, _ in events] == ["enter", "exit"]
+
+    recording.close()
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from sensor_registry import ConfigError, SensorSchema, migrate, validate
+
+HARDWARE = {
+    "RD001": {"type": "radar", "uart": "/dev/ttyS0", "baudrate": 115200, "power_pin": 5, "zone": "Z1"},
+    "US001": {"type": "ultrasonic", "trig": 23, "echo": 24, "power_pin": 6, "zone": "Z1"}
+}
+
+SHIPPED_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sensor.json")
+
+
+def config(**sensors):
+
+    return {"sensorBoxId": "BOX1", "sensors": sensors}
+
+
+def test_migrates_shipped_sensor_list():
+
+    with open(SHIPPED_CONFIG) as f:
+        legacy = json.load(f)
+
+    data = migrate(legacy)
+
+    assert data["sensors"]["RD001"] == {"min_range": 120, "max_range": 720, "enabled": True}
+    assert data["sensors"]["US001"]["max_range"] == 720
+
+    # The input is left alone
+
+    assert isinstance(legacy["sensors"], list)
+
+    assert validate(HARDWARE, data) == []
+
+
+def test_migrates_top_level_sensor_settings():
+
+    data = migrate({"sensorBoxId": "BOX1", "RD001": {"enabled": True, "min_range": "150.5"}})
+
+    assert data == {"sensorBoxId": "BOX1", "sensors": {"RD001": {"enabled": True, "min_range": 150.5}}}
+
+
+def test_compiles_typed_sensor_configs():
+
+    registry = SensorSchema(HARDWARE).compile(
+        config(RD001={"enabled": True, "min_range": 100, "max_range": 500, "rate_hz": 10})
+    )
+
+    radar = registry.sensors["RD001"]
+
+    assert radar.enabled and radar.type == "radar" and radar.zone == "Z1"
+    assert (radar.min_range, radar.max_range, radar.rate_hz) == (100.0, 500.0, 10.0)
+
+    assert not registry.sensors["US001"].enabled
+    assert list(registry.enabled()) == ["RD001"]
+
+
+def test_reports_every_problem():
+
+    problems = validate(HARDWARE, {
+        "sensorBoxId": "BOX1",
+        "sensors": {
+            "RD001": {"enabled": "yes", "min_range": 500, "max_range": 100},
+            "XX999": {"enabled": True}
+        }
+    })
+
+    assert "sensors.RD001.enabled must be true or false" in problems
+    assert "sensors.RD001: min_range 500 must be below max_range 100" in problems
+    assert "sensors.XX999 is not a known sensor" in problems
+
+
+def test_missing_hardware_pin_is_rejected():
+
+    hardware = dict(HARDWARE, US001={"type": "ultrasonic", "trig": 23, "power_pin": 6})
+
+    assert "SENSORS.US001.echo is required for a ultrasonic" in validate(hardware, config())
+
+
+@pytest.mark.parametrize("settings, problem", [
+    ({"median": 0}, "median must be a whole number of at least 1"),
+    ({"median": 2.5}, "median must be a whole number of at least 1"),
+    ({"median": True}, "median must be a whole number of at least 1"),
+    ({"ema_alpha": 0}, "ema_alpha must be above 0 and at most 1"),
+    ({"ema_alpha": 1.5}, "ema_alpha must be above 0 and at most 1"),
+    ({"ema_alpha": "0.4"}, "ema_alpha must be above 0 and at most 1"),
+    ({"outlier_k": 0}, "outlier_k must be above 0"),
+    ({"outlier_k": -1}, "outlier_k must be above 0"),
+    ({"window": 5}, "window is not a setting"),
+])
+def test_bad_filter_settings_are_rejected(settings, problem):
+
+    problems = validate(HARDWARE, config(RD001={"filter": settings}))
+
+    assert any(p.startswith("sensors.RD001.filter.") and problem in p for p in problems), problems
+
+    with pytest.raises(ConfigError):
+        SensorSchema(HARDWARE).compile(config(RD001={"filter": settings}))
+
+
+def test_filter_must_be_an_object():
+
+    assert "sensors.RD001.filter must be an object" in validate(HARDWARE, config(RD001={"filter": [3]}))
+
+
+def test_good_filter_settings_are_accepted():
+
+    good = {"median": 5, "ema_alpha": 1.0, "outlier_k": 4, "history": 16}
+
+    assert validate(HARDWARE, config(RD001={"filter": good}, US001={"filter": None})) == []
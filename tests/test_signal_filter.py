@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from signal_filter import DEFAULT_MEDIAN, SignalFilter
+
+
+def test_no_filter_config_is_passthrough():
+
+    for config in (None, {}):
+
+        f = SignalFilter.from_config(config)
+
+        assert list(f.process([100, 5, 300])) == [100, 5, 300]
+
+
+def test_filter_config_without_median_uses_default():
+
+    assert SignalFilter.from_config({"ema_alpha": 0.5}).median == DEFAULT_MEDIAN
+
+
+def test_rolling_median_spans_batches():
+
+    f = SignalFilter(median=3)
+
+    assert list(f.process([100, 100])) == [100, 100]
+
+    # A single spike is removed; the window includes the previous batch
+
+    assert list(f.process([500, 100, 100])) == [100, 100, 100]
+
+
+def test_ema_recurrence_across_batches():
+
+    f = SignalFilter(median=1, ema_alpha=0.5)
+
+    assert list(f.process([0, 100])) == [0, 50]
+    assert list(f.process([100])) == [75]
+
+
+def test_ema_alpha_one_follows_input():
+
+    f = SignalFilter(median=1, ema_alpha=1.0)
+
+    assert list(f.process([100, 200, 300])) == [100, 200, 300]
+
+
+def test_ema_alpha_near_one_stays_finite():
+
+    values = np.arange(0, 5000, 10, dtype=np.float64)
+
+    out = SignalFilter(median=1, ema_alpha=0.999999).process(values)
+
+    assert np.all(np.isfinite(out))
+    assert out[-1] == pytest.approx(values[-1], abs=0.01)
+
+
+def test_outliers_are_rejected_against_history():
+
+    f = SignalFilter(median=1, outlier_k=4)
+
+    f.process([200, 201, 199, 200, 202])
+
+    out = f.process([200, 900, 201])
+
+    assert list(out) == [200, 201]
+    assert f.rejected == 1
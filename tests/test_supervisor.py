@@ -0,0 +1,183 @@
+from supervisor import BACKOFF, BACKOFF_BASE, BACKOFF_MAX, RUNNING, STABLE_AFTER, Supervisor
+
+
+class FakeWorker:
+
+    def __init__(self, sensor_id, spec, fail_start=False):
+
+        self.sensor_id = sensor_id
+        self.spec = spec
+        self.fail_start = fail_start
+        self.running = False
+        self.starts = 0
+        self.stops = 0
+
+    def start(self):
+
+        self.starts += 1
+
+        if self.fail_start:
+            raise RuntimeError("no device")
+
+        self.running = True
+
+    def stop(self):
+
+        self.stops += 1
+        self.running = False
+
+    def alive(self):
+
+        return self.running
+
+    def update(self, spec):
+
+        # Only a change of pins needs a new worker
+
+        return spec.get("pin") == self.spec.get("pin")
+
+
+def make_supervisor(desired, **worker_options):
+
+    workers = []
+
+    def factory(sensor_id, spec):
+
+        worker = FakeWorker(sensor_id, spec, **worker_options)
+
+        workers.append(worker)
+
+        return worker
+
+    return Supervisor(None, lambda: desired, factory), workers
+
+
+def crash_and_reconcile(sup, worker, now):
+
+    worker.running = False
+
+    sup.reconcile(now)
+
+    return sup._entries[worker.sensor_id].retry_at - now
+
+
+def test_crashed_worker_backs_off_exponentially_up_to_max():
+
+    sup, workers = make_supervisor({"US1": {"pin": 1}})
+
+    sup.reconcile(0.0)
+
+    worker, = workers
+
+    assert sup.stats()["US1"]["state"] == RUNNING
+
+    now = 1.0
+    delays = []
+
+    for _ in range(10):
+
+        delays.append(crash_and_reconcile(sup, worker, now))
+
+        assert sup._entries["US1"].state == BACKOFF
+
+        now += delays[-1]
+
+        sup.reconcile(now)
+
+        assert sup._entries["US1"].state == RUNNING
+
+        now += 1.0
+
+    assert delays[:4] == [BACKOFF_BASE, 2 * BACKOFF_BASE, 4 * BACKOFF_BASE, 8 * BACKOFF_BASE]
+    assert max(delays) == BACKOFF_MAX
+    assert sup.stats()["US1"]["restarts"] == 10
+
+
+def test_no_restart_before_backoff_expires():
+
+    sup, workers = make_supervisor({"US1": {"pin": 1}})
+
+    sup.reconcile(0.0)
+
+    worker, = workers
+
+    crash_and_reconcile(sup, worker, 1.0)
+
+    sup.reconcile(1.0 + BACKOFF_BASE / 2)
+
+    assert worker.starts == 1
+
+    sup.reconcile(1.0 + BACKOFF_BASE)
+
+    assert worker.starts == 2
+
+
+def test_stable_worker_resets_backoff():
+
+    sup, workers = make_supervisor({"US1": {"pin": 1}})
+
+    sup.reconcile(0.0)
+
+    worker, = workers
+
+    now = 1.0
+
+    for _ in range(3):
+
+        now += crash_and_reconcile(sup, worker, now)
+
+        sup.reconcile(now)
+
+    now += STABLE_AFTER
+
+    assert crash_and_reconcile(sup, worker, now) == BACKOFF_BASE
+
+
+def test_failing_start_backs_off():
+
+    sup, workers = make_supervisor({"US1": {"pin": 1}}, fail_start=True)
+
+    sup.reconcile(0.0)
+
+    entry = sup._entries["US1"]
+
+    assert entry.state == BACKOFF
+    assert entry.retry_at == BACKOFF_BASE
+    assert "no device" in entry.last_error
+
+    sup.reconcile(BACKOFF_BASE)
+
+    assert entry.retry_at == BACKOFF_BASE + 2 * BACKOFF_BASE
+
+
+def test_reconcile_follows_desired_set():
+
+    desired = {"US1": {"pin": 1}, "RD1": {"pin": 2}}
+
+    sup, workers = make_supervisor(desired)
+
+    sup.reconcile(0.0)
+
+    first_us1, rd1 = workers
+
+    # Settings change in place; a pin change gets a new worker
+
+    desired["US1"] = {"pin": 1, "rate_hz": 5}
+
+    sup.reconcile(1.0)
+
+    assert len(workers) == 2
+
+    desired["US1"] = {"pin": 7}
+
+    sup.reconcile(2.0)
+
+    assert first_us1.stops == 1
+    assert workers[-1].spec == {"pin": 7} and workers[-1].running
+
+    del desired["RD1"]
+
+    sup.reconcile(3.0)
+
+    assert rd1.stops == 1
+    assert sorted(sup.running()) == ["US1"]
@@ -1,9 +1,16 @@
+import functools
+import queue
 import requests
 import json
 import RPi.GPIO as GPIO
 import time
 import logging
 
+from alert_dispatcher import AlertDispatcher
+from echo_timing import make_echo_timer
+from http_client import get_client
+from ping_scheduler import PingScheduler
+
 # Configure logging
 logging.basicConfig(
     filename='ultrasonic.log',
@@ -33,38 +40,35 @@ VALID_RANGE_MAX = 780
 # Function to send HTTP command
 def send_http_command(url, method='POST', params=None, data=None, headers=None):
     try:
-        response = requests.request(method, url, params=params, data=data, headers=headers, timeout=0.5)
+        response = get_client().request(method, url, params=params, data=data, headers=headers, timeout=0.5)
         response.raise_for_status()  # Raise an exception for 4xx or 5xx status codes
         return response.text
     except requests.exceptions.RequestException as e:
         logging.error(f"Error: {e}")
         return None
 
-def measure_distance_ultrasonic(trig, echo):
-    GPIO.output(trig, GPIO.HIGH)
-    time.sleep(0.00001)  # 10 microseconds
-    GPIO.output(trig, GPIO.LOW)
-
-    pulse_start = time.time()
-    timeout_start = pulse_start
-
-    while GPIO.input(echo) == 0:
-        pulse_start = time.time()
-        if pulse_start - timeout_start > 0.02:  # Timeout for no echo received
-            return -1
-
-    while GPIO.input(echo) == 1:
-        pulse_end = time.time()
-        if pulse_end - pulse_start > 0.02:  # Timeout for long echo
-            return -1
-
-    pulse_duration = pulse_end - pulse_start
-    distance = pulse_duration * 17150  # Convert to cm
+echo_timers = {}  # One echo timer per sensor, edge-triggered where supported
 
-    if distance < 2 or distance > 800:
-        return -1
+def measure_distance_ultrasonic(trig, echo):
+    timer = echo_timers.get(echo)
+    if timer is None:
+        timer = echo_timers[echo] = make_echo_timer(GPIO, trig, echo)
+    return timer.measure()  # Distance in cm, or -1 on timeout/out of range
+
+ALERT_COOLDOWN = 3  # Seconds between alerts from one sensor, as the old 3 s loop sleep allowed
+ALERT_QUEUE_SIZE = 16  # Alerts waiting for delivery; more are dropped
+
+def deliver(data):
+    sensor_id, sensor_type = data["sensorId"], data["sensorType"]
+    headers = {'Content-Type': 'application/json'}
+    response = send_http_command(SERVER_URL, method='POST', data=json.dumps(data), headers=headers)
+    if response:
+        logging.info(f"{sensor_id} ({sensor_type}) | HTTP Response: {response}")
+    else:
+        logging.error(f"{sensor_id} ({sensor_type}) | Failed to send HTTP request.")
+    return response is not None
 
-    return distance
+dispatcher = AlertDispatcher(deliver, maxsize=ALERT_QUEUE_SIZE, cooldown=ALERT_COOLDOWN)
 
 def check_and_send_request(distance, sensor_id, sensor_type):
     if VALID_RANGE_MIN <= distance <= VALID_RANGE_MAX:
@@ -78,29 +82,48 @@ def check_and_send_request(distance, sensor_id, sensor_type):
             "sensorType": sensor_type
         }
         
-        headers = {'Content-Type': 'application/json'}
-        response = send_http_command(SERVER_URL, method='POST', data=json.dumps(data), headers=headers)
-        if response:
-            logging.info(f"{sensor_id} ({sensor_type}) | HTTP Response: {response}")
-        else:
-            logging.error(f"{sensor_id} ({sensor_type}) | Failed to send HTTP request.")
+        dispatcher.submit(sensor_id, data)  # Suppressed within the sensor's cooldown
     else:
         logging.info(f"{sensor_id} ({sensor_type}) | Distance {distance:.2f} cm is out of the valid range ({VALID_RANGE_MIN} - {VALID_RANGE_MAX} cm).")
 
 
+PING_RATE_HZ = 5  # Target pings per second for each sensor
+STATS_INTERVAL = 30  # Seconds between achieved-rate reports
+RESULTS_QUEUE_SIZE = 32  # Pings waiting for the main thread; newer ones are dropped beyond this
+
+def queue_result(results, sensor_id, distance, timestamp):
+    try:
+        results.put_nowait((sensor_id, distance))
+    except queue.Full:  # Never block a ping thread; the next ping follows shortly
+        pass
+
 def main():
-    try: # Start the ultrasonic sensor reading loop in the main thread
+    # US1 and US2 share a crosstalk group, so the scheduler never fires them together
+    results = queue.Queue(maxsize=RESULTS_QUEUE_SIZE)
+    scheduler = PingScheduler(functools.partial(queue_result, results))
+    dispatcher.start()
+    for sensor in ULTRASONIC_SENSORS:
+        scheduler.add(sensor["id"], functools.partial(measure_distance_ultrasonic, sensor["trig"], sensor["echo"]), PING_RATE_HZ)
+
+    try: # Handle results in the main thread; alerts are sent by the dispatcher thread
+        next_stats = time.monotonic() + STATS_INTERVAL
         while True:
-            for sensor in ULTRASONIC_SENSORS:
-                distance = measure_distance_ultrasonic(sensor["trig"], sensor["echo"])
-                if distance != -1:
-                    logging.info(f"{sensor['id']} Ultrasonic Distance: {distance:.2f} cm")
-                    check_and_send_request(distance, sensor["id"], "Ultrasonic")
-            time.sleep(3)
+            try:
+                sensor_id, distance = results.get(timeout=1)
+            except queue.Empty:
+                sensor_id, distance = None, -1
+            if distance != -1:
+                logging.info(f"{sensor_id} Ultrasonic Distance: {distance:.2f} cm")
+                check_and_send_request(distance, sensor_id, "Ultrasonic")
+            if time.monotonic() >= next_stats:
+                logging.info(f"Ping rates: {scheduler.stats()} Alerts: {dispatcher.stats()}")
+                next_stats += STATS_INTERVAL
 
     except KeyboardInterrupt:
         logging.info("Program interrupted by user.")
     finally:
+        scheduler.stop(timeout=1)
+        dispatcher.stop(timeout=1)
         GPIO.cleanup()
         logging.info("GPIO cleaned up. Exiting program.")
 